@@ -0,0 +1,28 @@
+"""Add users.calendar_token
+
+Revision ID: b7f3a9d2e6c4
+Revises: c5d2f8a1b7e4
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7f3a9d2e6c4'
+down_revision = 'c5d2f8a1b7e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Прежние подписанные токены (HMAC от SECRET_KEY) перестают действовать:
+    # пользователь получает новый адрес ленты в /tasks/calendar/feed
+    op.add_column('users', sa.Column('calendar_token', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_users_calendar_token'), 'users', ['calendar_token'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_calendar_token'), table_name='users')
+    op.drop_column('users', 'calendar_token')
@@ -0,0 +1,51 @@
+"""Add indexes for task hot queries and foreign keys
+
+Revision ID: c4e2a7b1d9f3
+Revises: b91ddce9a7a2
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e2a7b1d9f3'
+down_revision = 'b91ddce9a7a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # crud/task.get_tasks (фильтр по статусу) и get_overdue_tasks (pending/in_progress + deadline)
+    op.create_index('ix_tasks_user_id_status_deadline', 'tasks', ['user_id', 'status', 'deadline'], unique=False)
+    # crud/task.get_tasks (диапазон дедлайнов) и get_upcoming_tasks (ORDER BY deadline)
+    op.create_index('ix_tasks_user_id_deadline', 'tasks', ['user_id', 'deadline'], unique=False)
+    # Ветка is_overdue = true в get_overdue_tasks
+    op.create_index(
+        'ix_tasks_user_id_overdue', 'tasks', ['user_id'], unique=False,
+        postgresql_where=sa.text('is_overdue')
+    )
+    # Глобальные проходы планировщика по незавершенным задачам
+    op.create_index(
+        'ix_tasks_deadline_open', 'tasks', ['deadline'], unique=False,
+        postgresql_where=sa.text("status <> 'completed'")
+    )
+    
+    # Внешние ключи: PostgreSQL не индексирует их автоматически
+    op.create_index(op.f('ix_goals_user_id'), 'goals', ['user_id'], unique=False)
+    op.create_index(op.f('ix_task_steps_task_id'), 'task_steps', ['task_id'], unique=False)
+    op.create_index('ix_user_achievements_user_id_achievement_id', 'user_achievements', ['user_id', 'achievement_id'], unique=False)
+    op.create_index(op.f('ix_notifications_user_id'), 'notifications', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_notifications_user_id'), table_name='notifications')
+    op.drop_index('ix_user_achievements_user_id_achievement_id', table_name='user_achievements')
+    op.drop_index(op.f('ix_task_steps_task_id'), table_name='task_steps')
+    op.drop_index(op.f('ix_goals_user_id'), table_name='goals')
+    
+    op.drop_index('ix_tasks_deadline_open', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_overdue', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_deadline', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_status_deadline', table_name='tasks')
@@ -0,0 +1,32 @@
+"""Add indexes for keyset pagination of tasks
+
+Revision ID: d8b3f6a2c1e7
+Revises: c4e2a7b1d9f3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b3f6a2c1e7'
+down_revision = 'c4e2a7b1d9f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Индексы под каждый ключ сортировки GET /tasks (id — последний ключ курсора).
+    # (user_id, deadline, id) заменяет (user_id, deadline) и обслуживает те же запросы
+    op.drop_index('ix_tasks_user_id_deadline', table_name='tasks')
+    op.create_index('ix_tasks_user_id_deadline_id', 'tasks', ['user_id', 'deadline', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_created_at_id', 'tasks', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_priority_deadline_id', 'tasks', ['user_id', 'priority', 'deadline', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_user_id_priority_deadline_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_deadline_id', table_name='tasks')
+    op.create_index('ix_tasks_user_id_deadline', 'tasks', ['user_id', 'deadline'], unique=False)
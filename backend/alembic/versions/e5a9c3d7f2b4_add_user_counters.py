@@ -0,0 +1,79 @@
+"""Add user_counters table
+
+Revision ID: e5a9c3d7f2b4
+Revises: d8b3f6a2c1e7
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d7f2b4'
+down_revision = 'd8b3f6a2c1e7'
+branch_labels = None
+depends_on = None
+
+
+COUNTER_COLUMNS = [
+    'total_tasks', 'pending_tasks', 'in_progress_tasks', 'completed_tasks', 'overdue_tasks',
+    'flagged_overdue_tasks', 'yearly_debts', 'semester_debts', 'completed_goals',
+    'total_points', 'achievements_count',
+]
+
+
+def upgrade() -> None:
+    op.create_table('user_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        *[sa.Column(name, sa.Integer(), server_default='0', nullable=False) for name in COUNTER_COLUMNS],
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    
+    # Выполненные задачи за последние дни (current_streak) — единственный счетчик,
+    # зависящий от времени, поэтому он считается запросом по этому индексу
+    op.create_index(
+        'ix_tasks_user_id_completed_at', 'tasks', ['user_id', 'completed_at'], unique=False,
+        postgresql_where=sa.text("status = 'completed'")
+    )
+    
+    # Заполняем счетчики для существующих пользователей
+    op.execute("""
+        INSERT INTO user_counters (user_id, total_tasks, pending_tasks, in_progress_tasks, completed_tasks,
+                                   overdue_tasks, flagged_overdue_tasks, yearly_debts, semester_debts,
+                                   completed_goals, total_points, achievements_count)
+        SELECT u.id,
+               COALESCE(t.total_tasks, 0), COALESCE(t.pending_tasks, 0), COALESCE(t.in_progress_tasks, 0),
+               COALESCE(t.completed_tasks, 0), COALESCE(t.overdue_tasks, 0), COALESCE(t.flagged_overdue_tasks, 0),
+               COALESCE(t.yearly_debts, 0), COALESCE(t.semester_debts, 0),
+               COALESCE(g.completed_goals, 0), COALESCE(a.total_points, 0), COALESCE(a.achievements_count, 0)
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id,
+                   count(*) AS total_tasks,
+                   count(*) FILTER (WHERE status = 'pending') AS pending_tasks,
+                   count(*) FILTER (WHERE status = 'in_progress') AS in_progress_tasks,
+                   count(*) FILTER (WHERE status = 'completed') AS completed_tasks,
+                   count(*) FILTER (WHERE status = 'overdue') AS overdue_tasks,
+                   count(*) FILTER (WHERE is_overdue) AS flagged_overdue_tasks,
+                   count(*) FILTER (WHERE priority = 'yearly_debt') AS yearly_debts,
+                   count(*) FILTER (WHERE priority = 'semester_debt') AS semester_debts
+            FROM tasks GROUP BY user_id
+        ) t ON t.user_id = u.id
+        LEFT JOIN (
+            SELECT user_id, count(*) AS completed_goals
+            FROM goals WHERE is_completed GROUP BY user_id
+        ) g ON g.user_id = u.id
+        LEFT JOIN (
+            SELECT ua.user_id, COALESCE(sum(ach.points), 0) AS total_points, count(ua.id) AS achievements_count
+            FROM user_achievements ua LEFT JOIN achievements ach ON ach.id = ua.achievement_id
+            GROUP BY ua.user_id
+        ) a ON a.user_id = u.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_user_id_completed_at', table_name='tasks')
+    op.drop_table('user_counters')
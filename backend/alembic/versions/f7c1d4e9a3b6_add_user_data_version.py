@@ -0,0 +1,24 @@
+"""Add data_version to user_counters
+
+Revision ID: f7c1d4e9a3b6
+Revises: e5a9c3d7f2b4
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c1d4e9a3b6'
+down_revision = 'e5a9c3d7f2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user_counters', sa.Column('data_version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('user_counters', 'data_version')
@@ -0,0 +1,75 @@
+"""
+Условные GET (ETag / If-None-Match) для данных пользователя.
+
+ETag строится из data_version пользователя (user_counters), которую увеличивает
+каждая запись задач, целей и достижений. If-None-Match проверяется в зависимости,
+до запросов самого эндпоинта: ответ 304 стоит одного поиска по первичному ключу.
+Версия читается с primary, даже если сам эндпоинт читает с реплики: отстающая
+реплика вернула бы старую версию, и клиент получил бы 304 на устаревшие данные.
+"""
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...crud.counters import get_data_version_async
+from ...db.session import get_async_db
+from .endpoints.auth import CurrentUser, get_current_user
+
+# Ответ может устареть в любой момент — клиент всегда переспрашивает сервер
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение ETag для If-None-Match (RFC 9110, 13.1.2)"""
+    if if_none_match is None:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified(request: Request, etag: str, last_modified) -> bool:
+    """Условный GET: If-None-Match важнее If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return since is not None and last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def user_data_etag(window: Optional[int] = None, window_if: Optional[Callable[[Request], bool]] = None) -> Callable:
+    """
+    Зависимость, которая ставит ETag по версии данных пользователя
+    и отвечает 304, если он совпал с If-None-Match.
+    window (секунды) — для ответов, зависящих от текущего времени (просрочка, streak):
+    ETag меняется не реже раза в window даже без записей. window_if(request) —
+    если от времени зависят только некоторые запросы (например, фильтр по статусу):
+    window применяется, когда он вернул True.
+    Эндпоинт, который сам собирает Response, копирует заголовки из response.headers.
+    """
+    async def dependency(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CurrentUser = Depends(get_current_user)
+    ) -> str:
+        version = await get_data_version_async(db, current_user.id)
+        etag = f'W/"{current_user.id}-{version}'
+        if window and (window_if is None or window_if(request)):
+            etag += f"-{int(time.time()) // window}"
+        etag += '"'
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        return etag
+    
+    return dependency
@@ -1,57 +1,77 @@
 from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from ....crud import achievement as crud_achievement
-from ....db.session import get_db
-from ....schemas.user import User
+from ....db.session import get_async_db, get_async_read_db
 from ....schemas.achievement import Achievement, UserAchievement, UserStats
-from .auth import get_current_user
+from ....core.config import settings
+from ....services.achievement_catalog import get_achievement_catalog_async
+from ..conditional import etag_matches, user_data_etag
+from ..responses import ListSerializer
+from .auth import CurrentUser, get_current_user
 
 router = APIRouter()
 
+USER_ACHIEVEMENT_LIST = ListSerializer(UserAchievement)
+USER_ETAG = user_data_etag()
+STATS_ETAG = user_data_etag(window=settings.STATS_ETAG_WINDOW_SECONDS)
+
 
 @router.get("/", response_model=List[Achievement])
-def read_achievements(
-    db: Session = Depends(get_db)
+async def read_achievements(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db)
 ) -> Any:
     """
-    Получить все доступные достижения
+    Получить все доступные достижения.
+    Ответ — готовое JSON-тело из кэша каталога; ETag зависит только от содержимого
     """
-    return crud_achievement.get_all_achievements(db)
+    snapshot = await get_achievement_catalog_async(db)
+    headers = {"ETag": snapshot.etag, "Cache-Control": f"public, max-age={settings.ACHIEVEMENT_CATALOG_TTL_SECONDS}"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(snapshot.body, media_type="application/json", headers=headers)
 
 
 @router.get("/user", response_model=List[UserAchievement])
-def read_user_achievements(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def read_user_achievements(
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    etag: str = Depends(USER_ETAG)
 ) -> Any:
     """
-    Получить достижения текущего пользователя
+    Получить достижения текущего пользователя (с ETag: при совпадении If-None-Match — 304)
     """
-    return crud_achievement.get_user_achievements(db, current_user.id)
+    achievements = await crud_achievement.get_user_achievements_async(db, current_user.id)
+    if settings.FAST_JSON_RESPONSES:
+        return USER_ACHIEVEMENT_LIST.response(achievements, dict(response.headers))
+    return achievements
 
 
 @router.get("/stats", response_model=UserStats)
-def read_user_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def read_user_stats(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    etag: str = Depends(STATS_ETAG)
 ) -> Any:
     """
-    Получить статистику пользователя
+    Получить статистику пользователя.
+    ETag зависит и от времени: streak считается за последние 7 дней
     """
-    stats = crud_achievement.get_user_stats(db, current_user.id)
+    stats = await crud_achievement.get_user_stats_async(db, current_user.id)
     return UserStats(**stats)
 
 
 @router.post("/check")
-def check_achievements(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def check_achievements(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Проверить и присвоить новые достижения
     """
-    new_achievements = crud_achievement.check_and_award_achievements(db, current_user.id)
+    new_achievements = await crud_achievement.check_and_award_achievements_async(db, current_user.id)
     return {
         "message": f"Проверка завершена. Получено новых достижений: {len(new_achievements)}",
         "new_achievements": new_achievements
@@ -1,70 +1,140 @@
-from datetime import timedelta
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ....core import security
 from ....core.config import settings
+from ....core.proxies import client_ip
+from ....crud import refresh_token as crud_refresh_token
+from ....crud import revoked_token as crud_revoked_token
 from ....crud import user as crud_user
-from ....db.session import get_db
+from ....db.session import get_db, get_async_db
 from ....schemas.user import (
     User, UserCreate, Token, UserLogin, PasswordChange, PushSubscription,
-    PushNotification
+    PushNotification, RefreshTokenRequest, LogoutRequest
 )
+from ....services.login_throttle import login_throttle
 from ....services.notifications import notification_service
+from ....services.token_revocation import token_revocations
+from ....services.user_cache import CurrentUser, user_cache
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+def _credentials_error(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def _load_current_user(db: AsyncSession, user_id: int) -> Optional[CurrentUser]:
+    db_user = await crud_user.get_user_async(db, user_id)
+    return CurrentUser.from_orm(db_user) if db_user is not None else None
+
+
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    """
+    Пользователь из токена. По claim uid запись берется из user_cache,
+    и таблица users читается только при промахе (одновременные промахи
+    по одному пользователю — одним запросом). Токены без uid (выданные
+    до его появления) по-прежнему ищут пользователя по email.
+    Отзыв токена (jti) проверяется по фильтру в памяти, см. token_revocation.
+    """
     payload = security.verify_token(token)
     if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
     
     email: str = payload.get("sub")
     if email is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
     
-    user = crud_user.get_user_by_email(db, email=email)
+    jti = payload.get("jti")
+    if isinstance(jti, str) and await token_revocations.is_revoked_async(db, jti):
+        raise _credentials_error("Token has been revoked")
+    
+    user_id = payload.get("uid")
+    if isinstance(user_id, int):
+        user = await user_cache.get_or_load(user_id, lambda: _load_current_user(db, user_id))
+    else:
+        db_user = await crud_user.get_user_by_email_async(db, email=email)
+        user = CurrentUser.from_orm(db_user) if db_user is not None else None
+        if user is not None:
+            await user_cache.set(user.id, user)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error("User not found")
+    
+    # После смены email старые токены недействительны, как и при поиске по email
+    if user.email != email:
+        raise _credentials_error("User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Аккаунт не активен")
     return user
 
 
+def _create_user_token(user) -> str:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return security.create_access_token(
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
+    )
+
+
+async def _login_response(db: AsyncSession, user) -> dict:
+    """Access-токен и refresh-токен нового семейства"""
+    refresh_token = await crud_refresh_token.create_refresh_token_async(db, user.id)
+    return {"access_token": _create_user_token(user), "refresh_token": refresh_token, "token_type": "bearer"}
+
+
 @router.post("/register", response_model=User)
-def register(user: UserCreate, db: Session = Depends(get_db)) -> Any:
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)) -> Any:
     """
     Регистрация нового пользователя
     """
-    db_user = crud_user.get_user_by_email(db, email=user.email)
+    db_user = await crud_user.get_user_by_email_async(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Пользователь с таким email уже существует"
         )
-    db_user = crud_user.create_user(db=db, user=user)
+    db_user = await crud_user.create_user_async(db=db, user=user)
     return db_user
 
 
+async def _authenticate(request: Request, db: AsyncSession, email: str, password: str):
+    """
+    authenticate_user_async с ограничением попыток: заблокированный email или IP
+    получает 429 до обращения к БД и bcrypt
+    """
+    keys = login_throttle.keys(email, client_ip(request))
+    retry_after = await login_throttle.retry_after(keys)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много неудачных попыток входа, повторите позже",
+            headers={"Retry-After": str(retry_after)},
+        )
+    user = await crud_user.authenticate_user_async(db, email=email, password=password)
+    if user:
+        await login_throttle.success(keys)
+    else:
+        await login_throttle.failure(keys)
+    return user
+
+
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)) -> Any:
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+) -> Any:
     """
     Авторизация пользователя
     """
-    user = crud_user.authenticate_user(db, email=form_data.username, password=form_data.password)
+    user = await _authenticate(request, db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,19 +144,15 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Аккаунт не активен")
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await _login_response(db, user)
 
 
 @router.post("/login-json", response_model=Token)
-def login_json(user_login: UserLogin, db: Session = Depends(get_db)) -> Any:
+async def login_json(request: Request, user_login: UserLogin, db: AsyncSession = Depends(get_async_db)) -> Any:
     """
     Авторизация пользователя через JSON
     """
-    user = crud_user.authenticate_user(db, email=user_login.email, password=user_login.password)
+    user = await _authenticate(request, db, user_login.email, user_login.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -95,11 +161,49 @@ def login_json(user_login: UserLogin, db: Session = Depends(get_db)) -> Any:
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Аккаунт не активен")
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await _login_response(db, user)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)) -> Any:
+    """
+    Обменять refresh-токен на новую пару токенов без проверки пароля.
+    Каждый refresh-токен действует один раз; повторное предъявление отзывает
+    все токены этого входа.
+    """
+    rotated = await crud_refresh_token.rotate_refresh_token_async(db, body.refresh_token)
+    if rotated is None:
+        raise _credentials_error("Недействительный refresh-токен")
+    user_id, refresh_token = rotated
+    
+    user = await user_cache.get_or_load(user_id, lambda: _load_current_user(db, user_id))
+    if user is None:
+        raise _credentials_error("User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Аккаунт не активен")
+    return {"access_token": _create_user_token(user), "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+@router.post("/logout")
+async def logout(
+    body: Optional[LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Выход: текущий access-токен отзывается до своего истечения,
+    переданный refresh-токен — вместе со всем семейством этого входа
+    """
+    payload = security.verify_token(token)
+    jti, exp = payload.get("jti"), payload.get("exp")
+    if isinstance(jti, str) and isinstance(exp, (int, float)):
+        await crud_revoked_token.revoke_access_token_async(
+            db, jti, current_user.id, datetime.fromtimestamp(exp, timezone.utc)
+        )
+    if body is not None and body.refresh_token:
+        await crud_refresh_token.revoke_refresh_token_async(db, body.refresh_token, current_user.id)
+    return {"message": "Выход выполнен"}
 
 
 # OAuth endpoints removed as per PRD requirements
@@ -110,23 +214,29 @@ def login_json(user_login: UserLogin, db: Session = Depends(get_db)) -> Any:
 
 
 @router.get("/me", response_model=User)
-def read_users_me(current_user: User = Depends(get_current_user)) -> Any:
+async def read_users_me(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
     """
-    Получить данные текущего пользователя
+    Получить данные текущего пользователя (полная запись читается из БД)
     """
-    return current_user
+    user = await crud_user.get_user_async(db, current_user.id)
+    if user is None:
+        raise _credentials_error("User not found")
+    return user
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     password_data: PasswordChange,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Изменить пароль пользователя
     """
-    success = crud_user.change_password(
+    success = await crud_user.change_password_async(
         db, current_user.id, password_data.current_password, password_data.new_password
     )
     if not success:
@@ -138,7 +248,7 @@ def change_password(
 def save_push_subscription(
     subscription: PushSubscription,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Сохранить push-подписку для уведомлений
@@ -167,7 +277,7 @@ def save_push_subscription(
 @router.post("/test-notification")
 async def send_test_notification(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Отправить тестовое уведомление (для разработки)
@@ -1,97 +1,113 @@
-from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from ....crud import goal as crud_goal
-from ....db.session import get_db
-from ....schemas.user import User
+from ....db.session import get_async_db, get_async_read_db
 from ....schemas.goal import Goal, GoalCreate, GoalUpdate, GoalProgressUpdate
-from .auth import get_current_user
+from ....core.config import settings
+from ..conditional import user_data_etag
+from ..projection import parse_fields, rows_response
+from ..responses import ListSerializer
+from .auth import CurrentUser, get_current_user
 
 router = APIRouter()
 
+GOAL_LIST = ListSerializer(Goal)
+USER_ETAG = user_data_etag()
+
 
 @router.get("/", response_model=List[Goal])
-def read_goals(
+async def read_goals(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    view: str = Query(
+        "full", pattern="^(full|compact)$",
+        description="compact — id, title, goal_type, target_value, current_value, end_date, is_completed"
+    ),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую (важнее view)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    etag: str = Depends(USER_ETAG)
 ) -> Any:
     """
-    Получить цели текущего пользователя
+    Получить цели текущего пользователя (с ETag: при совпадении If-None-Match — 304)
     """
-    goals = crud_goal.get_user_goals(db, current_user.id, skip=skip, limit=limit)
-    return goals
+    columns = parse_fields(fields, view, crud_goal.GOAL_FIELDS, crud_goal.GOAL_COMPACT_FIELDS)
+    goals = await crud_goal.get_user_goals_async(db, current_user.id, skip=skip, limit=limit, columns=columns)
+    if columns:
+        return rows_response(goals, columns, dict(response.headers))
+    return GOAL_LIST.response(goals, dict(response.headers)) if settings.FAST_JSON_RESPONSES else goals
 
 
 @router.post("/", response_model=Goal)
-def create_goal(
+async def create_goal(
     goal: GoalCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Создать новую цель
     """
-    return crud_goal.create_goal(db, goal, current_user.id)
+    return await crud_goal.create_goal_async(db, goal, current_user.id)
 
 
 @router.get("/{goal_id}", response_model=Goal)
-def read_goal(
+async def read_goal(
     goal_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Получить конкретную цель
     """
-    goal = crud_goal.get_goal(db, goal_id, current_user.id)
+    goal = await crud_goal.get_goal_async(db, goal_id, current_user.id)
     if not goal:
         raise HTTPException(status_code=404, detail="Цель не найдена")
     return goal
 
 
 @router.put("/{goal_id}", response_model=Goal)
-def update_goal(
+async def update_goal(
     goal_id: int,
     goal_update: GoalUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Обновить цель
     """
-    goal = crud_goal.update_goal(db, goal_id, current_user.id, goal_update)
+    goal = await crud_goal.update_goal_async(db, goal_id, current_user.id, goal_update)
     if not goal:
         raise HTTPException(status_code=404, detail="Цель не найдена")
     return goal
 
 
 @router.post("/{goal_id}/progress", response_model=Goal)
-def update_goal_progress(
+async def update_goal_progress(
     goal_id: int,
     progress_update: GoalProgressUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Обновить прогресс цели
     """
-    goal = crud_goal.update_goal_progress(db, goal_id, current_user.id, progress_update.increment)
+    goal = await crud_goal.update_goal_progress_async(db, goal_id, current_user.id, progress_update.increment)
     if not goal:
         raise HTTPException(status_code=404, detail="Цель не найдена")
     return goal
 
 
 @router.delete("/{goal_id}")
-def delete_goal(
+async def delete_goal(
     goal_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Удалить цель
     """
-    if not crud_goal.delete_goal(db, goal_id, current_user.id):
+    if not await crud_goal.delete_goal_async(db, goal_id, current_user.id):
         raise HTTPException(status_code=404, detail="Цель не найдена")
     return {"message": "Цель успешно удалена"} 
\ No newline at end of file
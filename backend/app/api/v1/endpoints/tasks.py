@@ -1,28 +1,70 @@
+from email.utils import format_datetime
+from datetime import date, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from typing import List, Optional, Any
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from ....crud import task as crud_task
-from ....db.session import get_db
-from ....schemas.user import User
-from ....schemas.task import Task, TaskCreate, TaskUpdate, TaskFilter, TaskStats, TaskStep
-from .auth import get_current_user
+from ....crud import user as crud_user
+from ....db.base import AsyncSessionLocal
+from ....db.session import async_read_session, get_async_db, get_async_read_db
+from ....schemas.task import (
+    Task, TaskCreate, TaskBulkCreate, TaskUpdate, TaskFilter, TaskStats, TaskStep,
+    TaskBulkUpdate, TaskBulkDelete, TaskBulkUpdateResult, TaskBulkDeleteResult, TaskCalendar
+)
+from ....core.config import settings
+from ....services import ics, task_io
+from ..conditional import not_modified, user_data_etag
+from ..projection import parse_fields, rows_response
+from ..responses import ListSerializer
+from .auth import CurrentUser, get_current_user
 
 router = APIRouter()
 
+TASK_LIST = ListSerializer(Task)
+USER_ETAG = user_data_etag()
+STATS_ETAG = user_data_etag(window=settings.STATS_ETAG_WINDOW_SECONDS)
+
+# Статусы, в которые и из которых задачи переходят с течением времени (наступил дедлайн)
+TIME_DEPENDENT_STATUSES = {"pending", "in_progress", "overdue"}
+
+
+def _time_dependent_list(request: Request) -> bool:
+    return request.query_params.get("status") in TIME_DEPENDENT_STATUSES
+
+
+TASK_LIST_ETAG = user_data_etag(window=settings.STATS_ETAG_WINDOW_SECONDS, window_if=_time_dependent_list)
+
 
 @router.get("/", response_model=List[Task])
-def read_tasks(
+async def read_tasks(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
     task_type: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    sort: str = Query("deadline", description="deadline, created_at или priority; '-' в начале — по убыванию"),
+    cursor: Optional[str] = Query(None, description="Значение X-Next-Cursor предыдущей страницы"),
+    include_total: bool = Query(False, description="Вернуть общее число задач в X-Total-Count"),
+    include_steps: bool = Query(True, description="false — не загружать этапы (steps будет пустым)"),
+    view: str = Query("full", pattern="^(full|compact)$", description="compact — id, title, deadline, status, priority, color"),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую (важнее view)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    etag: str = Depends(TASK_LIST_ETAG)
 ) -> Any:
     """
-    Получить список задач пользователя с фильтрацией
+    Получить список задач пользователя с фильтрацией.
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor
+    (отсутствует на последней странице); skip/limit поддерживаются по-прежнему.
+    С view=compact или fields= возвращаются только выбранные поля.
+    Ответ несет ETag; при совпадении If-None-Match возвращается 304 без выборки задач.
+    С фильтром по статусу, который меняется с наступлением дедлайна, ETag, как
+    у статистики, меняется не реже раза в STATS_ETAG_WINDOW_SECONDS.
     """
+    columns = parse_fields(fields, view, crud_task.TASK_FIELDS, crud_task.TASK_COMPACT_FIELDS)
     filters = TaskFilter()
     if task_type:
         filters.task_type = task_type
@@ -31,50 +73,256 @@ def read_tasks(
     if status:
         filters.status = status
     
-    tasks = crud_task.get_tasks(
-        db=db, user_id=current_user.id, skip=skip, limit=limit, filters=filters
-    )
+    try:
+        tasks, next_cursor = await crud_task.get_tasks_page_async(
+            db=db, user_id=current_user.id, limit=limit, filters=filters,
+            sort=sort, cursor=cursor, skip=skip, include_steps=include_steps, columns=columns
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    headers = dict(response.headers)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if include_total:
+        total = await crud_task.count_tasks_async(db=db, user_id=current_user.id, filters=filters)
+        headers["X-Total-Count"] = str(total)
+    if columns:
+        return rows_response(tasks, columns, headers)
+    if settings.FAST_JSON_RESPONSES:
+        return TASK_LIST.response(tasks, headers)
+    response.headers.update(headers)
     return tasks
 
 
+@router.get("/export")
+async def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson (с этапами) или csv"),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Выгрузить все задачи пользователя потоком из серверного курсора.
+    Сессия открывается внутри потока и живет до конца передачи.
+    """
+    user_id = current_user.id
+    
+    async def body():
+        async with async_read_session() as db:
+            async for chunk in task_io.stream_tasks_export(db, user_id, format):
+                yield chunk
+    
+    return StreamingResponse(
+        body(),
+        media_type=task_io.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    )
+
+
+@router.get("/calendar", response_model=TaskCalendar)
+async def read_task_calendar(
+    start: date = Query(..., alias="from", description="Первый день (YYYY-MM-DD)"),
+    end: date = Query(..., alias="to", description="Последний день включительно (YYYY-MM-DD)"),
+    tz: str = Query("UTC", description="Часовой пояс IANA, например Europe/Moscow"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Задачи за период, сгруппированные по дням в часовом поясе пользователя,
+    с количеством задач по статусам и приоритетам за каждый день
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="Параметр to раньше from")
+    if (end - start).days + 1 > settings.TASK_CALENDAR_MAX_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Период не больше {settings.TASK_CALENDAR_MAX_DAYS} дней"
+        )
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Неизвестный часовой пояс: {tz}")
+    
+    days = await crud_task.get_task_calendar_async(
+        db=db, user_id=current_user.id, start=start, end=end, zone=zone
+    )
+    return TaskCalendar(start=start, end=end, tz=tz, days=days)
+
+
+def _calendar_feed_url(token: Optional[str]) -> Optional[str]:
+    return f"{settings.BACKEND_URL}/api/v1/tasks/calendar.ics?token={token}" if token else None
+
+
+@router.get("/calendar/feed")
+async def read_calendar_feed_url(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Адрес ленты календаря для подписки из телефона (токен в адресе, без авторизации).
+    Токен создается при первом запросе и действует до сброса
+    """
+    token = await crud_user.get_calendar_token_async(db, current_user.id)
+    return {"url": _calendar_feed_url(token)}
+
+
+@router.post("/calendar/feed/reset")
+async def reset_calendar_feed_url(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Выдать новый адрес ленты; подписки по старому адресу перестают обновляться
+    """
+    token = await crud_user.reset_calendar_token_async(db, current_user.id)
+    return {"url": _calendar_feed_url(token)}
+
+
+@router.delete("/calendar/feed")
+async def disable_calendar_feed(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Отключить ленту календаря до следующего запроса адреса
+    """
+    await crud_user.reset_calendar_token_async(db, current_user.id, enabled=False)
+    return {"url": None}
+
+
+@router.get("/calendar.ics")
+async def read_calendar_feed(
+    request: Request,
+    token: str = Query(..., max_length=64, description="Токен из /tasks/calendar/feed"),
+) -> Any:
+    """
+    Лента задач в формате iCalendar. Клиенты календарей опрашивают ее часто,
+    поэтому сначала сверяется версия данных пользователя (user_counters.data_version)
+    и при совпадении отдается 304. Токен и версия читаются с primary: отстающая
+    реплика отдала бы 304 на устаревшую ленту.
+    """
+    async with AsyncSessionLocal() as db:
+        user_id = await crud_user.get_user_id_by_calendar_token_async(db, token)
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="Календарь не найден")
+        version = await crud_task.get_tasks_version_async(db, user_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Календарь не найден")
+    
+    data_version, last_modified = version
+    etag = f'W/"ics-{user_id}-{data_version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    async def body():
+        async with async_read_session() as db:
+            async for chunk in ics.stream_calendar(db, user_id):
+                yield chunk
+    
+    return StreamingResponse(body(), media_type=ics.CALENDAR_MEDIA_TYPE, headers=headers)
+
+
+@router.post("/import")
+async def import_tasks(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|ics)$", description="Формат тела запроса"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Импортировать задачи из тела запроса: NDJSON или CSV в формате экспорта
+    либо iCalendar (VEVENT/VTODO).
+    Тело разбирается по мере получения, задачи вставляются пакетами.
+    Записи, не прошедшие валидацию TaskCreate, пропускаются и перечисляются в errors.
+    """
+    return await task_io.import_tasks(db, current_user.id, request.stream(), format)
+
+
 @router.post("/", response_model=Task)
-def create_task(
+async def create_task(
     task: TaskCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Создать новую задачу
     """
-    return crud_task.create_task(db=db, task=task, user_id=current_user.id)
+    return await crud_task.create_task_async(db=db, task=task, user_id=current_user.id)
+
+
+@router.post("/bulk", response_model=List[Task])
+async def create_tasks_bulk(
+    payload: TaskBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Создать несколько задач с этапами одной транзакцией (например, импорт семестра).
+    Задачи возвращаются в порядке запроса.
+    """
+    return await crud_task.create_tasks_async(db=db, tasks=payload.tasks, user_id=current_user.id)
+
+
+@router.patch("/bulk", response_model=TaskBulkUpdateResult)
+async def update_tasks_bulk(
+    payload: TaskBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Обновить задачи по списку id и/или фильтру одним запросом.
+    В ответе — новые статус, приоритет и дедлайн по каждой задаче и не найденные id.
+    """
+    updated, not_found = await crud_task.update_tasks_bulk_async(
+        db=db, user_id=current_user.id, task_update=payload.changes,
+        ids=payload.ids, filters=payload.filter
+    )
+    return TaskBulkUpdateResult(updated=updated, not_found=not_found)
+
+
+@router.delete("/bulk", response_model=TaskBulkDeleteResult)
+async def delete_tasks_bulk(
+    payload: TaskBulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Удалить задачи по списку id и/или фильтру
+    """
+    deleted, not_found = await crud_task.delete_tasks_bulk_async(
+        db=db, user_id=current_user.id, ids=payload.ids, filters=payload.filter
+    )
+    return TaskBulkDeleteResult(deleted=deleted, not_found=not_found)
 
 
 @router.get("/{task_id}", response_model=Task)
-def read_task(
+async def read_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    etag: str = Depends(USER_ETAG)
 ) -> Any:
     """
-    Получить задачу по ID
+    Получить задачу по ID (с ETag, см. read_tasks)
     """
-    task = crud_task.get_task(db=db, task_id=task_id, user_id=current_user.id)
+    task = await crud_task.get_task_async(db=db, task_id=task_id, user_id=current_user.id)
     if not task:
         raise HTTPException(status_code=404, detail="Задача не найдена")
     return task
 
 
 @router.put("/{task_id}", response_model=Task)
-def update_task(
+async def update_task(
     task_id: int,
     task_update: TaskUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Обновить задачу
     """
-    task = crud_task.update_task(
+    task = await crud_task.update_task_async(
         db=db, task_id=task_id, user_id=current_user.id, task_update=task_update
     )
     if not task:
@@ -83,66 +331,86 @@ def update_task(
 
 
 @router.delete("/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Удалить задачу
     """
-    success = crud_task.delete_task(db=db, task_id=task_id, user_id=current_user.id)
+    success = await crud_task.delete_task_async(db=db, task_id=task_id, user_id=current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Задача не найдена")
     return {"message": "Задача удалена"}
 
 
 @router.get("/upcoming/list", response_model=List[Task])
-def read_upcoming_tasks(
+async def read_upcoming_tasks(
     days: int = Query(7, description="Количество дней вперед"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    include_steps: bool = Query(True, description="false — не загружать этапы (steps будет пустым)"),
+    view: str = Query("full", pattern="^(full|compact)$", description="compact — id, title, deadline, status, priority, color"),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую (важнее view)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Получить ближайшие задачи
     """
-    return crud_task.get_upcoming_tasks(db=db, user_id=current_user.id, days=days)
+    columns = parse_fields(fields, view, crud_task.TASK_FIELDS, crud_task.TASK_COMPACT_FIELDS)
+    tasks = await crud_task.get_upcoming_tasks_async(
+        db=db, user_id=current_user.id, days=days, include_steps=include_steps, columns=columns
+    )
+    if columns:
+        return rows_response(tasks, columns)
+    return TASK_LIST.response(tasks) if settings.FAST_JSON_RESPONSES else tasks
 
 
 @router.get("/overdue/list", response_model=List[Task])
-def read_overdue_tasks(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def read_overdue_tasks(
+    include_steps: bool = Query(True, description="false — не загружать этапы (steps будет пустым)"),
+    view: str = Query("full", pattern="^(full|compact)$", description="compact — id, title, deadline, status, priority, color"),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую (важнее view)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Получить просроченные задачи
     """
-    return crud_task.get_overdue_tasks(db=db, user_id=current_user.id)
+    columns = parse_fields(fields, view, crud_task.TASK_FIELDS, crud_task.TASK_COMPACT_FIELDS)
+    tasks = await crud_task.get_overdue_tasks_async(
+        db=db, user_id=current_user.id, include_steps=include_steps, columns=columns
+    )
+    if columns:
+        return rows_response(tasks, columns)
+    return TASK_LIST.response(tasks) if settings.FAST_JSON_RESPONSES else tasks
 
 
 @router.get("/stats/summary", response_model=TaskStats)
-def read_task_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def read_task_stats(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    etag: str = Depends(STATS_ETAG)
 ) -> Any:
     """
-    Получить статистику по задачам
+    Получить статистику по задачам.
+    ETag зависит и от времени: просрочка считается относительно текущего момента
     """
-    stats = crud_task.get_task_stats(db=db, user_id=current_user.id)
+    stats = await crud_task.get_task_stats_async(db=db, user_id=current_user.id)
     return TaskStats(**stats)
 
 
 @router.put("/steps/{step_id}/complete")
-def complete_task_step(
+async def complete_task_step(
     step_id: int,
     is_completed: bool,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> Any:
     """
     Отметить этап задачи как выполненный/невыполненный
     """
-    step = crud_task.update_task_step(db=db, step_id=step_id, is_completed=is_completed)
+    step = await crud_task.update_task_step_async(db=db, step_id=step_id, is_completed=is_completed)
     if not step:
         raise HTTPException(status_code=404, detail="Этап задачи не найден")
     return {"message": "Статус этапа обновлен"} 
\ No newline at end of file
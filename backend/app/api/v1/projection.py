@@ -0,0 +1,53 @@
+"""
+Выборочные поля списков (fields=, view=compact).
+
+Списки в компактном виде читаются из БД только нужными колонками и отдаются
+как есть: без ORM-объектов и без валидации полной схемы ответа.
+"""
+import enum
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from ...core.config import settings
+
+def parse_fields(
+    fields: Optional[str], view: str, allowed: Sequence[str], compact: Sequence[str]
+) -> Optional[List[str]]:
+    """
+    Список полей ответа или None для полного представления.
+    fields важнее view; id включается всегда.
+    """
+    if fields:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(allowed)}"
+            )
+    elif view == "compact":
+        requested = list(compact)
+    else:
+        return None
+    return list(dict.fromkeys(["id", *requested]))
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def rows_response(rows: Iterable[Any], fields: Sequence[str], headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """Ответ из строк выборки: только поля fields, в порядке fields"""
+    if settings.FAST_JSON_RESPONSES:
+        # orjson сам кодирует datetime и enum
+        content = [{name: getattr(row, name) for name in fields} for row in rows]
+        return ORJSONResponse(content=content, headers=headers)
+    content = [{name: _encode(getattr(row, name)) for name in fields} for row in rows]
+    return JSONResponse(content=content, headers=headers)
@@ -0,0 +1,29 @@
+"""
+Быстрая сериализация ответов (включается FAST_JSON_RESPONSES).
+
+По умолчанию FastAPI валидирует возвращенные ORM-объекты по response_model,
+превращает модели в dict и кодирует их json.dumps. Быстрый путь валидирует
+объекты один раз предкомпилированным TypeAdapter и сразу получает JSON-байты
+из pydantic-core; остальные ответы кодируются orjson.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import TypeAdapter
+
+from ...core.config import settings
+
+
+def default_response_class() -> Type[JSONResponse]:
+    return ORJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse
+
+
+class ListSerializer:
+    """Сериализатор списка схем, собранный один раз при импорте модуля эндпоинтов"""
+    
+    def __init__(self, item_schema: Type[Any]):
+        self.adapter = TypeAdapter(List[item_schema])
+    
+    def response(self, items: Iterable[Any], headers: Optional[Dict[str, str]] = None) -> Response:
+        models = self.adapter.validate_python(items, from_attributes=True)
+        return Response(self.adapter.dump_json(models), media_type="application/json", headers=headers)
@@ -0,0 +1,369 @@
+"""
+Кэш с выбираемым хранилищем: память процесса или Redis, общий для всех процессов.
+
+CACHE_BACKEND=memory — ограниченный LRU в памяти процесса (CACHE_MAX_ENTRIES
+записей на все пространства); redis — сервер по CACHE_REDIS_URL
+(подойдет любой сервер с протоколом Redis).
+
+Значения живут в пространствах имен (cache.namespace) со своим TTL и версией.
+invalidate() меняет версию, и все записи пространства разом становятся
+промахом без перебора ключей. Версия читается вместе со значением одним
+запросом (MGET). Версия — случайная метка, а не счетчик: если хранилище
+вытеснит ее, новая метка не совпадет ни с одной старой записью.
+
+get_or_load объединяет одновременные промахи по ключу в этом процессе
+(singleflight): загрузчик выполняется один раз, остальные ждут его результат.
+None не кэшируется.
+
+discard/delete не удаляют запись, а меняют поколение ключа — такую же
+случайную метку, как версия, в отдельном ключе. get_or_load не записывает
+результат, если версия или поколение сменились за время загрузки, а запись
+хранит поколение, прочитанное до загрузки: значение загрузки, начатой до
+сброса (в любом процессе), не возвращает старые данные, даже если сброс
+пришелся между проверкой и записью. Метка поколения живет вдвое дольше TTL
+пространства, чтобы пережить такие записи.
+
+Ошибки Redis не роняют запросы: чтение считается промахом, запись пропускается
+(cache_errors_total). В памяти хранятся сами объекты, поэтому значения должны
+быть неизменяемыми; в Redis — JSON, пространство с не-JSON значениями задает
+dumps/loads.
+"""
+import asyncio
+import json
+import logging
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .config import settings
+from .metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Чтения кэша по пространству имен (result=hit|miss)")
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Вытеснения из кэша в памяти процесса (reason=size|expired)")
+CACHE_ERRORS = Counter("cache_errors_total", "Ошибки хранилища кэша по операции")
+CACHE_ENTRIES = Gauge("cache_entries", "Записи в кэше в памяти процесса")
+
+_MISSING = object()
+
+
+def _new_version() -> str:
+    return secrets.token_hex(6)
+
+
+class MemoryCacheBackend:
+    """LRU на OrderedDict с TTL записей; блокировка держится только на операциях со словарем"""
+    serializes = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        CACHE_ENTRIES.set_function(lambda: len(self._entries))
+
+    def _get(self, key: str, now: float) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[key]
+            CACHE_EVICTIONS.inc(reason="expired")
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        self._entries[key] = (time.monotonic() + ttl if ttl else math.inf, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.inc(reason="size")
+
+    async def get_many(self, keys: Sequence[str]) -> List[Any]:
+        now = time.monotonic()
+        with self._lock:
+            return [self._get(key, now) for key in keys]
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._set(key, value, ttl)
+
+    async def add(self, key: str, value: Any) -> Any:
+        """Записать, если ключа нет; вернуть действующее значение"""
+        with self._lock:
+            current = self._get(key, time.monotonic())
+            if current is None:
+                self._set(key, value, None)
+                current = value
+            return current
+
+    def set_nowait(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Запись без ожидания — для синхронного кода (хуки сессии)"""
+        with self._lock:
+            self._set(key, value, ttl)
+
+    async def delete(self, keys: Sequence[str]) -> None:
+        self.discard(keys)
+
+    def discard(self, keys: Sequence[str]) -> None:
+        """Удаление без ожидания — для синхронного кода (хуки сессии)"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """
+    Общий кэш в Redis. Значения — JSON, TTL — PX; вытеснение при нехватке
+    памяти выполняет сам сервер по своей maxmemory-policy.
+    """
+    serializes = True
+
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        if client is None:
+            import redis.asyncio as redis  # необязательная зависимость, нужна только с CACHE_BACKEND=redis
+
+            # Короткие таймауты: недоступный Redis — это промах, а не зависший запрос
+            client = redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self._redis = client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get_many(self, keys: Sequence[str]) -> List[Any]:
+        self._loop = asyncio.get_running_loop()
+        values = await self._redis.mget(keys)
+        return [json.loads(value) if value is not None else None for value in values]
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._redis.set(key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    async def add(self, key: str, value: Any) -> Any:
+        await self._redis.set(key, json.dumps(value), nx=True)
+        current = await self._redis.get(key)
+        return json.loads(current) if current is not None else value
+
+    async def delete(self, keys: Sequence[str]) -> None:
+        await self._redis.delete(*keys)
+
+    def set_nowait(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Запись без ожидания — для синхронного кода (хуки сессии)"""
+        self._background("set", [key], lambda: self.set(key, value, ttl))
+
+    def discard(self, keys: Sequence[str]) -> None:
+        """Удаление без ожидания — для синхронного кода (хуки сессии)"""
+        self._background("discard", keys, lambda: self.delete(keys))
+
+    def _background(self, operation: str, keys: Sequence[str], func: Callable[[], Awaitable[None]]) -> None:
+        """
+        Запустить операцию, не дожидаясь ее. Из потока без цикла событий
+        операция передается в цикл, где работает клиент.
+        """
+        async def run():
+            try:
+                await func()
+            except Exception as e:
+                CACHE_ERRORS.inc(operation=operation)
+                logger.warning("Ошибка кэша (%s) для ключей %s: %s", operation, list(keys), e)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is not None and self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(run(), self._loop)
+            else:
+                logger.warning("Ключи кэша %s не изменены (%s): нет цикла событий, истекут по TTL", list(keys), operation)
+            return
+        task = loop.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class CacheNamespace:
+    """
+    Ключи пространства: {CACHE_KEY_PREFIX}{name}:{key}, версия — {prefix}{name}:_version,
+    поколение ключа — {prefix}{name}:_generation:{key}. Запись хранит
+    (версия, поколение, значение) и считается промахом, если одно из них сменилось.
+    """
+
+    def __init__(
+        self,
+        cache: "Cache",
+        name: str,
+        ttl: Optional[float],
+        dumps: Optional[Callable[[Any], Any]] = None,
+        loads: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.cache = cache
+        self.name = name
+        self.ttl = ttl
+        self._dumps = dumps
+        self._loads = loads
+        self._prefix = f"{settings.CACHE_KEY_PREFIX}{name}:"
+        self._version_key = f"{self._prefix}_version"
+        self._generation_ttl = 2 * ttl if ttl else None
+        self._hits = CACHE_REQUESTS.labels(namespace=name, result="hit")
+        self._misses = CACHE_REQUESTS.labels(namespace=name, result="miss")
+
+    def _key(self, key: Any) -> str:
+        return f"{self._prefix}{key}"
+
+    def _generation_key(self, key: Any) -> str:
+        return f"{self._prefix}_generation:{key}"
+
+    def _error(self, operation: str, error: Exception) -> None:
+        CACHE_ERRORS.inc(operation=operation)
+        logger.warning("Ошибка кэша (%s, %s): %s", self.name, operation, error)
+
+    async def _call(self, operation: str, coro: Awaitable, default: Any = None) -> Any:
+        try:
+            return await coro
+        except Exception as e:
+            self._error(operation, e)
+            return default
+
+    async def _lookup(self, key: Any) -> Tuple[Optional[str], Optional[str], Any]:
+        """(версия пространства, поколение ключа, значение или _MISSING)"""
+        backend = self.cache.backend
+        try:
+            # Поколение последним: в LRU оно свежее записи и вытесняется после нее
+            version, entry, generation = await backend.get_many(
+                [self._version_key, self._key(key), self._generation_key(key)]
+            )
+        except Exception as e:
+            self._error("get", e)
+            version = entry = generation = None
+        if version is None or entry is None or entry[0] != version or entry[1] != generation:
+            self._misses.inc()
+            return version, generation, _MISSING
+        self._hits.inc()
+        value = entry[2]
+        if backend.serializes and self._loads is not None:
+            value = self._loads(value)
+        return version, generation, value
+
+    async def _current(self, key: Any) -> Tuple[Optional[str], Optional[str]]:
+        """(версия пространства, поколение ключа); при ошибке хранилища (None, None)"""
+        keys = [self._version_key, self._generation_key(key)]
+        return tuple(await self._call("get", self.cache.backend.get_many(keys), (None, None)))
+
+    async def _ensure_version(self) -> Optional[str]:
+        return await self._call("set", self.cache.backend.add(self._version_key, _new_version()))
+
+    async def _store(self, key: Any, value: Any, ttl: Optional[float], version: str, generation: Optional[str]) -> None:
+        backend = self.cache.backend
+        if backend.serializes and self._dumps is not None:
+            value = self._dumps(value)
+        await self._call("set", backend.set(self._key(key), (version, generation, value), ttl or self.ttl))
+
+    async def get(self, key: Any, default: Any = None) -> Any:
+        _, _, value = await self._lookup(key)
+        return default if value is _MISSING else value
+
+    async def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        version, generation = await self._current(key)
+        if version is None:
+            version = await self._ensure_version()
+            if version is None:
+                return
+        await self._store(key, value, ttl, version, generation)
+
+    async def get_or_load(self, key: Any, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        version, generation, value = await self._lookup(key)
+        if value is not _MISSING:
+            return value
+        # Версия нужна до загрузки: созданная после нее не отличит invalidate() во время загрузки
+        if version is None:
+            version = await self._ensure_version()
+
+        async def load():
+            loaded = await loader()
+            # Сброс во время загрузки: значение могло устареть, и записывать его незачем.
+            # Проверка не атомарна с записью, но запись со старым поколением все равно промах
+            if loaded is not None and version is not None and await self._current(key) == (version, generation):
+                await self._store(key, loaded, ttl, version, generation)
+            return loaded
+
+        # Промах после сброса не ждет загрузку, начатую до него
+        return await self.cache.singleflight(f"{self._key(key)}@{version}:{generation}", load)
+
+    async def delete(self, key: Any) -> None:
+        await self._call(
+            "delete", self.cache.backend.set(self._generation_key(key), _new_version(), self._generation_ttl)
+        )
+
+    def discard(self, key: Any) -> None:
+        self.cache.backend.set_nowait(self._generation_key(key), _new_version(), self._generation_ttl)
+
+    async def invalidate(self) -> None:
+        """Сбросить все записи пространства"""
+        await self._call("invalidate", self.cache.backend.set(self._version_key, _new_version()))
+
+
+class Cache:
+    def __init__(self):
+        self._backend = None
+        self._flights: Dict[str, asyncio.Future] = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if settings.CACHE_BACKEND == "redis":
+                self._backend = RedisCacheBackend(settings.CACHE_REDIS_URL)
+            elif settings.CACHE_BACKEND == "memory":
+                self._backend = MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+            else:
+                raise ValueError(f"Неизвестный CACHE_BACKEND: {settings.CACHE_BACKEND}")
+        return self._backend
+
+    def use(self, backend=None) -> None:
+        """Заменить хранилище (None — выбрать заново по настройкам)"""
+        self._backend = backend
+
+    def namespace(
+        self,
+        name: str,
+        ttl: Optional[float] = None,
+        dumps: Optional[Callable[[Any], Any]] = None,
+        loads: Optional[Callable[[Any], Any]] = None,
+    ) -> CacheNamespace:
+        return CacheNamespace(self, name, ttl, dumps=dumps, loads=loads)
+
+    async def singleflight(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Один вызов func на ключ в этом процессе; параллельные вызовы ждут его результат"""
+        future = self._flights.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            # Первый вызов отменен вместе со своим запросом — загружаем сами
+            return await func()
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # ждущих может не быть — без предупреждения о непрочитанной ошибке
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._flights.pop(key, None)
+
+
+cache = Cache()
@@ -25,10 +25,104 @@ class Settings(BaseSettings):
         
         return f"postgresql://{user}:{password}@{host}:{port}/{database}"
     
+    # Async database (asyncpg) - по умолчанию строится из основного URL
+    DATABASE_ASYNC_URL: Optional[str] = None
+    
+    def get_async_database_url(self) -> str:
+        if self.DATABASE_ASYNC_URL:
+            return self.DATABASE_ASYNC_URL
+        return self._to_async_url(self.get_database_url())
+    
+    # Реплика только для чтения (опционально). Если задан DATABASE_READ_MAX_LAG_SECONDS,
+    # при отставании реплики больше этого значения чтение идет с основной БД
+    DATABASE_READ_URL: Optional[str] = None
+    DATABASE_READ_MAX_LAG_SECONDS: Optional[float] = None
+    DATABASE_READ_LAG_CHECK_INTERVAL: float = 1.0  # как часто перепроверять лаг, секунд
+    
+    def get_async_database_read_url(self) -> Optional[str]:
+        if not self.DATABASE_READ_URL:
+            return None
+        return self._to_async_url(self.DATABASE_READ_URL)
+    
+    @staticmethod
+    def _to_async_url(url: str) -> str:
+        for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+            if url.startswith(prefix):
+                return "postgresql+asyncpg://" + url[len(prefix):]
+        return url
+    
+    # Пулы соединений. У каждого движка свой пул, и один процесс (воркер uvicorn)
+    # держит до pool_size + max_overflow соединений каждого движка:
+    #   DB_POOL_SIZE + DB_MAX_OVERFLOW — async-движок primary (почти все эндпоинты);
+    #   SYNC_DB_POOL_SIZE + SYNC_DB_MAX_OVERFLOW — sync-движок primary (sync-эндпоинты,
+    #     фоновые задачи и планировщик без своего пула);
+    #   READ_DB_POOL_SIZE + READ_DB_MAX_OVERFLOW — реплика, только с DATABASE_READ_URL;
+    #   SCHEDULER_DB_POOL_SIZE + SCHEDULER_DB_MAX_OVERFLOW — планировщик, если пул задан.
+    # По умолчанию это до 15 + 5 = 20 соединений с primary на воркер
+    # (db_connection_budget); max_connections Postgres должен покрывать их сумму по воркерам.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    SYNC_DB_POOL_SIZE: int = 2
+    SYNC_DB_MAX_OVERFLOW: int = 3
+    READ_DB_POOL_SIZE: int = 5
+    READ_DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # секунд ожидания свободного соединения
+    DB_POOL_PRE_PING: bool = True  # проверять соединение перед выдачей из пула
+    DB_POOL_RECYCLE: int = 1800  # пересоздавать соединения старше N секунд (-1 — никогда)
+    
+    # Отдельный пул для фонового планировщика (0 — использовать sync-пул)
+    SCHEDULER_DB_POOL_SIZE: int = 0
+    SCHEDULER_DB_MAX_OVERFLOW: int = 2
+    
+    def db_connection_budget(self) -> dict:
+        """Наибольшее число соединений одного процесса: {"primary": ..., "replica": ...}"""
+        primary = self.DB_POOL_SIZE + self.DB_MAX_OVERFLOW + self.SYNC_DB_POOL_SIZE + self.SYNC_DB_MAX_OVERFLOW
+        if self.SCHEDULER_DB_POOL_SIZE > 0:
+            primary += self.SCHEDULER_DB_POOL_SIZE + self.SCHEDULER_DB_MAX_OVERFLOW
+        replica = self.READ_DB_POOL_SIZE + self.READ_DB_MAX_OVERFLOW if self.DATABASE_READ_URL else 0
+        return {"primary": primary, "replica": replica}
+    
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    USER_CACHE_TTL_SECONDS: int = 60  # запись текущего пользователя в кэше (пространство user)
+    TOKEN_CACHE_SIZE: int = 10000  # проверенных JWT в кэше; 0 — проверять каждый раз
+    
+    # Отзыв access-токенов (services/token_revocation.py)
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 10  # как часто процесс дочитывает новые отзывы
+    TOKEN_REVOCATION_REBUILD_SECONDS: int = 3600  # полная пересборка фильтра без истекших токенов
+    TOKEN_REVOCATION_FILTER_CAPACITY: int = 100000  # отзывов до пересборки с большим размером
+    TOKEN_REVOCATION_FILTER_ERROR_RATE: float = 0.001  # доля ложных попаданий (проверяются по БД)
+    
+    # Кэш (core/cache.py)
+    CACHE_BACKEND: str = "memory"  # memory — в памяти процесса, redis — общий для всех процессов
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "planner:"
+    CACHE_MAX_ENTRIES: int = 50000  # записей в кэше в памяти (LRU на все пространства)
+    
+    # Хеширование паролей (core/hashing.py)
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # thread или process
+    PASSWORD_HASH_WORKERS: int = 2  # одновременных хеширований
+    PASSWORD_HASH_MAX_PENDING: int = 100  # ожидающих сверх этого — 503
+    # Стоимость bcrypt для новых хешей, одна на все процессы; подобрать под железо:
+    # python -m app.core.hashing --target-ms 250 (меньше BCRYPT_ROUNDS не предлагает)
+    BCRYPT_ROUNDS: int = 12
+    
+    # Ограничение попыток входа (services/login_throttle.py)
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_FAILURE_WINDOW_SECONDS: int = 900  # скользящее окно подсчета неудач
+    LOGIN_EMAIL_MAX_FAILURES: int = 5
+    LOGIN_IP_MAX_FAILURES: int = 20
+    LOGIN_LOCKOUT_BASE_SECONDS: int = 60  # первая блокировка, дальше удваивается
+    LOGIN_LOCKOUT_MAX_SECONDS: int = 3600
+    LOGIN_THROTTLE_MAX_KEYS: int = 100000  # ключей в памяти процесса
+    LOGIN_THROTTLE_REDIS_URL: Optional[str] = None  # общее состояние для всех процессов
+    
+    # Прокси, которым доверяются X-Forwarded-For / X-Real-IP (адреса и сети, core/proxies.py).
+    # nginx на хосте обращается к контейнеру через шлюз docker-сети (172.16.0.0/12)
+    TRUSTED_PROXIES: list[str] = ["127.0.0.1", "::1", "172.16.0.0/12"]
     
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = ["http://localhost:3000"]
@@ -64,6 +158,29 @@ class Settings(BaseSettings):
     FRONTEND_URL: str = "http://localhost:3000"
     BACKEND_URL: str = "http://localhost:8000"
     
+    # Метрики Prometheus на /metrics
+    METRICS_ENABLED: bool = True
+    
+    # Учет SQL-запросов на HTTP-запрос/фоновую задачу
+    QUERY_STATS_ENABLED: bool = True
+    QUERY_STATS_HEADERS: bool = True  # X-DB-Query-Count / X-DB-Time-Ms в ответах
+    N_PLUS_ONE_THRESHOLD: int = 5  # повторов одного выражения до предупреждения
+    QUERY_STATS_LOG_THRESHOLD: int = 20  # итог с таким числом SQL и больше пишется в лог на уровне INFO (0 — всегда)
+    
+    # Быстрая сериализация: orjson по умолчанию, списки через предкомпилированные TypeAdapter
+    FAST_JSON_RESPONSES: bool = False
+    
+    # Условные GET: ETag статистики меняется не реже этого интервала (просрочка и streak зависят от времени)
+    STATS_ETAG_WINDOW_SECONDS: int = 60
+    
+    # Кэш каталога достижений в памяти процесса
+    ACHIEVEMENT_CATALOG_TTL_SECONDS: int = 300
+    
+    # Экспорт/импорт задач
+    TASK_EXPORT_BATCH_SIZE: int = 1000  # строк за одну выборку из серверного курсора
+    TASK_IMPORT_BATCH_SIZE: int = 2000  # задач в одной вставке
+    TASK_CALENDAR_MAX_DAYS: int = 93  # максимальный диапазон /tasks/calendar
+    
     class Config:
         env_file = ".env"
         # Переменные окружения имеют приоритет над .env файлом
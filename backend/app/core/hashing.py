@@ -0,0 +1,152 @@
+"""
+Хеширование паролей вне потоков обработки запросов.
+
+bcrypt занимает сотни миллисекунд CPU, поэтому хеширование и проверка пароля
+выполняются в отдельном ограниченном пуле (потоки или процессы,
+PASSWORD_HASH_EXECUTOR) с собственным лимитом: не больше PASSWORD_HASH_WORKERS
+одновременно и не больше PASSWORD_HASH_MAX_PENDING в очереди — сверх лимита
+PasswordHashingBusy (эндпоинты отвечают 503). Время ожидания в очереди
+и время хеширования пишутся в метрики.
+
+Стоимость bcrypt — BCRYPT_ROUNDS, одна на все процессы. Подобрать ее под железо
+можно один раз: python -m app.core.hashing --target-ms 250 предлагает значение
+для конфигурации, но не меньше текущего BCRYPT_ROUNDS. Хеши меньшей стоимости
+перехешируются при успешном входе (needs_rehash), более дорогие не трогаются —
+стоимость хешей со временем только растет.
+"""
+import argparse
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from passlib.hash import bcrypt
+
+from .config import settings
+from .metrics import Counter, Gauge, Summary
+
+logger = logging.getLogger(__name__)
+
+HASH_QUEUE_SECONDS = Summary("password_hash_queue_seconds", "Ожидание свободного исполнителя хеширования")
+HASH_SECONDS = Summary("password_hash_seconds", "Время хеширования/проверки пароля по операции")
+HASH_PENDING = Gauge("password_hash_pending", "Операции хеширования в работе и в очереди")
+HASH_REJECTED = Counter("password_hash_rejected_total", "Операции, отклоненные из-за переполненной очереди")
+
+MAX_BCRYPT_ROUNDS = 16
+
+
+class PasswordHashingBusy(Exception):
+    """Очередь хеширования заполнена"""
+
+
+# Функции исполнителя — верхнего уровня, чтобы их можно было передать в пул процессов
+def bcrypt_hash(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.verify(password, hashed_password)
+    except (ValueError, TypeError):
+        return False
+
+
+def _timed(func: Callable, *args) -> Tuple[float, float, Any]:
+    """(начало, длительность, результат); время — time.time(), общее для процессов"""
+    started = time.time()
+    result = func(*args)
+    return started, time.time() - started, result
+
+
+def bcrypt_rounds(hashed_password: str) -> Optional[int]:
+    try:
+        return bcrypt.from_string(hashed_password).rounds
+    except (ValueError, TypeError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.rounds = settings.BCRYPT_ROUNDS
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._dummy_hash: Optional[str] = None
+        HASH_PENDING.set_function(lambda: self._pending)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            if settings.PASSWORD_HASH_EXECUTOR == "process":
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, operation: str, func: Callable, *args) -> Any:
+        if self._pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_PENDING:
+            HASH_REJECTED.inc(operation=operation)
+            raise PasswordHashingBusy()
+        self._pending += 1
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            started, duration, result = await loop.run_in_executor(self.executor, _timed, func, *args)
+        finally:
+            self._pending -= 1
+        HASH_QUEUE_SECONDS.observe(max(0.0, started - submitted), operation=operation)
+        HASH_SECONDS.observe(duration, operation=operation)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", bcrypt_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _verify, password, hashed_password)
+
+    async def verify_dummy(self, password: str) -> bool:
+        """
+        Проверка против фиктивного хеша текущей стоимости: ответ для несуществующего
+        email занимает столько же времени, сколько для существующего. Всегда False.
+        """
+        if self._dummy_hash is None or bcrypt_rounds(self._dummy_hash) != self.rounds:
+            self._dummy_hash = await self.hash("dummy-password-for-unknown-email")
+        await self._run("verify", _verify, password, self._dummy_hash)
+        return False
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Хеш слабее текущих параметров; более дорогой хеш не понижаем"""
+        rounds = bcrypt_rounds(hashed_password)
+        return rounds is None or rounds < self.rounds
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+def recommend_rounds(target_ms: float, minimum: Optional[int] = None) -> Tuple[int, float]:
+    """
+    Стоимость bcrypt, при которой хеширование на этой машине занимает около target_ms,
+    но не меньше minimum (по умолчанию BCRYPT_ROUNDS): (раунды, мс на minimum).
+    Замер на minimum, каждый следующий раунд удваивает время.
+    """
+    minimum = minimum or settings.BCRYPT_ROUNDS
+    bcrypt_hash("calibration", minimum)  # прогрев
+    _, duration, _ = _timed(bcrypt_hash, "calibration", minimum)
+    target = target_ms / 1000
+    extra = math.floor(math.log2(target / duration)) if duration < target else 0
+    return min(MAX_BCRYPT_ROUNDS, minimum + extra), duration * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Подобрать BCRYPT_ROUNDS под время хеширования")
+    parser.add_argument("--target-ms", type=float, default=250)
+    args = parser.parse_args()
+    rounds, measured_ms = recommend_rounds(args.target_ms)
+    print(f"BCRYPT_ROUNDS={rounds}  # {measured_ms:.0f} мс при {settings.BCRYPT_ROUNDS}, цель {args.target_ms:.0f} мс")
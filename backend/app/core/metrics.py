@@ -0,0 +1,166 @@
+"""
+Простые метрики процесса в формате Prometheus (text exposition).
+
+Без внешних зависимостей: счетчики, gauge (в том числе вычисляемые при
+чтении) и summary (count/sum). Метрики регистрируются в REGISTRY при
+создании и отдаются эндпоинтом /metrics.
+"""
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Dict[str, str]) -> LabelValues:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelValues) -> str:
+    if not key:
+        return ""
+    inner = ",".join('%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in key)
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def samples(self) -> Iterable[Tuple[str, LabelValues, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels_key(labels), 0)
+
+    def labels(self, **labels) -> "BoundCounter":
+        """Счетчик с заранее вычисленными метками — для горячих путей"""
+        return BoundCounter(self, _labels_key(labels))
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, key, value
+
+
+class BoundCounter:
+    __slots__ = ("_counter", "_key")
+
+    def __init__(self, counter: Counter, key: LabelValues):
+        self._counter = counter
+        self._key = key
+
+    def inc(self, amount: float = 1) -> None:
+        counter = self._counter
+        with counter._lock:
+            counter._values[self._key] = counter._values.get(self._key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[_labels_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, func: Callable[[], float], **labels) -> None:
+        """Значение вычисляется в момент чтения метрик"""
+        self._functions[_labels_key(labels)] = func
+
+    def value(self, **labels) -> float:
+        key = _labels_key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0)
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, key, value
+        for key, func in list(self._functions.items()):
+            yield self.name, key, func()
+
+
+class Summary(Metric):
+    """Количество и сумма наблюдений (например, времени ожидания)"""
+    kind = "summary"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._count: Dict[LabelValues, int] = {}
+        self._sum: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._count[key] = self._count.get(key, 0) + 1
+            self._sum[key] = self._sum.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        return self._count.get(_labels_key(labels), 0)
+
+    def total(self, **labels) -> float:
+        return self._sum.get(_labels_key(labels), 0.0)
+
+    def samples(self):
+        for key in list(self._count):
+            yield f"{self.name}_count", key, self._count[key]
+            yield f"{self.name}_sum", key, self._sum[key]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
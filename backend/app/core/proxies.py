@@ -0,0 +1,59 @@
+"""
+Адрес клиента за обратным прокси.
+
+Приложение работает за nginx, поэтому request.client — адрес прокси, общий
+для всех пользователей. Заголовки X-Forwarded-For / X-Real-IP учитываются,
+только если запрос пришел от доверенного прокси (TRUSTED_PROXIES): иначе
+клиент подставил бы в них любой адрес. X-Forwarded-For читается справа налево
+до первого адреса, не принадлежащего доверенным прокси, — левее него значения
+задает сам клиент.
+"""
+import ipaddress
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+from starlette.requests import HTTPConnection
+
+from .config import settings
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+Address = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+@lru_cache(maxsize=8)
+def _networks(proxies: Tuple[str, ...]) -> Tuple[Network, ...]:
+    return tuple(ipaddress.ip_network(proxy.strip(), strict=False) for proxy in proxies)
+
+
+def _parse(value: Optional[str]) -> Optional[Address]:
+    try:
+        return ipaddress.ip_address(value.strip()) if value else None
+    except ValueError:
+        return None
+
+
+def _trusted(address: Address) -> bool:
+    return any(address in network for network in _networks(tuple(settings.TRUSTED_PROXIES)))
+
+
+def client_ip(connection: HTTPConnection) -> Optional[str]:
+    """Адрес клиента с учетом заголовков доверенного прокси; None, если адрес неизвестен"""
+    peer_host = connection.client.host if connection.client else None
+    peer = _parse(peer_host)
+    if peer is None or not _trusted(peer):
+        return peer_host
+
+    forwarded = connection.headers.get("x-forwarded-for")
+    if forwarded:
+        client = peer
+        for value in reversed(forwarded.split(",")):
+            address = _parse(value)
+            if address is None:
+                break
+            client = address
+            if not _trusted(address):
+                break
+        return str(client)
+
+    real_ip = _parse(connection.headers.get("x-real-ip"))
+    return str(real_ip) if real_ip is not None else peer_host
@@ -1,13 +1,24 @@
+import hashlib
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
+from .hashing import bcrypt_hash, password_hasher
+from .metrics import Counter
+
+TOKEN_CACHE_REQUESTS = Counter("token_cache_requests_total", "Проверки JWT через кэш (result=hit|miss)")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    """JWT с exp и уникальным jti — по нему токен можно отозвать (services/token_revocation.py)"""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -15,21 +26,90 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[dict]:
+class VerifiedTokenCache:
+    """
+    Проверенные токены: sha256 токена -> (exp, payload).
+    Запись живет до exp токена; при переполнении вытесняется самая давняя по обращению.
+    Неверные токены не кэшируются.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+        return None
+
+    def put(self, key: bytes, payload: dict) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return  # без exp токен бессрочный — такой не кэшируем
+        with self._lock:
+            self._entries[key] = (float(exp), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(max_size=settings.TOKEN_CACHE_SIZE)
+
+
+def _decode_token(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         return None
 
 
+def verify_token(token: str) -> Optional[dict]:
+    """
+    Payload проверенного токена или None.
+    Повторная проверка того же токена берет payload из token_cache вместо jwt.decode.
+    """
+    if not settings.TOKEN_CACHE_SIZE:
+        return _decode_token(token)
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        TOKEN_CACHE_REQUESTS.inc(result="hit")
+        return dict(payload)
+    TOKEN_CACHE_REQUESTS.inc(result="miss")
+    payload = _decode_token(token)
+    if payload is not None:
+        token_cache.put(key, payload)
+        return dict(payload)
+    return None
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password) 
\ No newline at end of file
+    """Синхронный вариант для скриптов; эндпоинты используют password_hasher"""
+    return bcrypt_hash(password, password_hasher.rounds)
+
+
+def create_calendar_token() -> str:
+    """
+    Случайный токен ленты календаря: календари не умеют передавать Authorization,
+    поэтому токен стоит в адресе. Хранится в users.calendar_token и меняется сбросом.
+    """
+    return secrets.token_urlsafe(32)
@@ -1,15 +1,19 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_, desc, func, distinct
 from ..db.models.goal import Achievement, UserAchievement, Goal
 from ..db.models.task import Task, TaskStatus
 from ..db.models.user import User
+from ..schemas.achievement import Achievement as AchievementSchema, UserAchievement as UserAchievementSchema
+from ..services.achievement_catalog import catalog
+from .counters import apply_counter_deltas, get_user_counters
 from datetime import datetime, timedelta
 
 
-def get_all_achievements(db: Session) -> List[Achievement]:
-    """Получить все доступные достижения"""
-    return db.query(Achievement).order_by(Achievement.points).all()
+def get_all_achievements(db: Session) -> List[AchievementSchema]:
+    """Получить все доступные достижения (из кэша каталога)"""
+    return list(catalog.get(db).achievements)
 
 
 def get_user_achievements(db: Session, user_id: int) -> List[UserAchievement]:
@@ -38,64 +42,46 @@ def award_achievement(db: Session, user_id: int, achievement_id: int) -> UserAch
         earned_at=datetime.now()
     )
     db.add(user_achievement)
+    achievement = catalog.lookup(db, [achievement_id]).by_id.get(achievement_id)
+    apply_counter_deltas(db, {user_id: {
+        "total_points": (achievement.points or 0) if achievement else 0,
+        "achievements_count": 1,
+    }})
     db.commit()
     db.refresh(user_achievement)
     return user_achievement
 
 
 def get_user_stats(db: Session, user_id: int) -> Dict[str, Any]:
-    """Получить статистику пользователя для достижений"""
-    # Базовая статистика задач
-    total_tasks = db.query(Task).filter(Task.user_id == user_id).count()
-    completed_tasks = db.query(Task).filter(
-        and_(Task.user_id == user_id, Task.status == TaskStatus.completed)
-    ).count()
-    pending_tasks = db.query(Task).filter(
-        and_(Task.user_id == user_id, Task.status == TaskStatus.pending)
-    ).count()
-    overdue_tasks = db.query(Task).filter(
-        and_(Task.user_id == user_id, Task.status == TaskStatus.overdue)
-    ).count()
-    
-    # Статистика целей
-    completed_goals = db.query(Goal).filter(
-        and_(Goal.user_id == user_id, Goal.is_completed == True)
-    ).count()
-    
-    # Подсчет очков
-    user_achievements = db.query(UserAchievement).filter(
-        UserAchievement.user_id == user_id
-    ).all()
+    """
+    Получить статистику пользователя для достижений.
+    Счетчики читаются из user_counters по первичному ключу; за тот же запрос
+    считается streak по частичному индексу (user_id, completed_at).
+    """
+    # Подсчет streak (упрощенная версия - количество выполненных задач за последние 7 дней)
+    week_ago = datetime.now() - timedelta(days=7)
+    recent_completed = db.query(func.count(Task.id)).filter(
+        Task.user_id == user_id,
+        Task.status == TaskStatus.completed,
+        Task.completed_at >= week_ago
+    ).scalar_subquery()
     
-    total_points = 0
-    for ua in user_achievements:
-        achievement = db.query(Achievement).filter(Achievement.id == ua.achievement_id).first()
-        if achievement:
-            total_points += achievement.points
+    counters, streak = get_user_counters(db, user_id, recent_completed)
     
     # Расчет completion_rate
-    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-    
-    # Подсчет streak (упрощенная версия - количество выполненных задач за последние 7 дней)
-    week_ago = datetime.now() - timedelta(days=7)
-    recent_completed = db.query(Task).filter(
-        and_(
-            Task.user_id == user_id,
-            Task.status == TaskStatus.completed,
-            Task.completed_at >= week_ago
-        )
-    ).count()
+    total_tasks = counters.total_tasks
+    completion_rate = (counters.completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
     
     return {
         "total_tasks": total_tasks,
-        "completed_tasks": completed_tasks,
-        "pending_tasks": pending_tasks,
-        "overdue_tasks": overdue_tasks,
+        "completed_tasks": counters.completed_tasks,
+        "pending_tasks": counters.pending_tasks,
+        "overdue_tasks": counters.overdue_tasks,
         "completion_rate": round(completion_rate, 1),
-        "current_streak": recent_completed,  # Упрощенная версия streak
-        "total_points": total_points,
-        "achievements_count": len(user_achievements),
-        "completed_goals": completed_goals
+        "current_streak": streak,  # Упрощенная версия streak
+        "total_points": counters.total_points,
+        "achievements_count": counters.achievements_count,
+        "completed_goals": counters.completed_goals
     }
 
 
@@ -108,7 +94,10 @@ def check_and_award_achievements(db: Session, user_id: int) -> List[UserAchievem
     all_achievements = get_all_achievements(db)
     
     # Получаем уже полученные достижения
-    earned_achievement_ids = {ua.achievement_id for ua in get_user_achievements(db, user_id)}
+    earned_achievement_ids = {
+        achievement_id for achievement_id, in
+        db.query(UserAchievement.achievement_id).filter(UserAchievement.user_id == user_id)
+    }
     
     for achievement in all_achievements:
         if achievement.id in earned_achievement_ids:
@@ -130,4 +119,47 @@ def check_and_award_achievements(db: Session, user_id: int) -> List[UserAchievem
             new_achievement = award_achievement(db, user_id, achievement.id)
             new_achievements.append(new_achievement)
     
-    return new_achievements 
\ No newline at end of file
+    return new_achievements
+
+
+# Асинхронные версии для async-роутеров (выполняются через AsyncSession.run_sync).
+# Достижение для сериализации UserAchievement берется из кэша каталога,
+# а не ленивой загрузкой связи achievement.
+def _with_catalog(db: Session, user_achievements: List[UserAchievement]) -> List[UserAchievementSchema]:
+    snapshot = catalog.lookup(db, {ua.achievement_id for ua in user_achievements})
+    return [
+        UserAchievementSchema(
+            id=ua.id,
+            user_id=ua.user_id,
+            achievement_id=ua.achievement_id,
+            earned_at=ua.earned_at,
+            achievement=snapshot.by_id[ua.achievement_id],
+        )
+        for ua in user_achievements
+    ]
+
+
+async def get_all_achievements_async(db: AsyncSession) -> List[AchievementSchema]:
+    return await db.run_sync(get_all_achievements)
+
+
+async def get_user_achievements_async(db: AsyncSession, user_id: int) -> List[UserAchievementSchema]:
+    return await db.run_sync(
+        lambda session: _with_catalog(session, get_user_achievements(session, user_id))
+    )
+
+
+async def award_achievement_async(db: AsyncSession, user_id: int, achievement_id: int) -> UserAchievementSchema:
+    return await db.run_sync(
+        lambda session: _with_catalog(session, [award_achievement(session, user_id, achievement_id)])[0]
+    )
+
+
+async def get_user_stats_async(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    return await db.run_sync(get_user_stats, user_id)
+
+
+async def check_and_award_achievements_async(db: AsyncSession, user_id: int) -> List[UserAchievementSchema]:
+    return await db.run_sync(
+        lambda session: _with_catalog(session, check_and_award_achievements(session, user_id))
+    )
@@ -0,0 +1,243 @@
+"""
+Инкрементальные счетчики пользователя (таблица user_counters).
+
+Изменения задач, целей и достижений передают сюда дельты, которые
+применяются одним UPSERT в той же транзакции, что и само изменение.
+Тот же UPSERT увеличивает data_version — версию данных пользователя для ETag.
+reconcile_all_counters пересчитывает счетчики по исходным таблицам
+и исправляет расхождения под блокировкой строки счетчиков.
+"""
+from typing import Dict, List, Optional
+from sqlalchemy import func, literal_column, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..db.models.goal import Achievement, Goal, UserAchievement
+from ..db.models.task import Task, TaskPriority, TaskStatus
+from ..db.models.user import User
+from ..db.models.user_counters import UserCounters
+
+COUNTER_FIELDS = (
+    "total_tasks", "pending_tasks", "in_progress_tasks", "completed_tasks", "overdue_tasks",
+    "flagged_overdue_tasks", "yearly_debts", "semester_debts", "completed_goals",
+    "total_points", "achievements_count",
+)
+
+Deltas = Dict[str, int]
+
+
+def task_snapshot(task: Task) -> tuple:
+    """Поля задачи, от которых зависят счетчики"""
+    return task.status, task.priority, task.is_overdue
+
+
+def task_contribution(status: Optional[TaskStatus], priority: TaskPriority, is_overdue: Optional[bool]) -> Deltas:
+    """Вклад одной задачи в счетчики"""
+    # status=None у еще не сохраненной задачи: при вставке применится default pending
+    status = status or TaskStatus.pending
+    return {
+        "total_tasks": 1,
+        "pending_tasks": int(status == TaskStatus.pending),
+        "in_progress_tasks": int(status == TaskStatus.in_progress),
+        "completed_tasks": int(status == TaskStatus.completed),
+        "overdue_tasks": int(status == TaskStatus.overdue),
+        "flagged_overdue_tasks": int(bool(is_overdue)),
+        "yearly_debts": int(priority == TaskPriority.yearly_debt),
+        "semester_debts": int(priority == TaskPriority.semester_debt),
+    }
+
+
+def task_deltas(before: Optional[tuple], after: Optional[tuple]) -> Deltas:
+    """Дельта счетчиков при переходе задачи из before в after (None — задачи нет)"""
+    deltas: Deltas = {}
+    if after is not None:
+        for field, value in task_contribution(*after).items():
+            deltas[field] = deltas.get(field, 0) + value
+    if before is not None:
+        for field, value in task_contribution(*before).items():
+            deltas[field] = deltas.get(field, 0) - value
+    return {field: value for field, value in deltas.items() if value}
+
+
+def merge_deltas(target: Dict[int, Deltas], user_id: int, deltas: Deltas) -> None:
+    user_deltas = target.setdefault(user_id, {})
+    for field, value in deltas.items():
+        user_deltas[field] = user_deltas.get(field, 0) + value
+
+
+def apply_counter_deltas(db: Session, deltas_by_user: Dict[int, Deltas]) -> None:
+    """
+    Применить дельты одним UPSERT и увеличить data_version каждого пользователя
+    из deltas_by_user — в том числе с пустыми дельтами: любая запись меняет данные.
+    Коммит выполняет вызывающий код — вместе с изменением, которое эти дельты описывают,
+    поэтому вызывать нужно после самого изменения.
+
+    Если строки счетчиков еще не было (пользователь или задачи созданы в обход
+    приложения, до миграции), UPSERT вставил бы дельту как абсолютное значение.
+    Такие строки сразу пересчитываются по исходным таблицам вместе с изменением
+    этой транзакции (редкий путь: обычно строка уже есть, и лишних запросов нет).
+    """
+    rows = [
+        {"user_id": user_id, "data_version": 1, **{field: deltas.get(field, 0) for field in COUNTER_FIELDS}}
+        for user_id, deltas in deltas_by_user.items()
+    ]
+    if not rows:
+        return
+    stmt = pg_insert(UserCounters).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserCounters.user_id],
+        set_={
+            **{field: getattr(UserCounters, field) + stmt.excluded[field] for field in COUNTER_FIELDS},
+            "data_version": UserCounters.data_version + 1,
+            "updated_at": func.now(),
+        },
+    ).returning(UserCounters.user_id, literal_column("xmax = 0").label("inserted"))
+    inserted = [row.user_id for row in db.execute(stmt) if row.inserted]
+    if inserted:
+        db.flush()
+        for user_id in inserted:
+            _repair_user_counters(db, user_id)
+
+
+def bump_data_version(db: Session, user_id: int) -> None:
+    """Отметить изменение данных пользователя, не затрагивающее счетчики"""
+    apply_counter_deltas(db, {user_id: {}})
+
+
+def get_data_version(db: Session, user_id: int) -> int:
+    """Версия данных пользователя — поиск по первичному ключу, 0 если записей еще не было"""
+    version = db.query(UserCounters.data_version).filter(UserCounters.user_id == user_id).scalar()
+    return version or 0
+
+
+def _counters_select(user_id: Optional[int] = None):
+    """Счетчики, посчитанные заново по исходным таблицам"""
+    def scoped(query, column):
+        return query.where(column == user_id) if user_id is not None else query
+
+    tasks = scoped(select(
+        Task.user_id,
+        func.count(Task.id).label("total_tasks"),
+        func.count(Task.id).filter(Task.status == TaskStatus.pending).label("pending_tasks"),
+        func.count(Task.id).filter(Task.status == TaskStatus.in_progress).label("in_progress_tasks"),
+        func.count(Task.id).filter(Task.status == TaskStatus.completed).label("completed_tasks"),
+        func.count(Task.id).filter(Task.status == TaskStatus.overdue).label("overdue_tasks"),
+        func.count(Task.id).filter(Task.is_overdue == True).label("flagged_overdue_tasks"),
+        func.count(Task.id).filter(Task.priority == TaskPriority.yearly_debt).label("yearly_debts"),
+        func.count(Task.id).filter(Task.priority == TaskPriority.semester_debt).label("semester_debts"),
+    ), Task.user_id).group_by(Task.user_id).subquery()
+
+    goals = scoped(select(
+        Goal.user_id,
+        func.count(Goal.id).label("completed_goals"),
+    ).where(Goal.is_completed == True), Goal.user_id).group_by(Goal.user_id).subquery()
+
+    achievements = scoped(select(
+        UserAchievement.user_id,
+        func.coalesce(func.sum(Achievement.points), 0).label("total_points"),
+        func.count(UserAchievement.id).label("achievements_count"),
+    ).outerjoin(Achievement, Achievement.id == UserAchievement.achievement_id),
+        UserAchievement.user_id).group_by(UserAchievement.user_id).subquery()
+
+    columns = {"total_tasks": tasks, "pending_tasks": tasks, "in_progress_tasks": tasks,
+               "completed_tasks": tasks, "overdue_tasks": tasks, "flagged_overdue_tasks": tasks,
+               "yearly_debts": tasks, "semester_debts": tasks, "completed_goals": goals,
+               "total_points": achievements, "achievements_count": achievements}
+    query = select(
+        User.id.label("user_id"),
+        *[func.coalesce(source.c[field], 0).label(field) for field, source in columns.items()],
+    ).select_from(User).outerjoin(
+        tasks, tasks.c.user_id == User.id
+    ).outerjoin(
+        goals, goals.c.user_id == User.id
+    ).outerjoin(
+        achievements, achievements.c.user_id == User.id
+    )
+    return scoped(query, User.id)
+
+
+def _drifted_user_ids(db: Session) -> List[int]:
+    """
+    Пользователи, чьи счетчики расходятся с пересчитанными (или строки счетчиков нет).
+    Только чтение: результат — кандидаты, каждый перепроверяется под блокировкой строки.
+    """
+    recalculated = _counters_select().subquery()
+    stmt = select(recalculated.c.user_id).outerjoin(
+        UserCounters, UserCounters.user_id == recalculated.c.user_id
+    ).where(or_(
+        UserCounters.user_id.is_(None),
+        tuple_(*[getattr(UserCounters, f) for f in COUNTER_FIELDS])
+        != tuple_(*[recalculated.c[f] for f in COUNTER_FIELDS]),
+    ))
+    return list(db.scalars(stmt))
+
+
+def _repair_user_counters(db: Session, user_id: int) -> bool:
+    """
+    Пересчитать счетчики пользователя под блокировкой его строки user_counters.
+    Пока строка заблокирована, UPSERT дельт из параллельных транзакций ждет:
+    транзакция, закоммиченная до пересчета, в нем уже учтена, а незакоммиченная
+    применит свою дельту поверх исправленного значения. Возвращает True, если
+    счетчики разошлись и были исправлены. Коммит — в вызывающем коде.
+    """
+    db.execute(pg_insert(UserCounters).values(user_id=user_id).on_conflict_do_nothing(
+        index_elements=[UserCounters.user_id]
+    ))
+    current = db.execute(
+        select(*[getattr(UserCounters, f) for f in COUNTER_FIELDS])
+        .where(UserCounters.user_id == user_id).with_for_update()
+    ).mappings().one()
+    # Новый снимок: пересчет видит все, что закоммичено до получения блокировки
+    recalculated = db.execute(_counters_select(user_id)).mappings().first()
+    if recalculated is None:
+        return False  # пользователь удален
+    values = {field: recalculated[field] for field in COUNTER_FIELDS}
+    if values == dict(current):
+        return False
+    db.execute(
+        update(UserCounters).where(UserCounters.user_id == user_id).values(
+            **values, data_version=UserCounters.data_version + 1, updated_at=func.now()
+        ).execution_options(synchronize_session=False)
+    )
+    return True
+
+
+def recalculate_user_counters(db: Session, user_id: int) -> None:
+    """Пересчитать счетчики пользователя (в транзакции вызывающего кода)"""
+    _repair_user_counters(db, user_id)
+
+
+def reconcile_all_counters(db: Session) -> int:
+    """
+    Сверить счетчики всех пользователей с исходными таблицами. Возвращает число исправленных.
+    Поиск расхождений — один запрос на чтение; исправление — своя короткая
+    транзакция на каждого пользователя, чтобы не держать блокировки многих строк.
+    """
+    candidates = _drifted_user_ids(db)
+    db.commit()
+    repaired = 0
+    for user_id in candidates:
+        repaired += _repair_user_counters(db, user_id)
+        db.commit()
+    return repaired
+
+
+def get_user_counters(db: Session, user_id: int, *columns) -> tuple:
+    """
+    Строка (UserCounters, *columns) для пользователя — поиск по первичному ключу.
+    Дополнительные columns (например, скалярные подзапросы) читаются тем же запросом.
+    Если строки еще нет, счетчики считаются на лету без записи: чтение может идти с реплики.
+    """
+    row = db.query(UserCounters, *columns).filter(UserCounters.user_id == user_id).first()
+    if row is not None:
+        return row
+    values = db.execute(_counters_select(user_id)).mappings().first()
+    counters = UserCounters(**values) if values else UserCounters(
+        user_id=user_id, **{field: 0 for field in COUNTER_FIELDS}
+    )
+    extras = db.query(*columns).one() if columns else ()
+    return (counters, *extras)
+
+
+async def get_data_version_async(db: AsyncSession, user_id: int) -> int:
+    return await db.run_sync(get_data_version, user_id)
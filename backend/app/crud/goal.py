@@ -1,16 +1,31 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_
 from ..db.models.goal import Goal
 from ..schemas.goal import GoalCreate, GoalUpdate
+from .counters import apply_counter_deltas, bump_data_version
 from datetime import datetime
 
 
-def get_user_goals(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Goal]:
-    """Получить цели пользователя"""
-    return db.query(Goal).filter(
+# Поля, доступные для выборочной выгрузки списка целей (fields=), и состав view=compact
+GOAL_FIELDS = (
+    "id", "user_id", "title", "description", "goal_type", "target_value", "current_value",
+    "start_date", "end_date", "is_active", "is_completed", "completed_at", "created_at", "updated_at",
+)
+GOAL_COMPACT_FIELDS = ("id", "title", "goal_type", "target_value", "current_value", "end_date", "is_completed")
+
+
+def get_user_goals(
+    db: Session, user_id: int, skip: int = 0, limit: int = 100, columns: Optional[Sequence[str]] = None
+) -> List[Goal]:
+    """Получить цели пользователя (или только колонки columns — строки без ORM-объектов)"""
+    query = db.query(Goal).filter(
         and_(Goal.user_id == user_id, Goal.is_active == True)
-    ).offset(skip).limit(limit).all()
+    )
+    if columns:
+        query = query.with_entities(*[getattr(Goal, name) for name in columns])
+    return query.offset(skip).limit(limit).all()
 
 
 def get_goal(db: Session, goal_id: int, user_id: int) -> Optional[Goal]:
@@ -35,11 +50,18 @@ def create_goal(db: Session, goal: GoalCreate, user_id: int) -> Goal:
         is_completed=False
     )
     db.add(db_goal)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_goal)
     return db_goal
 
 
+def _apply_completion_delta(db: Session, user_id: int, was_completed: bool, db_goal: Goal) -> None:
+    """Обновить счетчик выполненных целей (если статус цели изменился) и версию данных"""
+    delta = int(bool(db_goal.is_completed)) - int(was_completed)
+    apply_counter_deltas(db, {user_id: {"completed_goals": delta} if delta else {}})
+
+
 def update_goal(db: Session, goal_id: int, user_id: int, goal_update: GoalUpdate) -> Optional[Goal]:
     """Обновить цель"""
     db_goal = get_goal(db, goal_id, user_id)
@@ -47,6 +69,7 @@ def update_goal(db: Session, goal_id: int, user_id: int, goal_update: GoalUpdate
         return None
     
     update_data = goal_update.dict(exclude_unset=True)
+    was_completed = bool(db_goal.is_completed)
     for field, value in update_data.items():
         setattr(db_goal, field, value)
     
@@ -60,6 +83,7 @@ def update_goal(db: Session, goal_id: int, user_id: int, goal_update: GoalUpdate
             db_goal.completed_at = None
     
     db_goal.updated_at = datetime.now()
+    _apply_completion_delta(db, user_id, was_completed, db_goal)
     db.commit()
     db.refresh(db_goal)
     return db_goal
@@ -71,6 +95,7 @@ def update_goal_progress(db: Session, goal_id: int, user_id: int, increment: int
     if not db_goal:
         return None
     
+    was_completed = bool(db_goal.is_completed)
     db_goal.current_value = max(0, db_goal.current_value + increment)
     
     # Проверяем, достигнута ли цель
@@ -82,6 +107,7 @@ def update_goal_progress(db: Session, goal_id: int, user_id: int, increment: int
         db_goal.completed_at = None
     
     db_goal.updated_at = datetime.now()
+    _apply_completion_delta(db, user_id, was_completed, db_goal)
     db.commit()
     db.refresh(db_goal)
     return db_goal
@@ -95,6 +121,7 @@ def delete_goal(db: Session, goal_id: int, user_id: int) -> bool:
     
     db_goal.is_active = False
     db_goal.updated_at = datetime.now()
+    bump_data_version(db, user_id)
     db.commit()
     return True
 
@@ -103,4 +130,35 @@ def get_completed_goals_count(db: Session, user_id: int) -> int:
     """Получить количество выполненных целей пользователя"""
     return db.query(Goal).filter(
         and_(Goal.user_id == user_id, Goal.is_completed == True)
-    ).count() 
\ No newline at end of file
+    ).count()
+
+
+# Асинхронные версии для async-роутеров (выполняются через AsyncSession.run_sync)
+async def get_user_goals_async(
+    db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, columns: Optional[Sequence[str]] = None
+) -> List[Goal]:
+    return await db.run_sync(get_user_goals, user_id, skip, limit, columns)
+
+
+async def get_goal_async(db: AsyncSession, goal_id: int, user_id: int) -> Optional[Goal]:
+    return await db.run_sync(get_goal, goal_id, user_id)
+
+
+async def create_goal_async(db: AsyncSession, goal: GoalCreate, user_id: int) -> Goal:
+    return await db.run_sync(create_goal, goal, user_id)
+
+
+async def update_goal_async(db: AsyncSession, goal_id: int, user_id: int, goal_update: GoalUpdate) -> Optional[Goal]:
+    return await db.run_sync(update_goal, goal_id, user_id, goal_update)
+
+
+async def update_goal_progress_async(db: AsyncSession, goal_id: int, user_id: int, increment: int) -> Optional[Goal]:
+    return await db.run_sync(update_goal_progress, goal_id, user_id, increment)
+
+
+async def delete_goal_async(db: AsyncSession, goal_id: int, user_id: int) -> bool:
+    return await db.run_sync(delete_goal, goal_id, user_id)
+
+
+async def get_completed_goals_count_async(db: AsyncSession, user_id: int) -> int:
+    return await db.run_sync(get_completed_goals_count, user_id)
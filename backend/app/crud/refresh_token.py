@@ -0,0 +1,110 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy import delete, func, or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..db.models.refresh_token import RefreshToken
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _issue(db: Session, user_id: int, family_id: str, now: datetime) -> str:
+    token = secrets.token_urlsafe(48)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_token(token),
+        family_id=family_id,
+        created_at=now,
+        expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+def create_refresh_token(db: Session, user_id: int) -> str:
+    """Выдать refresh-токен нового семейства (при входе). Возвращается сам токен, в БД — только хеш"""
+    token = _issue(db, user_id, uuid.uuid4().hex, datetime.now(timezone.utc))
+    db.commit()
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str) -> Optional[Tuple[int, str]]:
+    """
+    Обменять refresh-токен на новый из того же семейства: (user_id, новый токен).
+    None — токен неизвестен, истек или отозван. Предъявление уже обменянного
+    токена означает утечку: отзывается все семейство.
+    """
+    now = datetime.now(timezone.utc)
+    db_token = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == _hash_token(token)
+    ).with_for_update().first()
+    if db_token is None or db_token.revoked_at is not None or db_token.expires_at <= now:
+        return None
+    if db_token.used_at is not None:
+        revoke_refresh_token_family(db, db_token.family_id)
+        return None
+
+    db_token.used_at = now
+    new_token = _issue(db, db_token.user_id, db_token.family_id, now)
+    db.commit()
+    return db_token.user_id, new_token
+
+
+def revoke_refresh_token_family(db: Session, family_id: str) -> None:
+    db.execute(
+        update(RefreshToken).where(
+            RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)
+        ).values(revoked_at=func.now()).execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def revoke_refresh_token(db: Session, token: str, user_id: int) -> bool:
+    """Отозвать семейство, к которому относится токен пользователя (выход). False — токен не найден"""
+    family_id = db.query(RefreshToken.family_id).filter(
+        RefreshToken.token_hash == _hash_token(token), RefreshToken.user_id == user_id
+    ).scalar()
+    if family_id is None:
+        return False
+    revoke_refresh_token_family(db, family_id)
+    return True
+
+
+def revoke_user_refresh_tokens(db: Session, user_id: int) -> None:
+    """Отозвать все refresh-токены пользователя (смена пароля). Коммит — в вызывающем коде"""
+    db.execute(
+        update(RefreshToken).where(
+            RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)
+        ).values(revoked_at=func.now()).execution_options(synchronize_session=False)
+    )
+
+
+def delete_expired_refresh_tokens(db: Session) -> int:
+    """Удалить истекшие и давно отозванные токены. Возвращает число удаленных"""
+    now = datetime.now(timezone.utc)
+    result = db.execute(
+        delete(RefreshToken).where(or_(
+            RefreshToken.expires_at <= now,
+            RefreshToken.revoked_at <= now - timedelta(days=1),
+        )).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+# Асинхронные версии для async-роутеров (выполняются через AsyncSession.run_sync)
+async def create_refresh_token_async(db: AsyncSession, user_id: int) -> str:
+    return await db.run_sync(create_refresh_token, user_id)
+
+
+async def rotate_refresh_token_async(db: AsyncSession, token: str) -> Optional[Tuple[int, str]]:
+    return await db.run_sync(rotate_refresh_token, token)
+
+
+async def revoke_refresh_token_async(db: AsyncSession, token: str, user_id: int) -> bool:
+    return await db.run_sync(revoke_refresh_token, token, user_id)
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db.models.revoked_token import RevokedToken
+
+
+def revoke_access_token(db: Session, jti: str, user_id: int, expires_at: datetime) -> None:
+    """Отозвать access-токен до его истечения. Повторный отзыв того же jti безвреден"""
+    db.merge(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+    db.commit()
+
+
+def is_token_revoked(db: Session, jti: str) -> bool:
+    """Точная проверка — для jti, которые фильтр отзыва считает возможно отозванными"""
+    return db.query(RevokedToken.jti).filter(RevokedToken.jti == jti).first() is not None
+
+
+def get_revoked_jtis(db: Session, since: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+    """(jti, revoked_at) действующих отзывов; since — только отозванные начиная с этого момента"""
+    query = db.query(RevokedToken.jti, RevokedToken.revoked_at).filter(
+        RevokedToken.expires_at > datetime.now(timezone.utc)
+    )
+    if since is not None:
+        query = query.filter(RevokedToken.revoked_at >= since)
+    return [(jti, revoked_at) for jti, revoked_at in query.all()]
+
+
+def delete_expired_revoked_tokens(db: Session) -> int:
+    """Удалить отзывы истекших токенов. Возвращает число удаленных"""
+    result = db.execute(
+        delete(RevokedToken).where(
+            RevokedToken.expires_at <= datetime.now(timezone.utc)
+        ).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+# Асинхронные версии для async-роутеров (выполняются через AsyncSession.run_sync)
+async def revoke_access_token_async(db: AsyncSession, jti: str, user_id: int, expires_at: datetime) -> None:
+    await db.run_sync(revoke_access_token, jti, user_id, expires_at)
+
+
+async def is_token_revoked_async(db: AsyncSession, jti: str) -> bool:
+    return await db.run_sync(is_token_revoked, jti)
@@ -1,83 +1,297 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from datetime import datetime
-from ..db.models.task import Task, TaskStep, TaskStatus
+import base64
+import json
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session, Query, noload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, any_, bindparam, case, delete, func, insert, select, tuple_, update
+from sqlalchemy.sql import Select
+from sqlalchemy.dialects.postgresql import ARRAY, JSON, aggregate_order_by
+from sqlalchemy.types import Integer
+from datetime import date, datetime, time, timedelta, tzinfo
+from ..db.models.task import Task, TaskStep, TaskStatus, TaskPriority
+from ..db.models.notification import Notification
+from ..db.models.user import User
+from ..db.models.user_counters import UserCounters
 from ..schemas.task import TaskCreate, TaskUpdate, TaskFilter, TaskStepCreate
+from .counters import (
+    apply_counter_deltas, bump_data_version, get_user_counters, merge_deltas, recalculate_user_counters,
+    task_deltas, task_snapshot,
+)
+
+
+def _overdue_condition():
+    """Задача просрочена: помечена планировщиком или дедлайн уже прошел"""
+    return or_(
+        Task.is_overdue == True,
+        and_(
+            Task.status.in_([TaskStatus.pending, TaskStatus.in_progress]),
+            Task.deadline < datetime.utcnow()
+        )
+    )
+
+
+# Поля, доступные для выборочной выгрузки списков (fields=), и состав view=compact
+TASK_FIELDS = (
+    "id", "user_id", "title", "description", "task_type", "priority", "status", "deadline",
+    "completed_at", "is_recurring", "recurrence_pattern", "color", "created_at", "updated_at",
+)
+TASK_COMPACT_FIELDS = ("id", "title", "deadline", "status", "priority", "color")
+
+
+def _steps_option(include_steps: bool):
+    """
+    Стратегия загрузки этапов для списков: все этапы страницы одним
+    SELECT ... WHERE task_id IN (...) либо не загружать вовсе (steps будет пустым).
+    """
+    return selectinload(Task.steps) if include_steps else noload(Task.steps)
+
+
+def _select_tasks(query: Query, include_steps: bool, columns: Optional[Sequence[str]]) -> Query:
+    """Полные задачи с этапами (или без) либо только колонки columns — строки без ORM-объектов"""
+    if columns:
+        return query.with_entities(*[getattr(Task, name) for name in columns])
+    return query.options(_steps_option(include_steps))
 
 
 def get_task(db: Session, task_id: int, user_id: int) -> Optional[Task]:
-    return db.query(Task).filter(
+    return db.query(Task).options(selectinload(Task.steps)).filter(
         and_(Task.id == task_id, Task.user_id == user_id)
     ).first()
 
 
-def get_tasks(
-    db: Session, 
-    user_id: int, 
-    skip: int = 0, 
-    limit: int = 100,
-    filters: Optional[TaskFilter] = None
-) -> List[Task]:
-    query = db.query(Task).filter(Task.user_id == user_id)
+def _get_task_for_update(db: Session, task_id: int, user_id: int) -> Optional[Task]:
+    """
+    Задача под блокировкой строки до конца транзакции. Снимок для дельт счетчиков
+    берется после блокировки: параллельное изменение той же задачи (другой запрос,
+    планировщик просрочек) дождется коммита и посчитает дельту от нового состояния.
+    """
+    return db.query(Task).options(selectinload(Task.steps)).filter(
+        and_(Task.id == task_id, Task.user_id == user_id)
+    ).with_for_update().populate_existing().first()
+
+
+# Ключи сортировки списка задач. Последним ключом всегда идет id, чтобы порядок
+# был полным и курсор однозначно указывал позицию. Под каждый ключ есть индекс
+# (user_id, ..., id), поэтому страница читается диапазоном индекса.
+TASK_SORT_KEYS = {
+    "deadline": ("deadline",),
+    "created_at": ("created_at",),
+    "priority": ("priority", "deadline"),
+}
+
+
+def _parse_sort(sort: str) -> Tuple[str, bool]:
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in TASK_SORT_KEYS:
+        raise ValueError(f"Неизвестная сортировка: {sort}")
+    return key, descending
+
+
+def task_cursor_fields(sort: str) -> Tuple[str, ...]:
+    """Поля задачи, из которых строится курсор для сортировки sort"""
+    key, _ = _parse_sort(sort)
+    return TASK_SORT_KEYS[key] + ("id",)
+
+
+def _sort_columns(key: str) -> list:
+    return [getattr(Task, name) for name in TASK_SORT_KEYS[key]] + [Task.id]
+
+
+def encode_task_cursor(task: Task, sort: str) -> str:
+    """Непрозрачный курсор: значения ключей сортировки последней задачи страницы"""
+    key, _ = _parse_sort(sort)
+    values = []
+    for name in TASK_SORT_KEYS[key] + ("id",):
+        value = getattr(task, name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, TaskPriority):
+            value = value.value
+        values.append(value)
+    raw = json.dumps({"s": sort, "v": values}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_task_cursor(cursor: str, sort: str) -> list:
+    key, _ = _parse_sort(sort)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if data["s"] != sort:
+            raise ValueError("Курсор получен для другой сортировки")
+        values = []
+        for name, value in zip(TASK_SORT_KEYS[key] + ("id",), data["v"], strict=True):
+            if name in ("deadline", "created_at"):
+                value = datetime.fromisoformat(value)
+            elif name == "priority":
+                value = TaskPriority(value)
+            else:
+                value = int(value)
+            values.append(value)
+        return values
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Некорректный курсор: {e}")
+
+
+def _task_filter_conditions(user_id: int, filters: Optional[TaskFilter]) -> list:
+    conditions = [Task.user_id == user_id]
     
     if filters:
         if filters.task_type:
-            query = query.filter(Task.task_type == filters.task_type)
+            conditions.append(Task.task_type == filters.task_type)
         if filters.priority:
-            query = query.filter(Task.priority == filters.priority)
+            conditions.append(Task.priority == filters.priority)
         if filters.status:
             # Специальная обработка для статуса "overdue"
             if filters.status == "overdue":
-                query = query.filter(
-                    or_(
-                        Task.is_overdue == True,
-                        and_(
-                            Task.status.in_([TaskStatus.pending, TaskStatus.in_progress]),
-                            Task.deadline < datetime.utcnow()
-                        )
-                    )
-                )
+                conditions.append(_overdue_condition())
             else:
-                query = query.filter(Task.status == filters.status)
+                conditions.append(Task.status == filters.status)
         if filters.start_date:
-            query = query.filter(Task.deadline >= filters.start_date)
+            conditions.append(Task.deadline >= filters.start_date)
         if filters.end_date:
-            query = query.filter(Task.deadline <= filters.end_date)
+            conditions.append(Task.deadline <= filters.end_date)
     
-    return query.offset(skip).limit(limit).all()
+    return conditions
 
 
-def create_task(db: Session, task: TaskCreate, user_id: int) -> Task:
-    db_task = Task(
-        user_id=user_id,
-        title=task.title,
-        description=task.description,
-        task_type=task.task_type,
-        priority=task.priority,
-        deadline=task.deadline,
-        is_recurring=task.is_recurring,
-        recurrence_pattern=task.recurrence_pattern,
-        color=task.color
+def _filtered_tasks_query(db: Session, user_id: int, filters: Optional[TaskFilter]) -> Query:
+    return db.query(Task).filter(*_task_filter_conditions(user_id, filters))
+
+
+def _ordered_tasks_query(query: Query, sort: str, cursor: Optional[str]) -> Query:
+    key, descending = _parse_sort(sort)
+    columns = _sort_columns(key)
+    if cursor:
+        position = tuple_(*columns)
+        values = tuple_(*decode_task_cursor(cursor, sort))
+        query = query.filter(position < values if descending else position > values)
+    return query.order_by(*[column.desc() if descending else column for column in columns])
+
+
+def get_tasks(
+    db: Session, 
+    user_id: int, 
+    skip: int = 0, 
+    limit: int = 100,
+    filters: Optional[TaskFilter] = None,
+    sort: str = "deadline",
+    cursor: Optional[str] = None,
+    include_steps: bool = True,
+    columns: Optional[Sequence[str]] = None
+) -> List[Task]:
+    query = _ordered_tasks_query(_filtered_tasks_query(db, user_id, filters), sort, cursor)
+    return _select_tasks(query, include_steps, columns).offset(skip).limit(limit).all()
+
+
+def get_tasks_page(
+    db: Session,
+    user_id: int,
+    limit: int = 100,
+    filters: Optional[TaskFilter] = None,
+    sort: str = "deadline",
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    include_steps: bool = True,
+    columns: Optional[Sequence[str]] = None
+) -> Tuple[List[Task], Optional[str]]:
+    """
+    Страница задач и курсор следующей страницы (None, если страница последняя).
+    С курсором выборка начинается сразу после позиции курсора без OFFSET.
+    При выборке колонок к ним добавляются поля курсора.
+    """
+    if columns:
+        columns = list(dict.fromkeys([*columns, *task_cursor_fields(sort)]))
+    tasks = get_tasks(
+        db, user_id, skip=skip, limit=limit + 1, filters=filters, sort=sort, cursor=cursor,
+        include_steps=include_steps, columns=columns
     )
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    if len(tasks) <= limit:
+        return tasks, None
+    tasks = tasks[:limit]
+    return tasks, encode_task_cursor(tasks[-1], sort)
+
+
+def count_tasks(db: Session, user_id: int, filters: Optional[TaskFilter] = None) -> int:
+    """Общее число задач под фильтром (для X-Total-Count)"""
+    query = _filtered_tasks_query(db, user_id, filters)
+    return query.with_entities(func.count(Task.id)).scalar()
+
+
+def create_task(db: Session, task: TaskCreate, user_id: int) -> Task:
+    return create_tasks(db, [task], user_id)[0]
+
+
+def create_tasks(db: Session, tasks: List[TaskCreate], user_id: int) -> List[Task]:
+    """
+    Создать задачи вместе с этапами в одной транзакции.
+    Задачи и этапы вставляются многострочными INSERT ... RETURNING
+    (по одному на таблицу, большие пакеты SQLAlchemy делит на части),
+    порядок возвращенных строк совпадает с порядком входных данных.
+    """
+    if not tasks:
+        return []
     
-    # Создаем этапы задачи
-    for step_data in task.steps:
-        create_task_step(db, step_data, db_task.id)
+    db_tasks = db.scalars(
+        insert(Task).returning(Task, sort_by_parameter_order=True),
+        [
+            {
+                "user_id": user_id,
+                "title": task.title,
+                "description": task.description,
+                "task_type": task.task_type,
+                "priority": task.priority,
+                "status": TaskStatus.pending,
+                "deadline": task.deadline,
+                "is_overdue": False,
+                "is_recurring": task.is_recurring,
+                "recurrence_pattern": task.recurrence_pattern,
+                "color": task.color,
+            }
+            for task in tasks
+        ]
+    ).all()
     
-    db.refresh(db_task)
-    return db_task
+    # Создаем этапы задач
+    step_rows = [
+        {
+            "task_id": db_task.id,
+            "title": step.title,
+            "description": step.description,
+            "order": step.order,
+            "is_completed": False,
+        }
+        for db_task, task in zip(db_tasks, tasks)
+        for step in task.steps
+    ]
+    steps_by_task = {db_task.id: [] for db_task in db_tasks}
+    if step_rows:
+        db_steps = db.scalars(
+            insert(TaskStep).returning(TaskStep, sort_by_parameter_order=True), step_rows
+        ).all()
+        for db_step in db_steps:
+            steps_by_task[db_step.task_id].append(db_step)
+    for db_task in db_tasks:
+        set_committed_value(db_task, "steps", steps_by_task[db_task.id])
+    
+    deltas = {}
+    for db_task in db_tasks:
+        merge_deltas(deltas, user_id, task_deltas(None, task_snapshot(db_task)))
+    apply_counter_deltas(db, deltas)
+    db.commit()
+    return db_tasks
 
 
 def update_task(db: Session, task_id: int, user_id: int, task_update: TaskUpdate) -> Optional[Task]:
-    db_task = get_task(db, task_id, user_id)
+    db_task = _get_task_for_update(db, task_id, user_id)
     if not db_task:
         return None
     
     update_data = task_update.dict(exclude_unset=True)
+    before = task_snapshot(db_task)
     
     # Если статус меняется на "выполнено", устанавливаем время завершения
     if update_data.get("status") == TaskStatus.completed and db_task.status != TaskStatus.completed:
@@ -86,51 +300,232 @@ def update_task(db: Session, task_id: int, user_id: int, task_update: TaskUpdate
     for field, value in update_data.items():
         setattr(db_task, field, value)
     
+    apply_counter_deltas(db, {user_id: task_deltas(before, task_snapshot(db_task))})
     db.commit()
     db.refresh(db_task)
     return db_task
 
 
 def delete_task(db: Session, task_id: int, user_id: int) -> bool:
-    db_task = get_task(db, task_id, user_id)
+    db_task = _get_task_for_update(db, task_id, user_id)
     if not db_task:
         return False
     
     db.delete(db_task)
+    apply_counter_deltas(db, {user_id: task_deltas(task_snapshot(db_task), None)})
     db.commit()
     return True
 
 
-def get_upcoming_tasks(db: Session, user_id: int, days: int = 7) -> List[Task]:
+# Колонки выгрузки задач (порядок колонок CSV)
+EXPORT_COLUMNS = (
+    "id", "title", "description", "task_type", "priority", "status", "deadline", "completed_at",
+    "is_recurring", "recurrence_pattern", "color", "created_at", "updated_at",
+)
+
+
+def export_tasks_select(user_id: int, include_steps: bool = True) -> Select:
+    """
+    Запрос выгрузки задач пользователя по порядку id: только колонки, без ORM-объектов.
+    Этапы собираются в JSON-массив коррелированным подзапросом в той же строке.
+    """
+    columns = [getattr(Task, name) for name in EXPORT_COLUMNS]
+    if include_steps:
+        steps = select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "title", TaskStep.title,
+                            "description", TaskStep.description,
+                            "order", TaskStep.order,
+                            "is_completed", TaskStep.is_completed,
+                        ),
+                        TaskStep.order, TaskStep.id
+                    )
+                ),
+                func.json_build_array(),
+                type_=JSON
+            )
+        ).where(TaskStep.task_id == Task.id).scalar_subquery().label("steps")
+        columns.append(steps)
+    return select(*columns).where(Task.user_id == user_id).order_by(Task.id)
+
+
+CALENDAR_COLUMNS = (
+    "id", "title", "description", "task_type", "status", "deadline",
+    "is_recurring", "recurrence_pattern", "created_at", "updated_at",
+)
+
+
+def calendar_tasks_select(user_id: int) -> Select:
+    """Задачи для ленты календаря по порядку дедлайнов (индекс user_id, deadline, id)"""
+    columns = [getattr(Task, name) for name in CALENDAR_COLUMNS]
+    return select(*columns).where(Task.user_id == user_id).order_by(Task.deadline, Task.id)
+
+
+CALENDAR_DAY_COLUMNS = ("id", "title", "task_type", "priority", "status", "deadline", "color", "is_overdue")
+
+
+def get_task_calendar(db: Session, user_id: int, start: date, end: date, zone: tzinfo) -> List[Dict]:
+    """
+    Задачи с дедлайном в днях start..end (включительно, по местному времени zone),
+    сгруппированные по местной дате, с подсчетом по статусам и приоритетам.
+    Один запрос — диапазон индекса (user_id, deadline, id); дни без задач не возвращаются.
+    """
+    range_start = datetime.combine(start, time.min, tzinfo=zone)
+    range_end = datetime.combine(end + timedelta(days=1), time.min, tzinfo=zone)
+    rows = db.execute(
+        select(*[getattr(Task, name) for name in CALENDAR_DAY_COLUMNS]).where(
+            Task.user_id == user_id,
+            Task.deadline >= range_start,
+            Task.deadline < range_end
+        ).order_by(Task.deadline, Task.id)
+    ).all()
+    
+    days: Dict[date, Dict] = {}
+    for row in rows:
+        local_date = row.deadline.astimezone(zone).date()
+        day = days.get(local_date)
+        if day is None:
+            day = days[local_date] = {
+                "date": local_date, "by_status": Counter(), "by_priority": Counter(), "tasks": []
+            }
+        day["by_status"][(row.status or TaskStatus.pending).value] += 1
+        day["by_priority"][row.priority.value] += 1
+        day["tasks"].append(row)
+    
+    for day in days.values():
+        day["total"] = len(day["tasks"])
+    return list(days.values())
+
+
+def get_tasks_version(db: Session, user_id: int) -> Optional[Tuple[int, Optional[datetime]]]:
+    """
+    Версия данных пользователя для условных запросов: (data_version, время
+    последнего изменения) из user_counters — поиск по первичному ключу, без
+    обхода задач. data_version увеличивает каждая запись, включая удаление задач.
+    None — пользователь не найден или неактивен.
+    """
+    row = db.execute(
+        select(
+            func.coalesce(UserCounters.data_version, 0).label("version"),
+            UserCounters.updated_at.label("last_modified"),
+        ).select_from(User).outerjoin(UserCounters, UserCounters.user_id == User.id)
+        .where(User.id == user_id, User.is_active == True)
+    ).first()
+    return (row.version, row.last_modified) if row else None
+
+
+def _bulk_conditions(user_id: int, ids: Optional[List[int]], filters: Optional[TaskFilter]) -> list:
+    """Условия массовой операции: задачи пользователя из списка ids и/или по фильтру"""
+    conditions = _task_filter_conditions(user_id, filters)
+    if not ids and len(conditions) == 1:
+        raise ValueError("Массовая операция без ids и условий фильтра затронула бы все задачи")
+    if ids is not None:
+        # Один параметр-массив: текст запроса не зависит от числа id
+        conditions.append(Task.id == any_(bindparam("ids", ids, type_=ARRAY(Integer))))
+    return conditions
+
+
+def update_tasks_bulk(
+    db: Session,
+    user_id: int,
+    task_update: TaskUpdate,
+    ids: Optional[List[int]] = None,
+    filters: Optional[TaskFilter] = None
+) -> Tuple[List[Dict], List[int]]:
+    """
+    Обновить задачи одним UPDATE ... RETURNING.
+    Правило completed_at то же, что в update_task: время завершения ставится
+    задачам, которые переходят в статус "выполнено" из другого статуса.
+    Возвращает (обновленные задачи, id из ids, которые не найдены).
+    """
+    update_data = task_update.dict(exclude_unset=True)
+    if not update_data:
+        raise ValueError("Массовое обновление без изменяемых полей")
+    
+    if update_data.get("status") == TaskStatus.completed:
+        update_data["completed_at"] = case(
+            (Task.status.is_distinct_from(TaskStatus.completed), datetime.utcnow()),
+            else_=Task.completed_at
+        )
+    
+    stmt = update(Task).where(*_bulk_conditions(user_id, ids, filters)).values(**update_data).returning(
+        Task.id, Task.status, Task.priority, Task.deadline, Task.completed_at, Task.updated_at
+    ).execution_options(synchronize_session=False)
+    updated = [dict(row._mapping) for row in db.execute(stmt)]
+    
+    if updated:
+        bump_data_version(db, user_id)
+    if "status" in update_data or "priority" in update_data:
+        recalculate_user_counters(db, user_id)
+    db.commit()
+    
+    found = {row["id"] for row in updated}
+    return updated, [task_id for task_id in ids or [] if task_id not in found]
+
+
+def delete_tasks_bulk(
+    db: Session,
+    user_id: int,
+    ids: Optional[List[int]] = None,
+    filters: Optional[TaskFilter] = None
+) -> Tuple[List[int], List[int]]:
+    """
+    Удалить задачи набором операций в одной транзакции: отвязать уведомления,
+    удалить этапы, удалить задачи с RETURNING id.
+    Возвращает (удаленные id, id из ids, которые не найдены).
+    """
+    task_ids = db.query(Task.id).filter(*_bulk_conditions(user_id, ids, filters)).scalar_subquery()
+    db.execute(
+        update(Notification).where(Notification.task_id.in_(task_ids)).values(task_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(TaskStep).where(TaskStep.task_id.in_(task_ids)).execution_options(synchronize_session=False)
+    )
+    deleted = db.scalars(
+        delete(Task).where(*_bulk_conditions(user_id, ids, filters)).returning(Task.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    
+    if deleted:
+        bump_data_version(db, user_id)
+        recalculate_user_counters(db, user_id)
+    db.commit()
+    
+    found = set(deleted)
+    return list(deleted), [task_id for task_id in ids or [] if task_id not in found]
+
+
+def get_upcoming_tasks(
+    db: Session, user_id: int, days: int = 7, include_steps: bool = True,
+    columns: Optional[Sequence[str]] = None
+) -> List[Task]:
     """Получить задачи на ближайшие N дней"""
-    from datetime import timedelta
     end_date = datetime.utcnow() + timedelta(days=days)
     
-    return db.query(Task).filter(
+    query = db.query(Task).filter(
         and_(
             Task.user_id == user_id,
             Task.status != TaskStatus.completed,
             Task.deadline <= end_date,
             Task.deadline >= datetime.utcnow()
         )
-    ).order_by(Task.deadline).all()
+    ).order_by(Task.deadline)
+    return _select_tasks(query, include_steps, columns).all()
 
 
-def get_overdue_tasks(db: Session, user_id: int) -> List[Task]:
+def get_overdue_tasks(
+    db: Session, user_id: int, include_steps: bool = True, columns: Optional[Sequence[str]] = None
+) -> List[Task]:
     """Получить просроченные задачи"""
     # Используем новое поле is_overdue для более точной фильтрации
-    return db.query(Task).filter(
-        and_(
-            Task.user_id == user_id,
-            or_(
-                Task.is_overdue == True,
-                and_(
-                    Task.status.in_([TaskStatus.pending, TaskStatus.in_progress]),
-                    Task.deadline < datetime.utcnow()
-                )
-            )
-        )
-    ).all()
+    query = db.query(Task).filter(
+        and_(Task.user_id == user_id, _overdue_condition())
+    )
+    return _select_tasks(query, include_steps, columns).all()
 
 
 # CRUD для этапов задач
@@ -142,6 +537,7 @@ def create_task_step(db: Session, step: TaskStepCreate, task_id: int) -> TaskSte
         order=step.order
     )
     db.add(db_step)
+    bump_data_version(db, db.query(Task.user_id).filter(Task.id == task_id).scalar())
     db.commit()
     db.refresh(db_step)
     return db_step
@@ -158,35 +554,154 @@ def update_task_step(db: Session, step_id: int, is_completed: bool) -> Optional[
     else:
         db_step.completed_at = None
     
+    bump_data_version(db, db.query(Task.user_id).filter(Task.id == db_step.task_id).scalar())
     db.commit()
     db.refresh(db_step)
     return db_step
 
 
 def get_task_stats(db: Session, user_id: int) -> dict:
-    """Получить статистику по задачам пользователя"""
-    total = db.query(Task).filter(Task.user_id == user_id).count()
-    completed = db.query(Task).filter(
-        and_(Task.user_id == user_id, Task.status == TaskStatus.completed)
-    ).count()
-    pending = db.query(Task).filter(
-        and_(Task.user_id == user_id, Task.status.in_([TaskStatus.pending, TaskStatus.in_progress]))
-    ).count()
-    overdue = len(get_overdue_tasks(db, user_id))
-    
-    from ..db.models.task import TaskPriority
-    yearly_debts = db.query(Task).filter(
-        and_(Task.user_id == user_id, Task.priority == TaskPriority.yearly_debt)
-    ).count()
-    semester_debts = db.query(Task).filter(
-        and_(Task.user_id == user_id, Task.priority == TaskPriority.semester_debt)
-    ).count()
+    """
+    Получить статистику по задачам пользователя.
+    Счетчики читаются из user_counters; к помеченным планировщиком просроченным
+    добавляются задачи, чей дедлайн прошел с момента последнего запуска планировщика
+    (узкий диапазон по индексу user_id, status, deadline).
+    """
+    not_flagged_overdue = db.query(func.count(Task.id)).filter(
+        Task.user_id == user_id,
+        Task.is_overdue.isnot(True),
+        Task.status.in_([TaskStatus.pending, TaskStatus.in_progress]),
+        Task.deadline < datetime.utcnow()
+    ).scalar_subquery()
+    counters, late = get_user_counters(db, user_id, not_flagged_overdue)
     
     return {
-        "total_tasks": total,
-        "completed_tasks": completed,
-        "pending_tasks": pending,
-        "overdue_tasks": overdue,
-        "yearly_debts": yearly_debts,
-        "semester_debts": semester_debts
-    } 
\ No newline at end of file
+        "total_tasks": counters.total_tasks,
+        "completed_tasks": counters.completed_tasks,
+        "pending_tasks": counters.pending_tasks + counters.in_progress_tasks,
+        "overdue_tasks": counters.flagged_overdue_tasks + late,
+        "yearly_debts": counters.yearly_debts,
+        "semester_debts": counters.semester_debts
+    }
+
+
+# Асинхронные версии для async-роутеров.
+# Логика запросов общая: синхронные функции выполняются через AsyncSession.run_sync
+# поверх соединения asyncpg, не блокируя event loop и не занимая поток threadpool.
+# Связи, нужные для сериализации ответа (steps), загружаются внутри run_sync,
+# так как вне его ленивая загрузка недоступна: списки и get_task загружают их
+# через selectinload, create_tasks заполняет их сам, после обновления — обращением к связи.
+def _load_steps(tasks):
+    for task in tasks:
+        task.steps
+    return tasks
+
+
+async def get_task_async(db: AsyncSession, task_id: int, user_id: int) -> Optional[Task]:
+    return await db.run_sync(get_task, task_id, user_id)
+
+
+async def get_tasks_async(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[TaskFilter] = None,
+    sort: str = "deadline",
+    cursor: Optional[str] = None,
+    include_steps: bool = True
+) -> List[Task]:
+    return await db.run_sync(get_tasks, user_id, skip, limit, filters, sort, cursor, include_steps)
+
+
+async def get_tasks_page_async(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 100,
+    filters: Optional[TaskFilter] = None,
+    sort: str = "deadline",
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    include_steps: bool = True,
+    columns: Optional[Sequence[str]] = None
+) -> Tuple[List[Task], Optional[str]]:
+    return await db.run_sync(get_tasks_page, user_id, limit, filters, sort, cursor, skip, include_steps, columns)
+
+
+async def count_tasks_async(db: AsyncSession, user_id: int, filters: Optional[TaskFilter] = None) -> int:
+    return await db.run_sync(count_tasks, user_id, filters)
+
+
+async def create_task_async(db: AsyncSession, task: TaskCreate, user_id: int) -> Task:
+    return await db.run_sync(create_task, task, user_id)
+
+
+async def create_tasks_async(db: AsyncSession, tasks: List[TaskCreate], user_id: int) -> List[Task]:
+    return await db.run_sync(create_tasks, tasks, user_id)
+
+
+async def update_task_async(db: AsyncSession, task_id: int, user_id: int, task_update: TaskUpdate) -> Optional[Task]:
+    def _update(session: Session) -> Optional[Task]:
+        task = update_task(session, task_id, user_id, task_update)
+        if task:
+            _load_steps([task])
+        return task
+    return await db.run_sync(_update)
+
+
+async def delete_task_async(db: AsyncSession, task_id: int, user_id: int) -> bool:
+    return await db.run_sync(delete_task, task_id, user_id)
+
+
+async def get_task_calendar_async(
+    db: AsyncSession, user_id: int, start: date, end: date, zone: tzinfo
+) -> List[Dict]:
+    return await db.run_sync(get_task_calendar, user_id, start, end, zone)
+
+
+async def get_tasks_version_async(db: AsyncSession, user_id: int) -> Optional[Tuple[int, Optional[datetime]]]:
+    return await db.run_sync(get_tasks_version, user_id)
+
+
+async def update_tasks_bulk_async(
+    db: AsyncSession,
+    user_id: int,
+    task_update: TaskUpdate,
+    ids: Optional[List[int]] = None,
+    filters: Optional[TaskFilter] = None
+) -> Tuple[List[Dict], List[int]]:
+    return await db.run_sync(update_tasks_bulk, user_id, task_update, ids, filters)
+
+
+async def delete_tasks_bulk_async(
+    db: AsyncSession,
+    user_id: int,
+    ids: Optional[List[int]] = None,
+    filters: Optional[TaskFilter] = None
+) -> Tuple[List[int], List[int]]:
+    return await db.run_sync(delete_tasks_bulk, user_id, ids, filters)
+
+
+async def get_upcoming_tasks_async(
+    db: AsyncSession, user_id: int, days: int = 7, include_steps: bool = True,
+    columns: Optional[Sequence[str]] = None
+) -> List[Task]:
+    return await db.run_sync(get_upcoming_tasks, user_id, days, include_steps, columns)
+
+
+async def get_overdue_tasks_async(
+    db: AsyncSession, user_id: int, include_steps: bool = True, columns: Optional[Sequence[str]] = None
+) -> List[Task]:
+    return await db.run_sync(get_overdue_tasks, user_id, include_steps, columns)
+
+
+async def create_task_step_async(db: AsyncSession, step: TaskStepCreate, task_id: int) -> TaskStep:
+    return await db.run_sync(create_task_step, step, task_id)
+
+
+async def update_task_step_async(db: AsyncSession, step_id: int, is_completed: bool) -> Optional[TaskStep]:
+    return await db.run_sync(update_task_step, step_id, is_completed)
+
+
+async def get_task_stats_async(db: AsyncSession, user_id: int) -> dict:
+    return await db.run_sync(get_task_stats, user_id)
@@ -1,10 +1,13 @@
 import logging
 from typing import Optional
 from sqlalchemy.orm import Session
-from ..core.security import get_password_hash, verify_password
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.hashing import password_hasher
+from ..core.security import create_calendar_token, get_password_hash, verify_password
 from ..db.models.user import User
 from ..db.models.push_subscription import PushSubscription
 from ..schemas.user import UserCreate, UserUpdate
+from .refresh_token import revoke_user_refresh_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -20,11 +23,10 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
 # OAuth methods removed as per PRD requirements
 
 
-def create_user(db: Session, user: UserCreate) -> User:
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
     db_user = User(
         email=user.email,
-        hashed_password=hashed_password,
+        hashed_password=hashed_password or get_password_hash(user.password),
         full_name=user.full_name,
         is_active=user.is_active
     )
@@ -57,6 +59,9 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
         return None
     if not verify_password(password, user.hashed_password):
         return None
+    if password_hasher.needs_rehash(user.hashed_password):
+        user.hashed_password = get_password_hash(password)
+        db.commit()
     return user
 
 
@@ -69,6 +74,7 @@ def change_password(db: Session, user_id: int, current_password: str, new_passwo
         return False
     
     user.hashed_password = get_password_hash(new_password)
+    revoke_user_refresh_tokens(db, user_id)
     db.commit()
     return True
 
@@ -100,4 +106,95 @@ def save_push_subscription(db: Session, user_id: int, endpoint: str, p256dh_key:
 
 def get_push_subscription(db: Session, user_id: int) -> Optional[PushSubscription]:
     """Получить push-подписку пользователя"""
-    return db.query(PushSubscription).filter(PushSubscription.user_id == user_id).first() 
\ No newline at end of file
+    return db.query(PushSubscription).filter(PushSubscription.user_id == user_id).first()
+
+
+def get_calendar_token(db: Session, user_id: int) -> Optional[str]:
+    """Токен ленты календаря; при первом обращении создается"""
+    user = get_user(db, user_id)
+    if not user:
+        return None
+    if user.calendar_token is None:
+        user.calendar_token = create_calendar_token()
+        db.commit()
+    return user.calendar_token
+
+
+def reset_calendar_token(db: Session, user_id: int, enabled: bool = True) -> Optional[str]:
+    """Заменить токен ленты (старый адрес перестает работать); enabled=False — отключить ленту"""
+    user = get_user(db, user_id)
+    if not user:
+        return None
+    user.calendar_token = create_calendar_token() if enabled else None
+    db.commit()
+    return user.calendar_token
+
+
+def get_user_id_by_calendar_token(db: Session, token: str) -> Optional[int]:
+    """Владелец ленты по токену (уникальный индекс); у неактивных пользователей лента не отдается"""
+    return db.query(User.id).filter(User.calendar_token == token, User.is_active == True).scalar()
+
+
+# Асинхронные версии для async-роутеров (выполняются через AsyncSession.run_sync)
+async def get_user_async(db: AsyncSession, user_id: int) -> Optional[User]:
+    return await db.run_sync(get_user, user_id)
+
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.run_sync(get_user_by_email, email)
+
+
+# Пароли хешируются и проверяются в пуле password_hasher, а не внутри run_sync
+async def create_user_async(db: AsyncSession, user: UserCreate) -> User:
+    hashed_password = await password_hasher.hash(user.password)
+    return await db.run_sync(create_user, user, hashed_password)
+
+
+async def update_user_async(db: AsyncSession, user_id: int, user_update: UserUpdate) -> Optional[User]:
+    return await db.run_sync(update_user, user_id, user_update)
+
+
+async def authenticate_user_async(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    """Как authenticate_user; хеш со старыми параметрами заменяется после успешной проверки"""
+    user = await get_user_by_email_async(db, email)
+    if not user:
+        return await password_hasher.verify_dummy(password) or None
+    if not await password_hasher.verify(password, user.hashed_password):
+        return None
+    if password_hasher.needs_rehash(user.hashed_password):
+        user.hashed_password = await password_hasher.hash(password)
+        await db.commit()
+    return user
+
+
+async def change_password_async(db: AsyncSession, user_id: int, current_password: str, new_password: str) -> bool:
+    user = await get_user_async(db, user_id)
+    if not user:
+        return False
+    if not await password_hasher.verify(current_password, user.hashed_password):
+        return False
+    user.hashed_password = await password_hasher.hash(new_password)
+    # Смена пароля завершает сессии на других устройствах
+    await db.run_sync(revoke_user_refresh_tokens, user_id)
+    await db.commit()
+    return True
+
+
+async def save_push_subscription_async(db: AsyncSession, user_id: int, endpoint: str, p256dh_key: str, auth_key: str) -> bool:
+    return await db.run_sync(save_push_subscription, user_id, endpoint, p256dh_key, auth_key)
+
+
+async def get_push_subscription_async(db: AsyncSession, user_id: int) -> Optional[PushSubscription]:
+    return await db.run_sync(get_push_subscription, user_id)
+
+
+async def get_calendar_token_async(db: AsyncSession, user_id: int) -> Optional[str]:
+    return await db.run_sync(get_calendar_token, user_id)
+
+
+async def reset_calendar_token_async(db: AsyncSession, user_id: int, enabled: bool = True) -> Optional[str]:
+    return await db.run_sync(reset_calendar_token, user_id, enabled)
+
+
+async def get_user_id_by_calendar_token_async(db: AsyncSession, token: str) -> Optional[int]:
+    return await db.run_sync(get_user_id_by_calendar_token, token)
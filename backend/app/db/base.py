@@ -1,12 +1,71 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from ..core.config import get_settings
+from .pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool, register_pool_metrics
 
 # Создаем свежий экземпляр настроек для получения правильного URL
 settings = get_settings()
 database_url = settings.get_database_url()
-engine = create_engine(database_url)
+
+
+def _pool_options(pool_size: int, max_overflow: int) -> dict:
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+# Размеры пулов задаются для каждого движка отдельно, см. Settings.db_connection_budget
+engine = create_engine(
+    database_url,
+    poolclass=InstrumentedQueuePool,
+    **_pool_options(settings.SYNC_DB_POOL_SIZE, settings.SYNC_DB_MAX_OVERFLOW)
+)
+register_pool_metrics("api", engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base() 
\ No newline at end of file
+# Асинхронный движок (asyncpg) для async-роутеров: запрос не занимает поток
+# из threadpool на время обращения к БД
+async_engine = create_async_engine(
+    settings.get_async_database_url(),
+    poolclass=InstrumentedAsyncQueuePool,
+    **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+)
+register_pool_metrics("api_async", async_engine.sync_engine)
+# expire_on_commit=False: после commit объекты сериализуются вне сессии,
+# и обращение к истекшим атрибутам привело бы к неявному I/O
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Реплика для чтения (опционально): разгружает primary на GET-эндпоинтах
+read_database_url = settings.get_async_database_read_url()
+if read_database_url:
+    read_async_engine = create_async_engine(
+        read_database_url,
+        poolclass=InstrumentedAsyncQueuePool,
+        **_pool_options(settings.READ_DB_POOL_SIZE, settings.READ_DB_MAX_OVERFLOW)
+    )
+    register_pool_metrics("api_read", read_async_engine.sync_engine)
+    ReadAsyncSessionLocal = async_sessionmaker(bind=read_async_engine, autoflush=False, expire_on_commit=False)
+else:
+    read_async_engine = None
+    ReadAsyncSessionLocal = None
+
+# Фоновый планировщик может работать через собственный пул, чтобы не
+# конкурировать с API-запросами за соединения
+if settings.SCHEDULER_DB_POOL_SIZE > 0:
+    scheduler_engine = create_engine(
+        database_url,
+        poolclass=InstrumentedQueuePool,
+        **_pool_options(settings.SCHEDULER_DB_POOL_SIZE, settings.SCHEDULER_DB_MAX_OVERFLOW)
+    )
+    register_pool_metrics("scheduler", scheduler_engine)
+else:
+    scheduler_engine = engine
+SchedulerSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=scheduler_engine)
+
+Base = declarative_base() 
@@ -0,0 +1,119 @@
+"""
+Учет SQL-запросов в рамках HTTP-запроса или фоновой задачи.
+
+Слушатели событий Engine считают выполненные выражения и время в БД для
+текущей области учета (contextvar). Итог области пишется в лог на уровне INFO,
+если выражений не меньше QUERY_STATS_LOG_THRESHOLD, иначе DEBUG. Одинаковые выражения, отличающиеся
+только параметрами, группируются: если выражение повторилось не меньше
+N_PLUS_ONE_THRESHOLD раз, в лог пишется предупреждение о возможном N+1.
+"""
+import logging
+import time
+from collections import Counter as _StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ..core.config import settings
+from ..core.metrics import Counter, Summary
+
+logger = logging.getLogger(__name__)
+
+DB_STATEMENTS = Counter("db_statements_total", "Выполненные SQL-выражения по области учета")
+DB_SCOPE_QUERIES = Summary("db_scope_statements", "SQL-выражения на один запрос/задачу")
+DB_SCOPE_SECONDS = Summary("db_scope_seconds", "Время в БД на один запрос/задачу")
+DB_REPEATED_STATEMENTS = Counter("db_repeated_statements_total", "Области учета с повторяющимися выражениями (возможный N+1)")
+
+
+class QueryStats:
+    """Статистика SQL для одной области учета (вложенные области учитываются и во внешней)"""
+
+    def __init__(self, name: str, parent: Optional["QueryStats"] = None):
+        self.name = name
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        self.statements: _StatementCounter = _StatementCounter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+        if self.parent is not None:
+            self.parent.record(statement, duration)
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Выражения, выполненные не меньше threshold раз (кандидаты в N+1)"""
+        threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+@contextmanager
+def track_queries(name: str) -> Iterator[QueryStats]:
+    """
+    Считать SQL-выражения внутри блока.
+    Итог пишется в лог и метрики; повторы выражений помечаются как возможный N+1.
+    """
+    stats = QueryStats(name, parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        _report(stats)
+
+
+def _report(stats: QueryStats) -> None:
+    DB_STATEMENTS.inc(stats.count, scope=stats.name)
+    DB_SCOPE_QUERIES.observe(stats.count, scope=stats.name)
+    DB_SCOPE_SECONDS.observe(stats.duration, scope=stats.name)
+
+    level = logging.INFO if stats.count >= settings.QUERY_STATS_LOG_THRESHOLD else logging.DEBUG
+    if logger.isEnabledFor(level):
+        logger.log(level, f"{stats.name}: {stats.count} SQL-запросов, {stats.duration * 1000:.1f} мс в БД")
+    repeated = stats.repeated()
+    if repeated:
+        DB_REPEATED_STATEMENTS.inc(scope=stats.name)
+        for sql, n in repeated:
+            logger.warning(
+                f"{stats.name}: выражение выполнено {n} раз с разными параметрами (возможный N+1): "
+                f"{' '.join(sql.split())[:200]}"
+            )
+
+
+@contextmanager
+def assert_query_budget(max_queries: int, name: str = "budget") -> Iterator[QueryStats]:
+    """
+    Хелпер для тестов: блок должен уложиться в max_queries SQL-выражений.
+
+        with assert_query_budget(3):
+            await client.get("/api/v1/tasks/", headers=auth)
+    """
+    with track_queries(name) as stats:
+        yield stats
+    if stats.count > max_queries:
+        statements = "\n".join(f"  {n}x {' '.join(sql.split())[:200]}" for sql, n in stats.statements.most_common())
+        raise AssertionError(
+            f"Ожидалось не больше {max_queries} SQL-запросов, выполнено {stats.count}:\n{statements}"
+        )
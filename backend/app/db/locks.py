@@ -0,0 +1,29 @@
+"""
+Advisory-блокировки Postgres для фоновых задач.
+
+Планировщик запускается в каждом процессе uvicorn; задачи, которые должны
+выполняться одним процессом, берут блокировку по имени и пропускают запуск,
+если она уже занята.
+"""
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+
+@contextmanager
+def try_advisory_lock(engine: Engine, name: str) -> Iterator[bool]:
+    """
+    Сессионная блокировка на отдельном соединении: держится, пока выполняется блок,
+    независимо от коммитов в сессиях задачи. Возвращает True, если блокировка получена.
+    """
+    key = func.hashtext(name)
+    with engine.connect() as conn:
+        acquired = conn.execute(select(func.pg_try_advisory_lock(key))).scalar()
+        conn.commit()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                conn.execute(select(func.pg_advisory_unlock(key)))
+                conn.commit()
@@ -3,6 +3,9 @@ from .task import Task, TaskStep, TaskType, TaskPriority, TaskStatus
 from .goal import Goal, Achievement, UserAchievement, GoalType
 from .push_subscription import PushSubscription
 from .notification import Notification
+from .user_counters import UserCounters
+from .refresh_token import RefreshToken
+from .revoked_token import RevokedToken
 
 __all__ = [
     "User",
@@ -16,5 +19,8 @@ __all__ = [
     "UserAchievement",
     "GoalType",
     "PushSubscription",
-    "Notification"
+    "Notification",
+    "UserCounters",
+    "RefreshToken",
+    "RevokedToken"
 ] 
\ No newline at end of file
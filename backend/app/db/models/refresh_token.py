@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from ..base import Base
+
+
+class RefreshToken(Base):
+    """
+    Refresh-токен. Хранится только sha256 токена; при каждом обновлении
+    токен заменяется новым из того же семейства (family_id). Повторное
+    предъявление уже использованного токена отзывает все семейство.
+    """
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    used_at = Column(DateTime(timezone=True), nullable=True)  # токен обменян на новый
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
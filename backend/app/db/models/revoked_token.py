@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from ..base import Base
+
+
+class RevokedToken(Base):
+    """
+    Отозванный access-токен (по claim jti). Запись нужна только до истечения
+    самого токена: после expires_at токен отклоняется проверкой подписи и срока.
+    """
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # По revoked_at процессы дочитывают новые отзывы в фильтр (services/token_revocation.py)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
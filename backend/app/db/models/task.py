@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -33,6 +33,16 @@ class TaskStatus(str, enum.Enum):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Индексы под горячие запросы crud/task и планировщика
+        Index("ix_tasks_user_id_status_deadline", "user_id", "status", "deadline"),
+        Index("ix_tasks_user_id_deadline_id", "user_id", "deadline", "id"),
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_id_priority_deadline_id", "user_id", "priority", "deadline", "id"),
+        Index("ix_tasks_user_id_overdue", "user_id", postgresql_where=text("is_overdue")),
+        Index("ix_tasks_deadline_open", "deadline", postgresql_where=text("status <> 'completed'")),
+        Index("ix_tasks_user_id_completed_at", "user_id", "completed_at", postgresql_where=text("status = 'completed'")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -77,7 +87,7 @@ class TaskStep(Base):
     __tablename__ = "task_steps"
     
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
     
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
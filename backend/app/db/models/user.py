@@ -21,6 +21,9 @@ class User(Base):
     # Notification settings - only WebPush and Email
     email_notifications = Column(Boolean, default=True)
     
+    # Токен ленты календаря (calendar.ics?token=...); None — лента не выдавалась или отключена
+    calendar_token = Column(String(64), unique=True, index=True, nullable=True)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
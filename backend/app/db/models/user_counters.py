@@ -0,0 +1,37 @@
+from sqlalchemy import BigInteger, Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..base import Base
+
+
+class UserCounters(Base):
+    """
+    Счетчики пользователя для статистики, поддерживаемые инкрементально
+    в тех же транзакциях, что и изменения задач, целей и достижений.
+    Расхождения исправляет периодическая сверка (crud/counters.reconcile_all_counters).
+    """
+    __tablename__ = "user_counters"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    
+    # Задачи по статусам
+    total_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    pending_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    in_progress_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    overdue_tasks = Column(Integer, nullable=False, default=0, server_default="0")  # status = overdue
+    flagged_overdue_tasks = Column(Integer, nullable=False, default=0, server_default="0")  # is_overdue = true
+    
+    # Долги
+    yearly_debts = Column(Integer, nullable=False, default=0, server_default="0")
+    semester_debts = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    # Цели и достижения
+    completed_goals = Column(Integer, nullable=False, default=0, server_default="0")
+    total_points = Column(Integer, nullable=False, default=0, server_default="0")
+    achievements_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    # Версия данных пользователя: увеличивается при каждой записи задач, целей и достижений.
+    # Из нее строится ETag для условных GET
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,57 @@
+"""
+Пулы соединений с метриками.
+
+Публикуются gauge занятых соединений, overflow и размера пула, а также
+время ожидания свободного соединения и число таймаутов — по этим данным
+подбираются размеры пулов (DB_POOL_SIZE / DB_MAX_OVERFLOW и настройки
+SYNC_, READ_, SCHEDULER_ для остальных движков; метка pool — имя движка).
+"""
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from ..core.metrics import Counter, Gauge, Summary
+
+POOL_SIZE = Gauge("db_pool_size", "Настроенный размер пула соединений")
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Соединения, выданные из пула")
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Соединения сверх pool_size (отрицательное значение — не созданные слоты)")
+POOL_CHECKED_IN = Gauge("db_pool_checked_in", "Свободные соединения в пуле")
+POOL_WAIT_SECONDS = Summary("db_pool_wait_seconds", "Время ожидания соединения из пула")
+POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Запросы, не дождавшиеся соединения за pool_timeout")
+
+
+class _PoolMetricsMixin:
+    metrics_name = "default"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc(pool=self.metrics_name)
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start, pool=self.metrics_name)
+
+    def recreate(self):
+        # engine.dispose() пересоздает пул — имя для метрик сохраняем
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+class InstrumentedQueuePool(_PoolMetricsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_PoolMetricsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def register_pool_metrics(name: str, engine) -> None:
+    """Подписать пул движка под именем name и опубликовать его gauge"""
+    engine.pool.metrics_name = name
+    # Читаем engine.pool при каждом снятии метрик: после dispose() пул другой
+    POOL_SIZE.set_function(lambda: engine.pool.size(), pool=name)
+    POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout(), pool=name)
+    POOL_OVERFLOW.set_function(lambda: engine.pool.overflow(), pool=name)
+    POOL_CHECKED_IN.set_function(lambda: engine.pool.checkedin(), pool=name)
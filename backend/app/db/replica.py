@@ -0,0 +1,67 @@
+"""
+Маршрутизация чтения на реплику.
+
+Реплика используется, только если настроен DATABASE_READ_URL. При заданном
+DATABASE_READ_MAX_LAG_SECONDS лаг репликации периодически проверяется,
+и пока реплика отстает сильнее допустимого, чтение идет с primary.
+"""
+import logging
+import time
+from sqlalchemy import text
+from ..core.config import settings
+from ..core.metrics import Counter, Gauge
+from .base import read_async_engine
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG_SECONDS = Gauge("db_replica_lag_seconds", "Последний измеренный лаг реплики")
+READ_ROUTED = Counter("db_read_sessions_total", "Сессии только для чтения по месту выполнения")
+
+# Если реплика применила все полученные WAL, лаг считаем нулевым: иначе на
+# простаивающем primary время последней транзакции растет без реального отставания
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class _ReplicaState:
+    checked_at: float = float("-inf")
+    healthy: bool = True
+
+
+_state = _ReplicaState()
+
+
+async def _measure_lag() -> float:
+    async with read_async_engine.connect() as conn:
+        lag = (await conn.execute(_LAG_SQL)).scalar()
+    # NULL — сервер не в режиме восстановления (например, реплика указывает на primary)
+    return float(lag or 0)
+
+
+async def replica_available() -> bool:
+    """Можно ли сейчас читать с реплики"""
+    if read_async_engine is None:
+        return False
+    max_lag = settings.DATABASE_READ_MAX_LAG_SECONDS
+    if max_lag is None:
+        return True
+
+    now = time.monotonic()
+    if now - _state.checked_at < settings.DATABASE_READ_LAG_CHECK_INTERVAL:
+        return _state.healthy
+    # Отмечаем время до запроса, чтобы параллельные запросы не проверяли лаг одновременно
+    _state.checked_at = now
+    try:
+        lag = await _measure_lag()
+        REPLICA_LAG_SECONDS.set(lag)
+        healthy = lag <= max_lag
+        if not healthy and _state.healthy:
+            logger.warning(f"Реплика отстает на {lag:.1f} с, чтение переключено на primary")
+    except Exception as e:
+        if _state.healthy:
+            logger.error(f"Не удалось проверить лаг реплики, чтение переключено на primary: {e}")
+        healthy = False
+    _state.healthy = healthy
+    return healthy
@@ -1,6 +1,9 @@
-from typing import Generator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .base import SessionLocal
+from .base import SessionLocal, AsyncSessionLocal, ReadAsyncSessionLocal
+from .replica import replica_available, READ_ROUTED
 
 
 def get_db() -> Generator:
@@ -8,4 +11,35 @@ def get_db() -> Generator:
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def async_read_session() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия только для чтения: реплика, если она настроена и не отстает, иначе primary.
+    Нужна там, где сессия должна жить дольше зависимости (потоковые ответы).
+    """
+    if await replica_available():
+        READ_ROUTED.inc(target="replica")
+        async with ReadAsyncSessionLocal() as db:
+            yield db
+    else:
+        READ_ROUTED.inc(target="primary")
+        async with AsyncSessionLocal() as db:
+            yield db
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для эндпоинтов, которые только читают данные.
+    Идет на реплику, если она настроена и не отстает, иначе на primary.
+    Записи и чтение сразу после записи должны использовать get_async_db.
+    """
+    async with async_read_session() as db:
+        yield db
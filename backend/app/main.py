@@ -1,10 +1,15 @@
 import asyncio
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .core.config import settings
+from .core.hashing import PasswordHashingBusy, password_hasher
+from .core.metrics import REGISTRY
+from .db.instrumentation import track_queries
 from .api.v1 import api_router
+from .api.v1.responses import default_response_class
 from .services.background_tasks import BackgroundTaskService
 
 # Настройка логирования
@@ -17,14 +22,15 @@ async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
     # Запуск
     logger.info("Запуск приложения...")
+    budget = settings.db_connection_budget()
+    logger.info("Соединений с БД на процесс не больше: primary %(primary)s, реплика %(replica)s", budget)
     
-    # Запускаем фоновые задачи только если VAPID ключи настроены
-    if settings.VAPID_PRIVATE_KEY and settings.VAPID_PUBLIC_KEY:
-        task = asyncio.create_task(BackgroundTaskService.start_background_scheduler())
-        logger.info("Планировщик фоновых задач запущен")
-    else:
+    # Обслуживающие фоновые задачи работают всегда, уведомления — только с VAPID ключами
+    notifications_enabled = bool(settings.VAPID_PRIVATE_KEY and settings.VAPID_PUBLIC_KEY)
+    if not notifications_enabled:
         logger.warning("VAPID ключи не настроены, фоновые уведомления отключены")
-        task = None
+    task = asyncio.create_task(BackgroundTaskService.start_background_scheduler(notifications_enabled))
+    logger.info("Планировщик фоновых задач запущен")
     
     yield
     
@@ -36,13 +42,15 @@ async def lifespan(app: FastAPI):
             await task
         except asyncio.CancelledError:
             logger.info("Планировщик фоновых задач остановлен")
+    password_hasher.shutdown()
 
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     openapi_url=f"/api/v1/openapi.json",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=default_response_class()
 )
 
 # Set all CORS enabled origins
@@ -53,6 +61,32 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Заголовки пагинации должны быть доступны фронтенду
+        expose_headers=["X-Next-Cursor", "X-Total-Count"],
+    )
+
+if settings.QUERY_STATS_ENABLED:
+    @app.middleware("http")
+    async def count_queries(request: Request, call_next):
+        """Учет SQL-запросов на каждый HTTP-запрос"""
+        with track_queries(request.method) as stats:
+            response = await call_next(request)
+            # Шаблон пути вместо фактического URL: иначе id попадут в метки метрик
+            route = request.scope.get("route")
+            stats.name = f"{request.method} {getattr(route, 'path', 'unmatched')}"
+        if settings.QUERY_STATS_HEADERS:
+            response.headers["X-DB-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Time-Ms"] = f"{stats.duration * 1000:.1f}"
+        return response
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    """Очередь хеширования паролей заполнена — клиенту стоит повторить позже"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервер перегружен, повторите попытку позже"},
+        headers={"Retry-After": "1"},
     )
 
 app.include_router(api_router, prefix="/api/v1")
@@ -69,4 +103,11 @@ def read_root():
             "push_notifications": bool(settings.VAPID_PRIVATE_KEY),
             "telegram_bot": False  # Telegram integration disabled as per PRD requirements
         }
-    } 
\ No newline at end of file
+    }
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        """Метрики процесса в формате Prometheus"""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
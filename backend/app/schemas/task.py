@@ -1,6 +1,6 @@
-from typing import Optional, List
-from pydantic import BaseModel
-from datetime import datetime
+from typing import Dict, Optional, List
+from pydantic import BaseModel, Field, model_validator
+from datetime import date, datetime
 from ..db.models.task import TaskType, TaskPriority, TaskStatus
 
 
@@ -49,6 +49,10 @@ class TaskCreate(TaskBase):
     steps: List[TaskStepCreate] = []
 
 
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=1000)
+
+
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -89,4 +93,87 @@ class TaskStats(BaseModel):
     pending_tasks: int
     overdue_tasks: int
     yearly_debts: int
-    semester_debts: int 
\ No newline at end of file
+    semester_debts: int 
+
+# Схемы массовых операций
+class TaskBulkSelection(BaseModel):
+    """
+    Выбор задач для массовой операции: список id и/или фильтр.
+    Пустой список (min_length) и фильтр без условий отклоняются — иначе операция
+    затронула бы все задачи пользователя.
+    """
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=1000)
+    filter: Optional[TaskFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if self.ids is None and self.filter is None:
+            raise ValueError("Укажите ids или filter")
+        # Условия фильтра применяются только для заполненных полей (crud.task._task_filter_conditions)
+        if self.filter is not None and not any(self.filter.model_dump().values()):
+            raise ValueError("Фильтр не содержит условий")
+        return self
+
+
+class TaskBulkUpdate(TaskBulkSelection):
+    changes: TaskUpdate
+
+    @model_validator(mode="after")
+    def check_changes(self):
+        # В UPDATE попадают только переданные поля (exclude_unset), пустой changes ничего не изменил бы
+        if not self.changes.model_fields_set:
+            raise ValueError("changes не содержит изменений")
+        return self
+
+
+class TaskBulkDelete(TaskBulkSelection):
+    pass
+
+
+class TaskBulkUpdateItem(BaseModel):
+    id: int
+    status: Optional[TaskStatus] = None
+    priority: TaskPriority
+    deadline: datetime
+    completed_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class TaskBulkUpdateResult(BaseModel):
+    updated: List[TaskBulkUpdateItem]
+    not_found: List[int] = []
+
+
+class TaskBulkDeleteResult(BaseModel):
+    deleted: List[int]
+    not_found: List[int] = []
+
+
+# Схемы календаря
+class CalendarTask(BaseModel):
+    id: int
+    title: str
+    task_type: TaskType
+    priority: TaskPriority
+    status: Optional[TaskStatus] = None
+    deadline: datetime
+    color: Optional[str] = None
+    is_overdue: Optional[bool] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CalendarDay(BaseModel):
+    date: date
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+    tasks: List[CalendarTask]
+
+
+class TaskCalendar(BaseModel):
+    start: date
+    end: date
+    tz: str
+    days: List[CalendarDay]
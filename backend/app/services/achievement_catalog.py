@@ -0,0 +1,125 @@
+"""
+Кэш каталога достижений в памяти процесса.
+
+Таблица achievements почти не меняется, а читается при каждом GET /achievements/
+и каждой проверке достижений. Каталог загружается одним запросом и хранится
+неизменяемым снимком: схемы Achievement (без привязки к сессии), индекс по id
+и готовое JSON-тело ответа. Снимок живет ACHIEVEMENT_CATALOG_TTL_SECONDS;
+изменения достижений через ORM сбрасывают его сразу после коммита
+(в этом процессе — остальные процессы обновятся по TTL).
+"""
+import hashlib
+import time
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.metrics import Counter
+from ..db.models.goal import Achievement
+from ..schemas.achievement import Achievement as AchievementSchema
+
+CATALOG_LOADS = Counter("achievement_catalog_loads_total", "Загрузки каталога достижений по причине")
+
+_ADAPTER = TypeAdapter(Tuple[AchievementSchema, ...])
+
+
+class CatalogSnapshot(NamedTuple):
+    version: int
+    loaded_at: float
+    achievements: Tuple[AchievementSchema, ...]  # по возрастанию очков, как в get_all_achievements
+    by_id: Dict[int, AchievementSchema]
+    body: bytes  # JSON списка достижений для GET /achievements/
+    etag: str
+
+
+class AchievementCatalog:
+    """
+    Снимок каталога с TTL и явным сбросом.
+    Блокировок нет: параллельная загрузка безвредна, снимок заменяется целиком.
+    Загрузка, начатая до invalidate, свой снимок не устанавливает.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._generation = 0
+        self._version = 0
+
+    def current(self) -> Optional[CatalogSnapshot]:
+        """Снимок, если он загружен и не устарел"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+            return snapshot
+        return None
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+        return self.load(db, "expired" if self._snapshot is not None else "empty")
+
+    def load(self, db: Session, reason: str) -> CatalogSnapshot:
+        generation = self._generation
+        rows = db.query(Achievement).order_by(Achievement.points).all()
+        achievements = _ADAPTER.validate_python(rows, from_attributes=True)
+        body = _ADAPTER.dump_json(achievements)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        previous = self._snapshot
+        self._version += int(previous is None or previous.etag != etag)
+        snapshot = CatalogSnapshot(
+            version=self._version,
+            loaded_at=time.monotonic(),
+            achievements=achievements,
+            by_id={achievement.id: achievement for achievement in achievements},
+            body=body,
+            etag=etag,
+        )
+        if generation == self._generation:
+            self._snapshot = snapshot
+        CATALOG_LOADS.inc(reason=reason)
+        return snapshot
+
+    def lookup(self, db: Session, achievement_ids: Iterable[int]) -> CatalogSnapshot:
+        """Снимок, в котором есть все achievement_ids; при промахе каталог перечитывается один раз"""
+        snapshot = self.get(db)
+        if any(achievement_id not in snapshot.by_id for achievement_id in achievement_ids):
+            snapshot = self.load(db, "missing")
+        return snapshot
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._snapshot = None
+
+
+catalog = AchievementCatalog(ttl=settings.ACHIEVEMENT_CATALOG_TTL_SECONDS)
+
+
+def invalidate_achievement_catalog() -> None:
+    """Сбросить каталог (например, после изменения achievements в обход ORM)"""
+    catalog.invalidate()
+
+
+async def get_achievement_catalog_async(db: AsyncSession) -> CatalogSnapshot:
+    # Свежий снимок отдается без обращения к сессии
+    return catalog.current() or await db.run_sync(catalog.get)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_achievement_changes(session, flush_context):
+    if any(isinstance(obj, Achievement) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["achievements_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("achievements_changed", False):
+        catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("achievements_changed", None)
@@ -4,7 +4,12 @@ from datetime import datetime, timedelta, timezone
 from typing import List
 from sqlalchemy.orm import Session
 
-from ..db.session import SessionLocal
+from ..db.base import SchedulerSessionLocal, scheduler_engine
+from ..crud.counters import reconcile_all_counters
+from ..crud.refresh_token import delete_expired_refresh_tokens
+from ..crud.revoked_token import delete_expired_revoked_tokens
+from ..db.instrumentation import track_queries
+from ..db.locks import try_advisory_lock
 from ..db.models.task import Task
 from ..db.models.user import User
 from .notifications import notification_service
@@ -18,7 +23,7 @@ class BackgroundTaskService:
     @staticmethod
     def get_db():
         """Получить сессию базы данных для фоновых задач"""
-        db = SessionLocal()
+        db = SchedulerSessionLocal()
         try:
             return db
         finally:
@@ -181,29 +186,94 @@ class BackgroundTaskService:
             db.close()
     
     @staticmethod
-    async def start_background_scheduler():
-        """Запускает планировщик фоновых задач"""
+    def reconcile_counters():
+        """
+        Сверяет счетчики user_counters с исходными таблицами и исправляет расхождения.
+        Выполняется одним процессом (advisory-блокировка): остальные пропускают запуск.
+        Синхронная и долгая — планировщик вызывает ее в отдельном потоке.
+        """
+        with try_advisory_lock(scheduler_engine, "job:reconcile_counters") as acquired:
+            if not acquired:
+                logger.info("Сверка счетчиков уже выполняется другим процессом, пропускаем")
+                return
+            db = BackgroundTaskService.get_db()
+            try:
+                repaired = reconcile_all_counters(db)
+                if repaired > 0:
+                    logger.warning(f"Исправлены расходящиеся счетчики пользователей: {repaired}")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Ошибка при сверке счетчиков пользователей: {e}", exc_info=True)
+            finally:
+                db.close()
+    
+    @staticmethod
+    def cleanup_auth_tokens():
+        """
+        Удаляет истекшие и отозванные refresh-токены и отзывы истекших access-токенов.
+        Синхронная — планировщик вызывает ее в отдельном потоке.
+        """
+        db = BackgroundTaskService.get_db()
+        try:
+            deleted = delete_expired_refresh_tokens(db)
+            if deleted > 0:
+                logger.info(f"Удалено refresh-токенов: {deleted}")
+            deleted = delete_expired_revoked_tokens(db)
+            if deleted > 0:
+                logger.info(f"Удалено отзывов access-токенов: {deleted}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Ошибка при очистке токенов: {e}", exc_info=True)
+        finally:
+            db.close()
+    
+    @staticmethod
+    async def start_background_scheduler(notifications_enabled: bool = True):
+        """
+        Запускает планировщик фоновых задач.
+        Обслуживающие задачи (статусы просрочки, сверка счетчиков, очистка
+        токенов) выполняются всегда, push-уведомления — только при notifications_enabled.
+        """
         logger.info("Запуск планировщика фоновых задач")
         
         while True:
             try:
                 # Обновляем статусы просроченных задач каждые 15 минут
-                updated_count = TaskStatusService.update_overdue_tasks()
+                with track_queries("job:update_overdue_tasks"):
+                    updated_count = TaskStatusService.update_overdue_tasks()
                 if updated_count > 0:
                     logger.info(f"Обновлено статусов просрочки: {updated_count}")
                 
+                # Сверяем счетчики пользователей каждый час в :30
+                current_minute = datetime.now(timezone.utc).minute
+                if current_minute == 30:
+                    with track_queries("job:reconcile_counters"):
+                        # Полный пересчет не должен останавливать цикл событий
+                        await asyncio.to_thread(BackgroundTaskService.reconcile_counters)
+                
+                # Удаляем истекшие refresh-токены и отзывы каждый час в :45
+                if current_minute == 45:
+                    with track_queries("job:cleanup_auth_tokens"):
+                        await asyncio.to_thread(BackgroundTaskService.cleanup_auth_tokens)
+                
+                if not notifications_enabled:
+                    await asyncio.sleep(60)
+                    continue
+                
                 # Проверяем напоминания о дедлайнах каждые 15 минут
-                await BackgroundTaskService.check_deadline_reminders()
+                with track_queries("job:check_deadline_reminders"):
+                    await BackgroundTaskService.check_deadline_reminders()
                 
                 # Проверяем просроченные задачи каждый час
-                current_minute = datetime.now(timezone.utc).minute
                 if current_minute == 0:  # Каждый час в :00
-                    await BackgroundTaskService.check_overdue_tasks()
+                    with track_queries("job:check_overdue_tasks"):
+                        await BackgroundTaskService.check_overdue_tasks()
                 
                 # Отправляем ежедневные сводки в 9:00 UTC
                 current_time = datetime.now(timezone.utc).time()
                 if current_time.hour == 9 and current_time.minute == 0:
-                    await BackgroundTaskService.send_daily_summaries()
+                    with track_queries("job:send_daily_summaries"):
+                        await BackgroundTaskService.send_daily_summaries()
                 
                 # Ждем 1 минуту до следующей проверки
                 await asyncio.sleep(60)
@@ -0,0 +1,233 @@
+"""
+Формирование и разбор iCalendar (RFC 5545) для задач.
+
+Лента календаря: каждая задача — VEVENT в момент дедлайна.
+Импорт: VEVENT и VTODO превращаются в данные для TaskCreate;
+RRULE с FREQ=DAILY/WEEKLY/MONTHLY — в is_recurring/recurrence_pattern.
+Разбор построчный и не требует загрузки файла целиком.
+"""
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..crud import task as crud_task
+from ..db.models.task import TaskPriority, TaskType
+
+CALENDAR_MEDIA_TYPE = "text/calendar"
+
+RECURRENCE_TO_FREQ = {"daily": "DAILY", "weekly": "WEEKLY", "monthly": "MONTHLY"}
+FREQ_TO_RECURRENCE = {freq: pattern for pattern, freq in RECURRENCE_TO_FREQ.items()}
+
+_CALENDAR_HEADER = (
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Student Planner//Tasks//RU",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+    "X-WR-CALNAME:Student Planner",
+)
+
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def unescape_text(value: str) -> str:
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, "")
+            result.append("\n" if char in "nN" else char)
+        else:
+            result.append(char)
+    return "".join(result)
+
+
+def fold_line(line: str) -> str:
+    """Перенос строки длиннее 75 октетов (продолжение начинается с пробела)"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Не разрываем многобайтовый символ UTF-8
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _format_utc(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def format_event(row: Any, uid_domain: str) -> str:
+    """VEVENT для строки calendar_tasks_select"""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:task-{row.id}@{uid_domain}",
+        f"DTSTAMP:{_format_utc(row.updated_at or row.created_at)}",
+        f"LAST-MODIFIED:{_format_utc(row.updated_at or row.created_at)}",
+        f"DTSTART:{_format_utc(row.deadline)}",
+        "DURATION:PT0S",
+        f"SUMMARY:{escape_text(row.title)}",
+        f"CATEGORIES:{row.task_type.value}",
+    ]
+    if row.description:
+        lines.append(f"DESCRIPTION:{escape_text(row.description)}")
+    if row.is_recurring and row.recurrence_pattern in RECURRENCE_TO_FREQ:
+        lines.append(f"RRULE:FREQ={RECURRENCE_TO_FREQ[row.recurrence_pattern]}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) for line in lines)
+
+
+async def stream_calendar(db: AsyncSession, user_id: int) -> AsyncIterator[str]:
+    """Лента календаря пользователя: по фрагменту на порцию строк серверного курсора"""
+    uid_domain = urlparse(settings.BACKEND_URL).hostname or "localhost"
+    yield "".join(fold_line(line) for line in _CALENDAR_HEADER)
+    stmt = crud_task.calendar_tasks_select(user_id).execution_options(
+        yield_per=settings.TASK_EXPORT_BATCH_SIZE
+    )
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        yield "".join(format_event(row, uid_domain) for row in rows)
+    yield fold_line("END:VCALENDAR")
+
+
+# Разбор
+
+Property = Tuple[str, Dict[str, str], str]
+
+
+def parse_property(line: str) -> Optional[Property]:
+    """NAME;PARAM=value;PARAM="a:b":VALUE -> (NAME, {PARAM: value}, VALUE)"""
+    in_quotes = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ":" and not in_quotes:
+            head, value = line[:index], line[index + 1:]
+            break
+    else:
+        return None
+    name, *raw_params = head.split(";")
+    params = {}
+    for raw in raw_params:
+        key, _, param_value = raw.partition("=")
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+async def _unfold(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, str]]:
+    """Склеить перенесенные строки; номер — строка начала свойства"""
+    current = None
+    current_line = 0
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current_line, current
+        current, current_line = line, line_no
+    if current is not None:
+        yield current_line, current
+
+
+async def iter_components(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, str, List[Property]]]:
+    """Компоненты VEVENT/VTODO: (строка BEGIN, имя, свойства). Вложенные (VALARM) пропускаются"""
+    component = None
+    start_line = 0
+    properties: List[Property] = []
+    depth = 0
+    async for line_no, line in _unfold(lines):
+        prop = parse_property(line)
+        if prop is None:
+            continue
+        name, _, value = prop
+        value = value.strip().upper()
+        if component is None:
+            if name == "BEGIN" and value in ("VEVENT", "VTODO"):
+                component, start_line, properties, depth = value, line_no, [], 0
+            continue
+        if name == "BEGIN":
+            depth += 1
+        elif name == "END" and depth:
+            depth -= 1
+        elif name == "END" and value == component:
+            yield start_line, component, properties
+            component = None
+        elif not depth:
+            properties.append(prop)
+
+
+def parse_datetime(value: str, params: Dict[str, str]) -> datetime:
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value, "%Y%m%d")
+    if value.endswith("Z"):
+        return datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+    parsed = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    if "TZID" in params:
+        try:
+            return parsed.replace(tzinfo=ZoneInfo(params["TZID"]))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return parsed
+
+
+def component_to_task(component: str, properties: List[Property]) -> Dict[str, Any]:
+    """Данные TaskCreate из VEVENT/VTODO. Дедлайн VTODO — DUE, иначе DTSTART"""
+    props: Dict[str, Tuple[Dict[str, str], str]] = {}
+    for name, params, value in properties:
+        props.setdefault(name, (params, value))
+    
+    deadline_prop = (props.get("DUE") if component == "VTODO" else None) or props.get("DTSTART")
+    if deadline_prop is None:
+        raise ValueError(f"{component} без даты (DTSTART/DUE)")
+    
+    task: Dict[str, Any] = {
+        "title": unescape_text(props["SUMMARY"][1]) if "SUMMARY" in props else "Без названия",
+        "deadline": parse_datetime(deadline_prop[1], deadline_prop[0]),
+        "task_type": TaskType.other,
+        "priority": TaskPriority.current,
+    }
+    if "DESCRIPTION" in props:
+        task["description"] = unescape_text(props["DESCRIPTION"][1])
+    if "CATEGORIES" in props:
+        # Тип задачи сохраняется в CATEGORIES при выгрузке ленты
+        for category in props["CATEGORIES"][1].split(","):
+            if category.strip().lower() in TaskType.__members__:
+                task["task_type"] = TaskType(category.strip().lower())
+                break
+    if "RRULE" in props:
+        rule = dict(part.partition("=")[::2] for part in props["RRULE"][1].upper().split(";"))
+        task["is_recurring"] = True
+        task["recurrence_pattern"] = FREQ_TO_RECURRENCE.get(rule.get("FREQ"))
+    return task
+
+
+async def iter_task_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """(номер строки, данные TaskCreate или ошибка) для каждого VEVENT/VTODO"""
+    async for line_no, component, properties in iter_components(lines):
+        try:
+            yield line_no, component_to_task(component, properties)
+        except ValueError as e:
+            yield line_no, e
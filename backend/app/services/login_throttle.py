@@ -0,0 +1,185 @@
+"""
+Ограничение попыток входа по email и по IP.
+
+Неудачные попытки считаются в скользящем окне LOGIN_FAILURE_WINDOW_SECONDS.
+Когда число неудач по ключу достигает лимита, ключ блокируется на
+LOGIN_LOCKOUT_BASE_SECONDS * 2^n, где n — число предыдущих блокировок
+(не больше LOGIN_LOCKOUT_MAX_SECONDS). Проверка блокировки идет до обращения
+к БД и bcrypt, поэтому перебор паролей не превращается в нагрузку на CPU.
+Успешный вход сбрасывает счетчик email (счетчик IP остается). IP клиента
+берется с учетом заголовков доверенного прокси (core/proxies.py): за nginx
+адрес соединения один на всех, и лимит IP блокировал бы всех пользователей разом.
+
+Состояние хранится в памяти процесса или, если задан LOGIN_THROTTLE_REDIS_URL,
+в Redis — тогда лимиты общие для всех процессов.
+"""
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Iterable, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.metrics import Counter
+
+LOGIN_THROTTLED = Counter("login_throttled_total", "Попытки входа, отклоненные до проверки пароля")
+LOGIN_LOCKOUTS = Counter("login_lockouts_total", "Блокировки ключей входа (kind=email|ip)")
+
+Key = Tuple[str, str, int]  # (вид, значение, лимит неудач)
+
+
+def _lockout_seconds(level: int) -> float:
+    return min(settings.LOGIN_LOCKOUT_MAX_SECONDS, settings.LOGIN_LOCKOUT_BASE_SECONDS * 2 ** level)
+
+
+class _KeyState:
+    __slots__ = ("failures", "locked_until", "level", "level_expires")
+
+    def __init__(self):
+        self.failures: Deque[float] = deque()
+        self.locked_until = 0.0
+        self.level = 0
+        self.level_expires = 0.0
+
+
+class MemoryThrottleBackend:
+    """Состояние в памяти процесса; ключей не больше LOGIN_THROTTLE_MAX_KEYS (вытесняются давние)"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._states: "OrderedDict[str, _KeyState]" = OrderedDict()
+
+    def _state(self, key: str, create: bool) -> Optional[_KeyState]:
+        state = self._states.get(key)
+        if state is None and create:
+            state = self._states[key] = _KeyState()
+            while len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+        if state is not None:
+            self._states.move_to_end(key)
+        return state
+
+    async def locked_for(self, key: str, now: float) -> float:
+        state = self._state(key, create=False)
+        return max(0.0, state.locked_until - now) if state is not None else 0.0
+
+    async def record_failure(self, key: str, limit: int, now: float) -> float:
+        """Учесть неудачу; вернуть длительность новой блокировки или 0"""
+        state = self._state(key, create=True)
+        window = settings.LOGIN_FAILURE_WINDOW_SECONDS
+        while state.failures and state.failures[0] <= now - window:
+            state.failures.popleft()
+        state.failures.append(now)
+        if len(state.failures) < limit:
+            return 0.0
+        if state.level_expires <= now:
+            state.level = 0
+        duration = _lockout_seconds(state.level)
+        state.locked_until = now + duration
+        state.level += 1
+        # Уровень блокировки помнится, пока не пройдет окно после ее окончания
+        state.level_expires = state.locked_until + window
+        state.failures.clear()
+        return duration
+
+    async def reset(self, key: str) -> None:
+        self._states.pop(key, None)
+
+
+class RedisThrottleBackend:
+    """
+    Общее состояние в Redis: неудачи — sorted set с отметками времени,
+    блокировка — ключ с TTL, уровень блокировки — счетчик с TTL.
+    """
+
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        if client is None:
+            import redis.asyncio as redis  # необязательная зависимость, нужна только с LOGIN_THROTTLE_REDIS_URL
+
+            client = redis.from_url(url)
+        self._redis = client
+        self._prefix = "login-throttle:"
+
+    async def locked_for(self, key: str, now: float) -> float:
+        ttl_ms = await self._redis.pttl(f"{self._prefix}lock:{key}")
+        return ttl_ms / 1000 if ttl_ms > 0 else 0.0
+
+    async def record_failure(self, key: str, limit: int, now: float) -> float:
+        window = settings.LOGIN_FAILURE_WINDOW_SECONDS
+        failures_key = f"{self._prefix}failures:{key}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(failures_key, 0, now - window)
+            # Случайный суффикс: неудачи с одинаковой отметкой времени не сливаются в одну
+            pipe.zadd(failures_key, {f"{now:.6f}:{secrets.token_hex(4)}": now})
+            pipe.zcard(failures_key)
+            pipe.expire(failures_key, window)
+            _, _, count, _ = await pipe.execute()
+        if count < limit:
+            return 0.0
+        level_key = f"{self._prefix}level:{key}"
+        level = await self._redis.incr(level_key) - 1
+        duration = _lockout_seconds(level)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(f"{self._prefix}lock:{key}", 1, px=int(duration * 1000))
+            pipe.expire(level_key, int(duration + window))
+            pipe.delete(failures_key)
+            await pipe.execute()
+        return duration
+
+    async def reset(self, key: str) -> None:
+        await self._redis.delete(
+            f"{self._prefix}failures:{key}", f"{self._prefix}lock:{key}", f"{self._prefix}level:{key}"
+        )
+
+
+class LoginThrottle:
+    def __init__(self):
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if settings.LOGIN_THROTTLE_REDIS_URL:
+                self._backend = RedisThrottleBackend(settings.LOGIN_THROTTLE_REDIS_URL)
+            else:
+                self._backend = MemoryThrottleBackend(settings.LOGIN_THROTTLE_MAX_KEYS)
+        return self._backend
+
+    def use(self, backend=None) -> None:
+        """Заменить хранилище (None — выбрать заново по настройкам)"""
+        self._backend = backend
+
+    @staticmethod
+    def keys(email: str, client_ip: Optional[str]) -> List[Key]:
+        keys = [("email", email.strip().lower(), settings.LOGIN_EMAIL_MAX_FAILURES)]
+        if client_ip:
+            keys.append(("ip", client_ip, settings.LOGIN_IP_MAX_FAILURES))
+        return keys
+
+    async def retry_after(self, keys: Iterable[Key]) -> int:
+        """Секунды до конца самой долгой блокировки среди ключей (0 — вход разрешен)"""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return 0
+        now = time.time()
+        locked = [await self.backend.locked_for(f"{kind}:{value}", now) for kind, value, _ in keys]
+        seconds = max(locked, default=0.0)
+        if seconds:
+            LOGIN_THROTTLED.inc()
+        return int(seconds) + 1 if seconds else 0
+
+    async def failure(self, keys: Iterable[Key]) -> None:
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        now = time.time()
+        for kind, value, limit in keys:
+            if await self.backend.record_failure(f"{kind}:{value}", limit, now):
+                LOGIN_LOCKOUTS.inc(kind=kind)
+
+    async def success(self, keys: Iterable[Key]) -> None:
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        for kind, value, _ in keys:
+            if kind == "email":
+                await self.backend.reset(f"{kind}:{value}")
+
+
+login_throttle = LoginThrottle()
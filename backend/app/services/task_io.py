@@ -0,0 +1,182 @@
+"""
+Потоковый экспорт и импорт задач в форматах NDJSON и CSV (импорт также из iCalendar).
+
+Экспорт читает строки из серверного курсора порциями и отдает их клиенту
+по мере чтения, импорт разбирает тело запроса по мере поступления
+и вставляет задачи пакетами — память не зависит от объема данных.
+"""
+import csv
+import codecs
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..crud import task as crud_task
+from ..schemas.task import TaskCreate
+from . import ics
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Сколько ошибок разбора возвращать в ответе импорта
+MAX_REPORTED_ERRORS = 100
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def stream_tasks_export(db: AsyncSession, user_id: int, export_format: str) -> AsyncIterator[str]:
+    """Выгрузка задач пользователя: по одному фрагменту текста на порцию строк курсора"""
+    include_steps = export_format == "ndjson"
+    stmt = crud_task.export_tasks_select(user_id, include_steps=include_steps).execution_options(
+        yield_per=settings.TASK_EXPORT_BATCH_SIZE
+    )
+    result = await db.stream(stmt)
+    
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(crud_task.EXPORT_COLUMNS)
+        async for rows in result.partitions():
+            writer.writerows([_csv_value(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        async for rows in result.partitions():
+            yield "".join(
+                json.dumps(dict(row._mapping), default=_json_default, ensure_ascii=False) + "\n"
+                for row in rows
+            )
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Строки текста из потока байтов (UTF-8, символ может быть разрезан между фрагментами)"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    async for chunk in chunks:
+        # Делим только по \n: str.splitlines режет и по U+2028 и т.п. внутри значений
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, ValueError(f"Некорректный JSON: {e.msg}")
+
+
+async def _iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Записи CSV с заголовком. Строки копятся, пока число кавычек нечетное:
+    значит, запись продолжается в кавычках на следующей строке.
+    """
+    header = None
+    pending: List[str] = []
+    quotes = 0
+    line_no = 0
+    record_line = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not pending:
+            record_line = line_no
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        values = next(csv.reader(pending), [])
+        pending, quotes = [], 0
+        if not values:
+            continue
+        if header is None:
+            header = values
+            continue
+        yield record_line, dict(zip(header, values))
+    if pending:
+        yield record_line, ValueError("Незакрытая кавычка в конце файла")
+
+
+def _task_from_record(record: Any, export_format: str) -> TaskCreate:
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Ожидался объект задачи")
+    if export_format == "csv":
+        # Пустая ячейка CSV означает отсутствующее значение
+        record = {key: value for key, value in record.items() if value != ""}
+    return TaskCreate.model_validate(record)
+
+
+async def import_tasks(
+    db: AsyncSession, user_id: int, chunks: AsyncIterator[bytes], import_format: str
+) -> Dict[str, Any]:
+    """
+    Импорт задач из потока NDJSON/CSV/iCalendar. Каждая запись проходит валидацию TaskCreate;
+    некорректные записи пропускаются и попадают в errors (с номером строки),
+    корректные вставляются пакетами по TASK_IMPORT_BATCH_SIZE.
+    """
+    if import_format == "csv":
+        records = _iter_csv(chunks)
+    elif import_format == "ics":
+        records = ics.iter_task_records(_iter_lines(chunks))
+    else:
+        records = _iter_ndjson(chunks)
+    batch: List[TaskCreate] = []
+    imported = 0
+    failed = 0
+    errors: List[Dict[str, Any]] = []
+    
+    async for line_no, record in records:
+        try:
+            batch.append(_task_from_record(record, import_format))
+        except (ValidationError, ValueError) as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                message = "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                ) if isinstance(e, ValidationError) else str(e)
+                errors.append({"line": line_no, "error": message})
+            continue
+        if len(batch) >= settings.TASK_IMPORT_BATCH_SIZE:
+            await crud_task.create_tasks_async(db, batch, user_id)
+            imported += len(batch)
+            batch = []
+    
+    if batch:
+        await crud_task.create_tasks_async(db, batch, user_id)
+        imported += len(batch)
+    
+    return {"imported": imported, "failed": failed, "errors": errors}
@@ -2,7 +2,8 @@ from typing import List
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 from ..db.models.task import Task, TaskStatus
-from ..db.session import SessionLocal
+from ..db.base import SchedulerSessionLocal
+from ..crud.counters import apply_counter_deltas, merge_deltas, task_deltas, task_snapshot
 
 
 class TaskStatusService:
@@ -14,24 +15,31 @@ class TaskStatusService:
         Обновляет статусы просроченных задач.
         Возвращает количество обновленных задач.
         """
-        db = SessionLocal()
+        db = SchedulerSessionLocal()
         try:
             now = datetime.now(timezone.utc)
             
-            # Находим задачи, которые просрочены, но еще не помечены как просроченные
+            # Находим задачи, которые просрочены, но еще не помечены как просроченные.
+            # Строки блокируются до коммита, а занятые (их меняет пользователь или другой
+            # воркер) пропускаются до следующего запуска: дельта каждой задачи
+            # считается от состояния, которое больше никто не изменит параллельно
             overdue_tasks = db.query(Task).filter(
                 Task.deadline < now,
                 Task.status.in_([TaskStatus.pending, TaskStatus.in_progress]),
                 Task.is_overdue == False
-            ).all()
+            ).with_for_update(skip_locked=True).all()
             
             updated_count = 0
+            deltas = {}
             for task in overdue_tasks:
+                before = task_snapshot(task)
                 task.is_overdue = True
                 task.status = TaskStatus.overdue
+                merge_deltas(deltas, task.user_id, task_deltas(before, task_snapshot(task)))
                 updated_count += 1
             
             if updated_count > 0:
+                apply_counter_deltas(db, deltas)
                 db.commit()
                 
             return updated_count
@@ -57,14 +65,16 @@ class TaskStatusService:
         task = db.query(Task).filter(
             Task.id == task_id,
             Task.user_id == user_id
-        ).first()
+        ).with_for_update().populate_existing().first()
         
         if not task:
             return False
             
+        before = task_snapshot(task)
         task.status = TaskStatus.completed
         task.completed_at = datetime.now(timezone.utc)
         task.is_overdue = False  # Сбрасываем флаг просрочки
         
+        apply_counter_deltas(db, {user_id: task_deltas(before, task_snapshot(task))})
         db.commit()
         return True 
\ No newline at end of file
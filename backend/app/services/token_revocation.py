@@ -0,0 +1,200 @@
+"""
+Отзыв access-токенов без запроса к БД на каждый запрос.
+
+Токены несут claim jti. Отозванные jti (таблица revoked_tokens) каждый процесс
+держит в фильтре Блума: проверка — k обращений к битовому массиву, без
+криптографического хеша (jti — случайный uuid4, его биты уже равномерны)
+и без создания коллекций. Отрицательный ответ фильтра точен; при попадании
+(отозванный токен или ложное срабатывание с вероятностью
+TOKEN_REVOCATION_FILTER_ERROR_RATE) jti проверяется по БД, ответ запоминается.
+
+Процесс дочитывает новые отзывы раз в TOKEN_REVOCATION_SYNC_SECONDS (запрос по
+индексу revoked_at) и пересобирает фильтр целиком раз в
+TOKEN_REVOCATION_REBUILD_SECONDS, выбрасывая истекшие токены. Отзыв через ORM
+попадает в фильтр этого процесса сразу после коммита, остальных — не позже
+TOKEN_REVOCATION_SYNC_SECONDS.
+
+Токены без jti (выданные до его появления) отозвать нельзя, они истекают
+через ACCESS_TOKEN_EXPIRE_MINUTES.
+"""
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.metrics import Counter, Gauge
+from ..crud.revoked_token import get_revoked_jtis, is_token_revoked
+from ..db.models.revoked_token import RevokedToken
+
+REVOCATION_SYNCS = Counter("token_revocation_syncs_total", "Загрузки отзывов в фильтр (kind=full|incremental)")
+REVOCATION_LOOKUPS = Counter(
+    "token_revocation_lookups_total", "Проверки по БД после попадания в фильтр (result=revoked|false_positive)"
+)
+REVOCATION_ENTRIES = Gauge("token_revocation_filter_entries", "Отозванные jti в фильтре процесса")
+
+_MASK64 = (1 << 64) - 1
+# revoked_at — время начала транзакции отзыва, а закоммититься она может позже,
+# поэтому каждое дочитывание перекрывает предыдущее на этот запас
+SYNC_OVERLAP = timedelta(seconds=30)
+CONFIRMED_MAX_SIZE = 10000
+
+
+def _hash_pair(jti: str) -> Tuple[int, int]:
+    """Два 64-битных хеша для двойного хеширования; для uuid4().hex — сами биты jti"""
+    value = None
+    if len(jti) == 32:
+        try:
+            value = int(jti, 16)
+        except ValueError:
+            pass
+    if value is None:
+        value = int.from_bytes(hashlib.blake2b(jti.encode(), digest_size=16).digest(), "big")
+    return value & _MASK64, (value >> 64) | 1
+
+
+class BloomFilter:
+    """Битовый массив на bytearray; позиции элемента — (h1 + i * h2) mod size, i < hashes"""
+    __slots__ = ("size", "hashes", "count", "_bits")
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0  # добавленные элементы (повторное добавление не считается)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def add(self, jti: str) -> None:
+        h1, h2 = _hash_pair(jti)
+        bits, size = self._bits, self.size
+        added = False
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        self.count += added
+
+    def __contains__(self, jti: str) -> bool:
+        h1, h2 = _hash_pair(jti)
+        bits, size = self._bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class TokenRevocationList:
+    """
+    Фильтр отзывов процесса и точные ответы для jti, попавших в фильтр.
+    Обращения идут из цикла событий (get_current_user и хуки async-сессий),
+    поэтому блокировок нет; пересобранный фильтр заменяется целиком.
+    """
+
+    def __init__(self):
+        self._filter: Optional[BloomFilter] = None
+        self._capacity = 0
+        self._watermark: Optional[datetime] = None  # наибольший загруженный revoked_at
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._syncing = False
+        self._confirmed: "OrderedDict[str, bool]" = OrderedDict()
+        REVOCATION_ENTRIES.set_function(lambda: self._filter.count if self._filter is not None else 0)
+
+    def stale(self) -> bool:
+        return self._filter is None or time.monotonic() - self._synced_at >= settings.TOKEN_REVOCATION_SYNC_SECONDS
+
+    def sync(self, db: Session) -> None:
+        """Дочитать новые отзывы; при первом вызове, по таймеру или при переполнении — пересобрать фильтр"""
+        now = time.monotonic()
+        bloom = self._filter
+        if (bloom is None or bloom.count > self._capacity
+                or now - self._built_at >= settings.TOKEN_REVOCATION_REBUILD_SECONDS):
+            rows = get_revoked_jtis(db)
+            self._capacity = max(settings.TOKEN_REVOCATION_FILTER_CAPACITY, 2 * len(rows))
+            bloom = BloomFilter(self._capacity, settings.TOKEN_REVOCATION_FILTER_ERROR_RATE)
+            self._watermark = None
+            self._add_rows(bloom, rows)
+            self._filter = bloom
+            self._confirmed.clear()
+            self._built_at = now
+            REVOCATION_SYNCS.inc(kind="full")
+        else:
+            since = self._watermark - SYNC_OVERLAP if self._watermark is not None else None
+            self._add_rows(bloom, get_revoked_jtis(db, since))
+            REVOCATION_SYNCS.inc(kind="incremental")
+        self._synced_at = now
+
+    def _add_rows(self, bloom: BloomFilter, rows: Iterable[Tuple[str, datetime]]) -> None:
+        for jti, revoked_at in rows:
+            bloom.add(jti)
+            # Ложное срабатывание, запомненное до отзыва, больше не верно
+            self._confirmed.pop(jti, None)
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+
+    def add(self, jti: str) -> None:
+        """Отзыв, закоммиченный в этом процессе; незагруженный фильтр прочитает его из БД сам"""
+        if self._filter is not None:
+            self._filter.add(jti)
+        self._remember(jti, True)
+
+    def _remember(self, jti: str, revoked: bool) -> None:
+        self._confirmed[jti] = revoked
+        self._confirmed.move_to_end(jti)
+        while len(self._confirmed) > CONFIRMED_MAX_SIZE:
+            self._confirmed.popitem(last=False)
+
+    async def is_revoked_async(self, db: AsyncSession, jti: str) -> bool:
+        # Пока идет дочитывание, остальные запросы проверяются по текущему фильтру
+        if self.stale() and not (self._syncing and self._filter is not None):
+            self._syncing = True
+            try:
+                await db.run_sync(self.sync)
+            finally:
+                self._syncing = False
+        if jti not in self._filter:
+            return False
+        revoked = self._confirmed.get(jti)
+        if revoked is None:
+            revoked = await db.run_sync(is_token_revoked, jti)
+            REVOCATION_LOOKUPS.inc(result="revoked" if revoked else "false_positive")
+            self._remember(jti, revoked)
+        return revoked
+
+    def clear(self) -> None:
+        self._filter = None
+        self._watermark = None
+        self._confirmed.clear()
+
+
+token_revocations = TokenRevocationList()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_revocations(session, flush_context):
+    jtis = [obj.jti for obj in session.new if isinstance(obj, RevokedToken)]
+    if jtis:
+        session.info.setdefault("revoked_jtis", []).extend(jtis)
+
+
+@event.listens_for(Session, "after_commit")
+def _add_after_commit(session):
+    for jti in session.info.pop("revoked_jtis", ()):
+        token_revocations.add(jti)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_revocations(session):
+    session.info.pop("revoked_jtis", None)
@@ -0,0 +1,51 @@
+"""
+Кэш текущего пользователя для авторизации (пространство user общего кэша, core/cache.py).
+
+Токен содержит id пользователя (claim uid), поэтому get_current_user берет
+небольшую запись (id, email, is_active) отсюда и не читает users на каждый
+запрос. Изменения User через ORM (update_user, change_password, деактивация)
+удаляют запись сразу после коммита. С CACHE_BACKEND=redis кэш общий, и
+удаление видят все процессы; с кэшем в памяти остальные процессы увидят
+изменение не позже USER_CACHE_TTL_SECONDS.
+"""
+from typing import NamedTuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..core.cache import cache
+from ..core.config import settings
+from ..db.models.user import User
+
+
+class CurrentUser(NamedTuple):
+    """Пользователь запроса: все, что нужно эндпоинтам, кроме /auth/me"""
+    id: int
+    email: str
+    is_active: bool
+
+    @classmethod
+    def from_orm(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, email=user.email, is_active=bool(user.is_active))
+
+
+# В Redis запись хранится JSON-списком полей
+user_cache = cache.namespace("user", ttl=settings.USER_CACHE_TTL_SECONDS, loads=lambda fields: CurrentUser(*fields))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session, flush_context):
+    changed = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.discard(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("changed_user_ids", None)
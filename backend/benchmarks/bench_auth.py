@@ -0,0 +1,133 @@
+"""
+Стоимость авторизации на запрос: полная проверка JWT (jwt.decode) против
+кэша проверенных токенов (TOKEN_CACHE_SIZE) и проверка отзыва по фильтру Блума.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.bench_auth --email student@example.com --requests 500
+
+Выводит время verify_token, зависимости get_current_user (кэш пользователей
+прогрет, к БД она не обращается) и CPU процесса на условный GET
+/tasks/stats/summary, отвеченный 304, — в нем почти нет работы, кроме авторизации.
+Отдельно — проверка jti по фильтру отзыва на TOKEN_REVOCATION_FILTER_CAPACITY
+элементов против множества строк.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.auth import get_current_user
+from app.core import security
+from app.core.config import settings
+from app.crud.user import get_user_by_email
+from app.db.base import AsyncSessionLocal, SessionLocal
+from app.main import app
+from app.services.token_revocation import BloomFilter
+
+CACHE_SIZE = settings.TOKEN_CACHE_SIZE or 10000
+
+
+def _set_cache(enabled: bool) -> None:
+    settings.TOKEN_CACHE_SIZE = CACHE_SIZE if enabled else 0
+    security.token_cache.clear()
+
+
+def bench_verify(token: str, repeats: int) -> None:
+    print(f"verify_token и get_current_user (среднее по {repeats} вызовам)")
+
+    async def resolve():
+        # Сессия нужна только для дочитывания отзывов (раз в TOKEN_REVOCATION_SYNC_SECONDS)
+        async with AsyncSessionLocal() as db:
+            for _ in range(repeats):
+                await get_current_user(db=db, token=token)
+
+    rows = []
+    for enabled in (False, True):
+        _set_cache(enabled)
+        security.verify_token(token)  # прогрев кэша токенов
+        start = time.perf_counter()
+        for _ in range(repeats):
+            security.verify_token(token)
+        verify = (time.perf_counter() - start) / repeats * 1e6
+        start = time.perf_counter()
+        asyncio.run(resolve())
+        resolve_time = (time.perf_counter() - start) / repeats * 1e6
+        rows.append((verify, resolve_time))
+    (verify_off, resolve_off), (verify_on, resolve_on) = rows
+    print(f"  verify_token      {verify_off:8.1f} -> {verify_on:6.1f} us ({verify_off / verify_on:.0f}x)")
+    print(f"  get_current_user  {resolve_off:8.1f} -> {resolve_on:6.1f} us ({resolve_off / resolve_on:.0f}x)")
+
+
+def bench_http(client: TestClient, headers: dict, requests: int) -> None:
+    path = "/api/v1/tasks/stats/summary"
+    etag = client.get(path, headers=headers).headers["etag"]
+    conditional = {**headers, "If-None-Match": etag}
+    print(f"HTTP {path} -> 304, CPU процесса на запрос (среднее по {requests} запросам)")
+    results = []
+    for enabled in (False, True):
+        _set_cache(enabled)
+        client.get(path, headers=conditional)  # прогрев
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for _ in range(requests):
+            response = client.get(path, headers=conditional)
+            assert response.status_code == 304, response.status_code
+        results.append((
+            (time.process_time() - cpu_start) / requests * 1000,
+            (time.perf_counter() - wall_start) / requests * 1000,
+        ))
+    (cpu_off, wall_off), (cpu_on, wall_on) = results
+    print(f"  cpu {cpu_off:6.3f} -> {cpu_on:6.3f} ms, wall {wall_off:6.3f} -> {wall_on:6.3f} ms")
+
+
+def bench_revocation(repeats: int) -> None:
+    capacity = settings.TOKEN_REVOCATION_FILTER_CAPACITY
+    revoked = [uuid.uuid4().hex for _ in range(capacity)]
+    bloom = BloomFilter(capacity, settings.TOKEN_REVOCATION_FILTER_ERROR_RATE)
+    for jti in revoked:
+        bloom.add(jti)
+    exact = set(revoked)
+    probes = [uuid.uuid4().hex for _ in range(repeats)]
+    print(f"Фильтр отзыва на {capacity} jti: {bloom.size} бит, {bloom.hashes} хешей")
+    set_bytes = sys.getsizeof(exact) + sum(sys.getsizeof(jti) for jti in revoked)
+    print(f"  память          {bloom.nbytes / 1024:8.0f} KiB (set строк: {set_bytes / 1024:.0f} KiB)")
+    for label, keys in (("не отозван", probes), ("отозван", revoked[:repeats])):
+        start = time.perf_counter()
+        for jti in keys:
+            jti in bloom
+        elapsed = (time.perf_counter() - start) / len(keys) * 1e6
+        print(f"  {label:<15} {elapsed:8.2f} us")
+    false_positives = sum(jti in bloom for jti in probes)
+    print(f"  ложные попадания {false_positives / len(probes):.4%} (цель {settings.TOKEN_REVOCATION_FILTER_ERROR_RATE:.2%})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True, help="Пользователь, от имени которого выполняются запросы")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=5000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = get_user_by_email(db, args.email)
+    finally:
+        db.close()
+    token = security.create_access_token({"sub": user.email, "uid": user.id})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(app) as client:
+        bench_http(client, headers, args.requests)
+    bench_verify(token, args.repeats)
+    bench_revocation(args.repeats)
+
+    hits = security.TOKEN_CACHE_REQUESTS.value(result="hit")
+    misses = security.TOKEN_CACHE_REQUESTS.value(result="miss")
+    print(f"token_cache_requests_total: hit={hits:.0f} miss={misses:.0f}")
+
+
+if __name__ == "__main__":
+    main()
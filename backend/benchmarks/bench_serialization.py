@@ -0,0 +1,128 @@
+"""
+Сравнение стоимости сериализации списков: стандартный путь FastAPI
+(response_model + jsonable JSON) и быстрый путь FAST_JSON_RESPONSES
+(TypeAdapter.dump_json / orjson).
+
+Нужна база с данными пользователя (задачи, цели, достижения).
+Запуск из каталога backend:
+
+    python -m benchmarks.bench_serialization --email student@example.com --requests 200
+
+Выводит CPU процесса на запрос для /tasks, /goals и /achievements/user
+в обоих режимах, а также время одной только сериализации уже загруженных объектов.
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.achievements import USER_ACHIEVEMENT_LIST
+from app.api.v1.endpoints.goals import GOAL_LIST
+from app.api.v1.endpoints.tasks import TASK_LIST
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.crud import achievement as crud_achievement
+from app.crud import goal as crud_goal
+from app.crud import task as crud_task
+from app.crud.user import get_user_by_email
+from app.db.base import SessionLocal
+from app.main import app
+
+ENDPOINTS = (
+    ("/api/v1/tasks/?limit=100", TASK_LIST),
+    ("/api/v1/goals/", GOAL_LIST),
+    ("/api/v1/achievements/user", USER_ACHIEVEMENT_LIST),
+)
+
+
+def _route_field(path: str):
+    path = path.split("?")[0]
+    for route in app.routes:
+        if getattr(route, "path", None) == path and "GET" in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+def bench_http(client: TestClient, headers: dict, requests: int) -> None:
+    print(f"HTTP, CPU процесса на запрос (среднее по {requests} запросам)")
+    for path, _ in ENDPOINTS:
+        results = {}
+        for fast in (False, True):
+            settings.FAST_JSON_RESPONSES = fast
+            client.get(path, headers=headers)  # прогрев
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            for _ in range(requests):
+                response = client.get(path, headers=headers)
+                response.raise_for_status()
+            results[fast] = (
+                (time.process_time() - cpu_start) / requests * 1000,
+                (time.perf_counter() - wall_start) / requests * 1000,
+                len(response.content),
+            )
+        (cpu_off, wall_off, size), (cpu_on, wall_on, _) = results[False], results[True]
+        print(
+            f"  {path:32} {size:7} B  cpu {cpu_off:6.2f} -> {cpu_on:6.2f} ms "
+            f"({cpu_off / cpu_on:.2f}x), wall {wall_off:6.2f} -> {wall_on:6.2f} ms"
+        )
+
+
+def bench_serialization(email: str, repeats: int) -> None:
+    print(f"Только сериализация загруженных объектов (среднее по {repeats} повторам)")
+    db = SessionLocal()
+    try:
+        user = get_user_by_email(db, email)
+        loaded = {
+            "/api/v1/tasks/?limit=100": crud_task.get_tasks(db, user.id, limit=100),
+            "/api/v1/goals/": crud_goal.get_user_goals(db, user.id),
+            "/api/v1/achievements/user": crud_achievement.get_user_achievements(db, user.id),
+        }
+        for items in loaded.values():
+            for item in items:
+                # Связи загружаются заранее, чтобы не мерить запросы к БД
+                getattr(item, "steps", None)
+                getattr(item, "achievement", None)
+        
+        for path, serializer in ENDPOINTS:
+            items = loaded[path]
+            field = _route_field(path)
+            
+            def default_path():
+                content = asyncio.run(serialize_response(field=field, response_content=items))
+                return JSONResponse(content).body
+            
+            def fast_path():
+                return serializer.response(items).body
+            
+            timings = []
+            for render in (default_path, fast_path):
+                render()
+                start = time.process_time()
+                for _ in range(repeats):
+                    render()
+                timings.append((time.process_time() - start) / repeats * 1000)
+            print(
+                f"  {path:32} {len(items):4} объектов  {timings[0]:6.3f} -> {timings[1]:6.3f} ms "
+                f"({timings[0] / timings[1]:.2f}x)"
+            )
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True, help="Пользователь, от имени которого выполняются запросы")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=500)
+    args = parser.parse_args()
+    
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': args.email})}"}
+    with TestClient(app) as client:
+        bench_http(client, headers, args.requests)
+    bench_serialization(args.email, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Общие фикстуры тестов.
+
+Тесты работают с отдельной базой (TEST_POSTGRES_DB, по умолчанию
+<POSTGRES_DB>_test) на том же сервере, что задан переменными POSTGRES_*.
+База создается при первом запуске и доводится миграциями alembic до head.
+Если сервер недоступен, тесты, которым нужна БД, пропускаются.
+
+Запросы к API идут через httpx.AsyncClient в цикле событий тестов: приложение
+работает в том же цикле и контексте, что и тест (assert_query_budget видит его
+запросы, пул asyncpg не переходит между циклами). lifespan не запускается —
+планировщик в тестах не нужен.
+"""
+import asyncio
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+# Настройки читаются при импорте app, поэтому окружение тестов задается до него
+os.environ["POSTGRES_DB"] = os.environ.get(
+    "TEST_POSTGRES_DB", os.environ.get("POSTGRES_DB", "student_planner") + "_test"
+)
+os.environ.pop("DATABASE_URL", None)
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _prepare_database() -> None:
+    import psycopg2
+    from alembic import command
+    from alembic.config import Config
+    from psycopg2 import sql
+
+    conn = psycopg2.connect(
+        host=os.environ.get("POSTGRES_HOST", "postgres"),
+        port=os.environ.get("POSTGRES_PORT", "5432"),
+        user=os.environ.get("POSTGRES_USER", "backlog_user"),
+        password=os.environ.get("POSTGRES_PASSWORD", ""),
+        dbname="postgres",
+        connect_timeout=3,
+    )
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (os.environ["POSTGRES_DB"],))
+            if cursor.fetchone() is None:
+                # Кодировка явно: шаблон сервера может быть в SQL_ASCII
+                cursor.execute(sql.SQL("CREATE DATABASE {} ENCODING 'UTF8' TEMPLATE template0").format(
+                    sql.Identifier(os.environ["POSTGRES_DB"])
+                ))
+    finally:
+        conn.close()
+
+    # Без файла конфигурации: env.py не перенастраивает логирование тестов
+    config = Config()
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    command.upgrade(config, "head")
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def database():
+    try:
+        _prepare_database()
+    except Exception as e:  # сервер недоступен или не настроен
+        pytest.skip(f"PostgreSQL для тестов недоступен: {e}")
+
+
+@pytest.fixture
+def db(database):
+    from app.db.base import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+async def client(database):
+    import httpx
+
+    from app.main import app
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+        yield http
+
+
+@pytest.fixture
+def make_user(db):
+    """Создать пользователя с уникальным email; возвращает (user, заголовки с access-токеном)"""
+    from app.core.security import create_access_token, get_password_hash
+    from app.db.models.user import User
+
+    password_hash = get_password_hash("password")
+
+    def make(**fields):
+        fields.setdefault("email", f"test-{uuid.uuid4().hex[:12]}@example.com")
+        fields.setdefault("hashed_password", password_hash)
+        user = User(is_active=True, **fields)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        token = create_access_token({"sub": user.email, "uid": user.id})
+        return user, {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
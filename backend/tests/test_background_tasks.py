@@ -0,0 +1,40 @@
+"""
+Планировщик фоновых задач: синхронные задачи с запросами к БД не выполняются
+в потоке цикла событий.
+"""
+import asyncio
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import background_tasks
+from app.services.background_tasks import BackgroundTaskService
+from app.services.task_status import TaskStatusService
+
+
+class _Stop(BaseException):
+    pass
+
+
+@pytest.mark.parametrize("minute, job", [(30, "reconcile_counters"), (45, "cleanup_auth_tokens")])
+async def test_sync_jobs_run_off_the_event_loop(monkeypatch, minute, job):
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 1, 1, 12, minute, tzinfo=timezone.utc)
+
+    threads = []
+
+    async def stop(seconds):
+        raise _Stop
+
+    monkeypatch.setattr(background_tasks, "datetime", FixedDatetime)
+    monkeypatch.setattr(TaskStatusService, "update_overdue_tasks", staticmethod(lambda: 0))
+    monkeypatch.setattr(BackgroundTaskService, job, staticmethod(lambda: threads.append(threading.current_thread())))
+    monkeypatch.setattr(asyncio, "sleep", stop)
+
+    with pytest.raises(_Stop):
+        await BackgroundTaskService.start_background_scheduler(notifications_enabled=False)
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
@@ -0,0 +1,128 @@
+"""
+Массовые операции PATCH/DELETE /tasks/bulk: выбор по ids и фильтру, изоляция
+пользователей и отказ для пустого выбора.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.crud import task as crud_task
+from app.schemas.task import TaskBulkDelete, TaskBulkUpdate, TaskFilter, TaskUpdate
+
+
+def _payload(i: int, priority: str = "current") -> dict:
+    deadline = datetime.now(timezone.utc) + timedelta(days=i + 1)
+    return {"title": f"task {i}", "task_type": "homework", "priority": priority, "deadline": deadline.isoformat()}
+
+
+@pytest.fixture
+async def tasks(client, user):
+    _, headers = user
+    payload = {"tasks": [_payload(i, "yearly_debt" if i < 2 else "current") for i in range(5)]}
+    response = await client.post("/api/v1/tasks/bulk", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    return headers, [task["id"] for task in response.json()]
+
+
+@pytest.fixture
+async def other_tasks(client, make_user):
+    _, headers = make_user()
+    response = await client.post("/api/v1/tasks/bulk", json={"tasks": [_payload(0)]}, headers=headers)
+    return headers, [task["id"] for task in response.json()]
+
+
+async def _statuses(client, headers) -> dict:
+    response = await client.get("/api/v1/tasks/", params={"include_steps": "false"}, headers=headers)
+    return {task["id"]: task["status"] for task in response.json()}
+
+
+async def test_update_by_ids(client, tasks, other_tasks):
+    headers, ids = tasks
+    foreign = other_tasks[1][0]
+    response = await client.patch(
+        "/api/v1/tasks/bulk", json={"ids": [ids[0], ids[2], foreign], "changes": {"status": "completed"}},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert sorted(item["id"] for item in body["updated"]) == sorted([ids[0], ids[2]])
+    assert all(item["status"] == "completed" and item["completed_at"] for item in body["updated"])
+    assert body["not_found"] == [foreign]
+
+    statuses = await _statuses(client, headers)
+    assert [statuses[task_id] for task_id in ids] == ["completed", "pending", "completed", "pending", "pending"]
+    assert (await _statuses(client, other_tasks[0]))[foreign] == "pending"
+
+
+async def test_update_by_filter(client, tasks, other_tasks):
+    headers, ids = tasks
+    response = await client.patch(
+        "/api/v1/tasks/bulk", json={"filter": {"priority": "yearly_debt"}, "changes": {"status": "in_progress"}},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert sorted(item["id"] for item in response.json()["updated"]) == ids[:2]
+    statuses = await _statuses(client, headers)
+    assert [statuses[task_id] for task_id in ids] == ["in_progress"] * 2 + ["pending"] * 3
+    assert set((await _statuses(client, other_tasks[0])).values()) == {"pending"}
+
+
+async def test_delete_by_ids_and_filter(client, tasks, other_tasks):
+    headers, ids = tasks
+    foreign = other_tasks[1][0]
+    response = await client.request(
+        "DELETE", "/api/v1/tasks/bulk", json={"ids": [ids[0], ids[3], foreign]}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert sorted(response.json()["deleted"]) == sorted([ids[0], ids[3]])
+    assert response.json()["not_found"] == [foreign]
+
+    response = await client.request(
+        "DELETE", "/api/v1/tasks/bulk", json={"filter": {"priority": "yearly_debt"}}, headers=headers
+    )
+    assert response.json()["deleted"] == [ids[1]]
+    assert sorted(await _statuses(client, headers)) == [ids[2], ids[4]]
+    assert foreign in await _statuses(client, other_tasks[0])
+
+
+@pytest.mark.parametrize("selection", [
+    {},
+    {"ids": None, "filter": None},
+    {"ids": []},
+    {"filter": {}},
+    {"ids": [], "filter": {}},
+    {"filter": {"status": None, "priority": None}},
+])
+async def test_empty_selection_rejected(client, tasks, selection):
+    headers, ids = tasks
+    response = await client.patch(
+        "/api/v1/tasks/bulk", json={**selection, "changes": {"status": "completed"}}, headers=headers
+    )
+    assert response.status_code == 422, response.text
+    response = await client.request("DELETE", "/api/v1/tasks/bulk", json=selection, headers=headers)
+    assert response.status_code == 422, response.text
+    assert set((await _statuses(client, headers)).values()) == {"pending"}
+    assert sorted(await _statuses(client, headers)) == ids
+
+
+def test_crud_refuses_unscoped_selection(db, user):
+    with pytest.raises(ValueError):
+        crud_task.delete_tasks_bulk(db, user[0].id, ids=None, filters=TaskFilter())
+    with pytest.raises(ValueError):
+        TaskBulkDelete(filter=TaskFilter())
+
+
+async def test_empty_changes_rejected(client, tasks):
+    headers, ids = tasks
+    for body in ({"ids": ids[:1], "changes": {}}, {"filter": {"priority": "current"}, "changes": {}}):
+        response = await client.patch("/api/v1/tasks/bulk", json=body, headers=headers)
+        assert response.status_code == 422, response.text
+    assert set((await _statuses(client, headers)).values()) == {"pending"}
+
+    with pytest.raises(ValueError):
+        TaskBulkUpdate(ids=ids[:1], changes=TaskUpdate())
+
+
+def test_crud_refuses_empty_changes(db, user):
+    with pytest.raises(ValueError):
+        crud_task.update_tasks_bulk(db, user[0].id, TaskUpdate(), ids=[1])
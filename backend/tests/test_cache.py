@@ -0,0 +1,125 @@
+"""
+Общий кэш (core/cache.py) с хранилищем в памяти и в Redis: загрузка, сброс
+записи и пространства, загрузка, начатая до сброса.
+"""
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.core.cache import Cache, MemoryCacheBackend, RedisCacheBackend
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    cache = Cache()
+    if request.param == "memory":
+        cache.use(MemoryCacheBackend(max_entries=100))
+    else:
+        cache.use(RedisCacheBackend(client=fakeredis.FakeAsyncRedis()))
+    return cache
+
+
+class Source:
+    """Загрузчик, которого можно остановить посередине загрузки"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def load(self):
+        self.calls += 1
+        value = self.value
+        self.started.set()
+        await self.release.wait()
+        return value
+
+
+async def _settle():
+    # Даем выполниться discard, запущенному без ожидания
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def test_load_then_hit(cache):
+    users = cache.namespace("users", ttl=60)
+    source = Source("v1")
+    assert await users.get_or_load(1, source.load) == "v1"
+    assert await users.get_or_load(1, source.load) == "v1"
+    assert source.calls == 1
+    assert await users.get(2, "default") == "default"
+
+
+async def test_discard_and_delete(cache):
+    users = cache.namespace("users", ttl=60)
+    source = Source("v1")
+    await users.get_or_load(1, source.load)
+    source.value = "v2"
+    users.discard(1)
+    await _settle()
+    assert await users.get_or_load(1, source.load) == "v2"
+
+    source.value = "v3"
+    await users.delete(1)
+    assert await users.get(1) is None
+    assert await users.get_or_load(1, source.load) == "v3"
+    assert source.calls == 3
+
+
+async def test_invalidate(cache):
+    users = cache.namespace("users", ttl=60)
+    other = cache.namespace("other", ttl=60)
+    await users.set(1, "v1")
+    await other.set(1, "kept")
+    await users.invalidate()
+    assert await users.get(1) is None
+    assert await other.get(1) == "kept"
+
+
+@pytest.mark.parametrize("reset", ["discard", "delete", "invalidate"])
+async def test_reset_during_load_drops_stale_value(cache, reset):
+    """Значение загрузки, начатой до сброса, не попадает в кэш"""
+    users = cache.namespace("users", ttl=60)
+    source = Source("stale")
+    source.release.clear()
+    loading = asyncio.create_task(users.get_or_load(1, source.load))
+    await source.started.wait()
+
+    # Запись изменена и закоммичена, хук сбрасывает кэш, пока загрузка еще идет
+    source.value = "fresh"
+    if reset == "discard":
+        users.discard(1)
+        await _settle()
+    elif reset == "delete":
+        await users.delete(1)
+    else:
+        await users.invalidate()
+
+    # Промах после сброса не присоединяется к старой загрузке
+    fresh = asyncio.create_task(users.get_or_load(1, source.load))
+    source.release.set()
+    assert await loading == "stale"
+    assert await fresh == "fresh"
+    assert await users.get(1) == "fresh"
+    assert source.calls == 2
+
+
+async def test_stale_write_from_another_process(cache):
+    """Другой процесс (свой singleflight, то же хранилище) записывает после сброса"""
+    users = cache.namespace("users", ttl=60)
+    worker = Cache()
+    worker.use(cache.backend)
+    worker_users = worker.namespace("users", ttl=60)
+
+    source = Source("stale")
+    source.release.clear()
+    loading = asyncio.create_task(worker_users.get_or_load(1, source.load))
+    await source.started.wait()
+    users.discard(1)
+    await _settle()
+    source.release.set()
+    assert await loading == "stale"
+    assert await users.get(1) is None
@@ -0,0 +1,118 @@
+"""
+Лента календаря по токену в адресе: токен случайный, хранится у пользователя,
+сбрасывается и отключается.
+"""
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+
+from sqlalchemy import event, update
+
+from app.db.base import async_engine
+from app.db.models.user import User
+
+
+def _token(url: str) -> str:
+    return parse_qs(urlparse(url).query)["token"][0]
+
+
+async def _feed(client, token: str):
+    return await client.get("/api/v1/tasks/calendar.ics", params={"token": token})
+
+
+async def test_feed_url_is_stable_and_serves_calendar(client, user):
+    db_user, headers = user
+    await client.post("/api/v1/tasks/", headers=headers, json={
+        "title": "Экзамен", "task_type": "exam", "priority": "current",
+        "deadline": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat(),
+    })
+    first = (await client.get("/api/v1/tasks/calendar/feed", headers=headers)).json()["url"]
+    second = (await client.get("/api/v1/tasks/calendar/feed", headers=headers)).json()["url"]
+    assert first == second
+    token = _token(first)
+    assert len(token) >= 40 and not token.startswith(f"{db_user.id}.")
+
+    response = await _feed(client, token)
+    assert response.status_code == 200
+    assert "BEGIN:VCALENDAR" in response.text and "Экзамен" in response.text
+
+
+async def test_tokens_are_random_per_user(client, make_user):
+    tokens = set()
+    for _ in range(2):
+        _, headers = make_user()
+        tokens.add(_token((await client.get("/api/v1/tasks/calendar/feed", headers=headers)).json()["url"]))
+    assert len(tokens) == 2
+
+
+async def test_reset_revokes_old_url(client, user):
+    _, headers = user
+    old = _token((await client.get("/api/v1/tasks/calendar/feed", headers=headers)).json()["url"])
+    response = await client.post("/api/v1/tasks/calendar/feed/reset", headers=headers)
+    assert response.status_code == 200
+    new = _token(response.json()["url"])
+    assert new != old
+    assert (await _feed(client, old)).status_code == 404
+    assert (await _feed(client, new)).status_code == 200
+    assert _token((await client.get("/api/v1/tasks/calendar/feed", headers=headers)).json()["url"]) == new
+
+
+async def test_disable_feed(client, user):
+    _, headers = user
+    token = _token((await client.get("/api/v1/tasks/calendar/feed", headers=headers)).json()["url"])
+    response = await client.delete("/api/v1/tasks/calendar/feed", headers=headers)
+    assert response.json() == {"url": None}
+    assert (await _feed(client, token)).status_code == 404
+
+
+async def test_unknown_and_inactive(client, db, user):
+    db_user, headers = user
+    token = _token((await client.get("/api/v1/tasks/calendar/feed", headers=headers)).json()["url"])
+    # Прежний формат токена (id.подпись) больше не принимается
+    assert (await _feed(client, f"{db_user.id}.{'0' * 32}")).status_code == 404
+    assert (await _feed(client, "x" * 43)).status_code == 404
+
+    db.execute(update(User).where(User.id == db_user.id).values(is_active=False))
+    db.commit()
+    assert (await _feed(client, token)).status_code == 404
+
+
+async def test_conditional_feed_uses_data_version(client, user):
+    _, headers = user
+    created = await client.post("/api/v1/tasks/", headers=headers, json={
+        "title": "Зачет", "task_type": "exam", "priority": "current",
+        "deadline": (datetime.now(timezone.utc) + timedelta(days=2)).isoformat(),
+    })
+    token = _token((await client.get("/api/v1/tasks/calendar/feed", headers=headers)).json()["url"])
+    first = await _feed(client, token)
+    etag = first.headers["ETag"]
+    assert "Last-Modified" in first.headers
+
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        response = await client.get(
+            "/api/v1/tasks/calendar.ics", params={"token": token}, headers={"If-None-Match": etag}
+        )
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    assert response.status_code == 304
+    # Версия — поиск по первичному ключу user_counters, задачи не читаются
+    assert not any("FROM tasks" in statement for statement in statements), statements
+
+    response = await client.get(
+        "/api/v1/tasks/calendar.ics", params={"token": token},
+        headers={"If-Modified-Since": first.headers["Last-Modified"]},
+    )
+    assert response.status_code == 304
+
+    await client.delete(f"/api/v1/tasks/{created.json()['id']}", headers=headers)
+    response = await client.get(
+        "/api/v1/tasks/calendar.ics", params={"token": token}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert "Зачет" not in response.text
@@ -0,0 +1,95 @@
+"""
+Условные GET по версии данных пользователя (api/v1/conditional.py).
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.db.base import AsyncSessionLocal
+from app.db.session import get_async_read_db
+
+
+def _payload(title: str, days: float = 1) -> dict:
+    deadline = datetime.now(timezone.utc) + timedelta(days=days)
+    return {"title": title, "task_type": "homework", "priority": "current", "deadline": deadline.isoformat()}
+
+
+@pytest.fixture
+async def stale_replica():
+    """
+    Реплика, отставшая от primary: сессия с REPEATABLE READ видит снимок,
+    взятый до записей теста.
+    """
+    from app.main import app
+
+    session = AsyncSessionLocal()
+    await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    async def replica():
+        yield session
+
+    async def freeze():
+        await session.execute(text("SELECT 1"))
+        app.dependency_overrides[get_async_read_db] = replica
+
+    yield freeze
+    app.dependency_overrides.pop(get_async_read_db, None)
+    await session.close()
+
+
+async def test_etag_and_304(client, user):
+    _, headers = user
+    await client.post("/api/v1/tasks/", json=_payload("first"), headers=headers)
+    response = await client.get("/api/v1/tasks/", headers=headers)
+    etag = response.headers["ETag"]
+    response = await client.get("/api/v1/tasks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    await client.post("/api/v1/tasks/", json=_payload("second"), headers=headers)
+    response = await client.get("/api/v1/tasks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_version_is_read_from_primary(client, user, stale_replica):
+    _, headers = user
+    await client.post("/api/v1/tasks/", json=_payload("first"), headers=headers)
+    paths = ("/api/v1/tasks/", "/api/v1/tasks/stats/summary", "/api/v1/goals/")
+    etags = {path: (await client.get(path, headers=headers)).headers["ETag"] for path in paths}
+
+    await stale_replica()
+    await client.post("/api/v1/tasks/", json=_payload("second"), headers=headers)
+
+    for path, etag in etags.items():
+        response = await client.get(path, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200, path
+        assert response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("params, windowed", [
+    ({}, False),
+    ({"status": "completed"}, False),
+    ({"status": "overdue"}, True),
+    ({"status": "pending"}, True),
+])
+async def test_time_dependent_list_etag_expires(client, user, monkeypatch, params, windowed):
+    """Список просроченных меняется с течением времени, а не только с записями"""
+    from types import SimpleNamespace
+
+    from app.api.v1 import conditional
+    from app.core.config import settings
+
+    _, headers = user
+    await client.post("/api/v1/tasks/", json=_payload("soon", days=0.01), headers=headers)
+    now = 1_800_000_000.0
+    monkeypatch.setattr(conditional, "time", SimpleNamespace(time=lambda: now))
+    etag = (await client.get("/api/v1/tasks/", params=params, headers=headers)).headers["ETag"]
+
+    conditional_headers = {**headers, "If-None-Match": etag}
+    response = await client.get("/api/v1/tasks/", params=params, headers=conditional_headers)
+    assert response.status_code == 304
+
+    now += settings.STATS_ETAG_WINDOW_SECONDS
+    response = await client.get("/api/v1/tasks/", params=params, headers=conditional_headers)
+    assert response.status_code == (200 if windowed else 304)
@@ -0,0 +1,250 @@
+"""
+Счетчики user_counters: дельты из эндпоинтов, сверка reconcile_all_counters,
+ее блокировки (строка счетчиков и advisory-блокировка задачи планировщика).
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.crud import task as crud_task
+from app.crud.counters import (
+    COUNTER_FIELDS, _counters_select, _repair_user_counters, apply_counter_deltas, reconcile_all_counters,
+)
+from app.db.base import SessionLocal, engine
+from app.db.locks import try_advisory_lock
+from app.db.models.task import Task, TaskPriority, TaskStatus
+from app.db.models.user_counters import UserCounters
+from app.schemas.task import TaskUpdate
+from app.services.background_tasks import BackgroundTaskService
+from app.services.task_status import TaskStatusService
+
+
+def stored(db, user_id: int) -> dict:
+    db.expire_all()
+    row = db.query(UserCounters).filter(UserCounters.user_id == user_id).one()
+    return {field: getattr(row, field) for field in COUNTER_FIELDS}
+
+
+def recalculated(db, user_id: int) -> dict:
+    row = db.execute(_counters_select(user_id)).mappings().one()
+    return {field: row[field] for field in COUNTER_FIELDS}
+
+
+def assert_consistent(db, user_id: int) -> None:
+    assert stored(db, user_id) == recalculated(db, user_id)
+
+
+def _payload(i: int, days: float) -> dict:
+    deadline = datetime.now(timezone.utc) + timedelta(days=days)
+    return {
+        "title": f"task {i}", "task_type": "homework",
+        "priority": ["current", "semester_debt", "yearly_debt"][i % 3], "deadline": deadline.isoformat(),
+    }
+
+
+async def test_endpoints_keep_counters_consistent(client, db, user):
+    db_user, headers = user
+    created = await client.post("/api/v1/tasks/", json=_payload(0, 2), headers=headers)
+    assert created.status_code == 200, created.text
+    task_id = created.json()["id"]
+    bulk = await client.post(
+        "/api/v1/tasks/bulk", json={"tasks": [_payload(i, i - 3) for i in range(1, 7)]}, headers=headers
+    )
+    ids = [task["id"] for task in bulk.json()]
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["total_tasks"] == 7
+
+    response = await client.put(f"/api/v1/tasks/{task_id}", json={"status": "completed"}, headers=headers)
+    assert response.status_code == 200
+    response = await client.put(f"/api/v1/tasks/{ids[0]}", json={"priority": "yearly_debt"}, headers=headers)
+    assert response.status_code == 200
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["completed_tasks"] == 1
+
+    response = await client.patch(
+        "/api/v1/tasks/bulk", json={"ids": ids[:3], "changes": {"status": "in_progress"}}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert_consistent(db, db_user.id)
+
+    response = await client.delete(f"/api/v1/tasks/{ids[3]}", headers=headers)
+    assert response.status_code == 200
+    response = await client.request("DELETE", "/api/v1/tasks/bulk", json={"ids": ids[4:]}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["total_tasks"] == 4
+
+
+async def test_reconcile_fixes_drifted_row(client, db, user):
+    db_user, headers = user
+    await client.post("/api/v1/tasks/bulk", json={"tasks": [_payload(i, 5) for i in range(3)]}, headers=headers)
+    version = db.query(UserCounters.data_version).filter(UserCounters.user_id == db_user.id).scalar()
+    db.execute(update(UserCounters).where(UserCounters.user_id == db_user.id).values(total_tasks=99, yearly_debts=7))
+    db.commit()
+
+    assert reconcile_all_counters(db) >= 1
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["total_tasks"] == 3
+    assert db.query(UserCounters.data_version).filter(UserCounters.user_id == db_user.id).scalar() == version + 1
+    # Без расхождений строка не трогается
+    assert not _repair_user_counters(db, db_user.id)
+    db.commit()
+
+
+def test_reconcile_creates_missing_row(db, user):
+    db_user, _ = user
+    db.add(Task(user_id=db_user.id, title="direct", task_type="homework", priority=TaskPriority.current,
+                deadline=datetime.now(timezone.utc)))
+    db.commit()
+    assert db.query(UserCounters).filter(UserCounters.user_id == db_user.id).count() == 0
+
+    reconcile_all_counters(db)
+    assert stored(db, db_user.id)["total_tasks"] == 1
+
+
+def test_reconcile_keeps_concurrent_delta(db, user):
+    """Дельта транзакции, незакоммиченной на момент сверки, не затирается пересчетом"""
+    db_user, _ = user
+    apply_counter_deltas(db, {db_user.id: {}})
+    db.commit()
+
+    writer = SessionLocal()
+    writer.add(Task(user_id=db_user.id, title="concurrent", task_type="homework", priority=TaskPriority.current,
+                    deadline=datetime.now(timezone.utc) + timedelta(days=1)))
+    writer.flush()
+    apply_counter_deltas(writer, {db_user.id: {"total_tasks": 1, "pending_tasks": 1}})
+
+    result = {}
+
+    def repair():
+        session = SessionLocal()
+        try:
+            result["repaired"] = _repair_user_counters(session, db_user.id)
+            session.commit()
+        finally:
+            session.close()
+
+    thread = threading.Thread(target=repair)
+    thread.start()
+    time.sleep(0.3)
+    assert thread.is_alive(), "пересчет должен ждать блокировку строки счетчиков"
+    writer.commit()
+    writer.close()
+    thread.join(5)
+
+    assert result == {"repaired": False}
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["total_tasks"] == 1
+
+
+def test_scheduled_reconcile_runs_in_one_process(db, user):
+    db_user, _ = user
+    # Строка должна существовать: отсутствующую apply_counter_deltas пересчитывает сама
+    apply_counter_deltas(db, {db_user.id: {}})
+    apply_counter_deltas(db, {db_user.id: {"total_tasks": 5}})
+    db.commit()
+
+    with try_advisory_lock(engine, "job:reconcile_counters") as acquired:
+        assert acquired
+        with try_advisory_lock(engine, "job:reconcile_counters") as second:
+            assert not second
+        BackgroundTaskService.reconcile_counters()
+        assert stored(db, db_user.id)["total_tasks"] == 5
+
+    BackgroundTaskService.reconcile_counters()
+    assert_consistent(db, db_user.id)
+
+
+async def test_missing_counters_row_is_seeded_from_tables(client, db, user):
+    """Задачи созданы в обход приложения, строки счетчиков нет: первая запись ее пересчитывает"""
+    db_user, headers = user
+    for i in range(3):
+        db.add(Task(user_id=db_user.id, title=f"seeded {i}", task_type="homework", priority=TaskPriority.yearly_debt,
+                    deadline=datetime.now(timezone.utc) + timedelta(days=1)))
+    db.commit()
+    assert db.query(UserCounters).filter(UserCounters.user_id == db_user.id).count() == 0
+
+    response = await client.post("/api/v1/tasks/", json=_payload(1, 2), headers=headers)
+    assert response.status_code == 200, response.text
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["total_tasks"] == 4
+    assert stored(db, db_user.id)["yearly_debts"] == 3
+
+    stats = (await client.get("/api/v1/tasks/stats/summary", headers=headers)).json()
+    assert stats["total_tasks"] == 4
+
+
+def test_missing_counters_row_on_update(db, user):
+    db_user, _ = user
+    task = Task(user_id=db_user.id, title="seeded", task_type="homework", priority=TaskPriority.current,
+                deadline=datetime.now(timezone.utc) + timedelta(days=1))
+    db.add(task)
+    db.commit()
+
+    crud_task.update_task(db, task.id, db_user.id, TaskUpdate(status="completed"))
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["completed_tasks"] == 1
+    assert stored(db, db_user.id)["total_tasks"] == 1
+
+
+def test_update_waits_for_row_lock(db, user):
+    """Изменение задачи, заблокированной другой транзакцией, считает дельту от ее результата"""
+    db_user, _ = user
+    task = Task(user_id=db_user.id, title="contended", task_type="homework", priority=TaskPriority.current,
+                deadline=datetime.now(timezone.utc) - timedelta(days=1))
+    db.add(task)
+    db.flush()
+    apply_counter_deltas(db, {db_user.id: {}})
+    db.commit()
+
+    scheduler = SessionLocal()
+    locked = scheduler.query(Task).filter(Task.id == task.id).with_for_update(skip_locked=True).one()
+    locked.status, locked.is_overdue = TaskStatus.overdue, True
+    apply_counter_deltas(scheduler, {db_user.id: {"pending_tasks": -1, "overdue_tasks": 1, "flagged_overdue_tasks": 1}})
+
+    def update():
+        session = SessionLocal()
+        try:
+            crud_task.update_task(session, task.id, db_user.id, TaskUpdate(status="completed"))
+        finally:
+            session.close()
+
+    thread = threading.Thread(target=update)
+    thread.start()
+    time.sleep(0.3)
+    assert thread.is_alive(), "изменение должно ждать блокировку строки задачи"
+    scheduler.commit()
+    scheduler.close()
+    thread.join(5)
+
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["completed_tasks"] == 1
+    assert stored(db, db_user.id)["overdue_tasks"] == 0
+
+
+def test_overdue_scheduler_skips_locked_tasks(db, user):
+    db_user, _ = user
+    past = datetime.now(timezone.utc) - timedelta(days=1)
+    tasks = [Task(user_id=db_user.id, title=f"late {i}", task_type="homework", priority=TaskPriority.current,
+                  deadline=past) for i in range(2)]
+    db.add_all(tasks)
+    db.flush()
+    apply_counter_deltas(db, {db_user.id: {}})
+    db.commit()
+
+    def statuses():
+        db.expire_all()
+        return [db.get(Task, task.id).status for task in tasks]
+
+    holder = SessionLocal()
+    holder.query(Task).filter(Task.id == tasks[0].id).with_for_update().one()
+    TaskStatusService.update_overdue_tasks()
+    assert statuses() == [TaskStatus.pending, TaskStatus.overdue]
+    holder.rollback()
+    holder.close()
+    TaskStatusService.update_overdue_tasks()
+    assert statuses() == [TaskStatus.overdue, TaskStatus.overdue]
+    assert_consistent(db, db_user.id)
+    assert stored(db, db_user.id)["flagged_overdue_tasks"] == 2
@@ -0,0 +1,48 @@
+"""
+Стоимость bcrypt: задается BCRYPT_ROUNDS, подбор не опускается ниже нее,
+перехеширование при входе только повышает стоимость.
+"""
+import pytest
+
+from app.core import hashing
+from app.core.config import settings
+from app.core.hashing import bcrypt_hash, bcrypt_rounds, password_hasher, recommend_rounds
+from app.db.models.user import User
+
+
+def test_rounds_pinned_by_config():
+    assert password_hasher.rounds == settings.BCRYPT_ROUNDS
+    assert not hasattr(password_hasher, "calibrate")
+    assert not hasattr(settings, "BCRYPT_MIN_ROUNDS")
+
+
+def test_recommendation_never_below_minimum():
+    assert recommend_rounds(0.001, minimum=5)[0] == 5
+    assert recommend_rounds(0.001)[0] == settings.BCRYPT_ROUNDS
+
+
+def test_recommendation_grows_with_target(monkeypatch):
+    # 1 мс на минимальной стоимости: 8 мс — три удвоения
+    monkeypatch.setattr(hashing, "_timed", lambda func, *args: (0.0, 0.001, None))
+    assert recommend_rounds(8, minimum=5)[0] == 8
+    assert recommend_rounds(10 ** 9, minimum=5)[0] == hashing.MAX_BCRYPT_ROUNDS
+
+
+def test_needs_rehash_only_upwards(monkeypatch):
+    monkeypatch.setattr(password_hasher, "rounds", 5)
+    assert password_hasher.needs_rehash(bcrypt_hash("pw", 4))
+    assert not password_hasher.needs_rehash(bcrypt_hash("pw", 5))
+    assert not password_hasher.needs_rehash(bcrypt_hash("pw", 6))
+    assert password_hasher.needs_rehash("not a bcrypt hash")
+
+
+@pytest.mark.parametrize("stored_rounds, expected_rounds", [(4, 5), (6, 6)])
+async def test_login_rehash(client, db, make_user, monkeypatch, stored_rounds, expected_rounds):
+    monkeypatch.setattr(password_hasher, "rounds", 5)
+    db_user, _ = make_user(hashed_password=bcrypt_hash("secret-password", stored_rounds))
+    response = await client.post(
+        "/api/v1/auth/login-json", json={"email": db_user.email, "password": "secret-password"}
+    )
+    assert response.status_code == 200, response.text
+    db.expire_all()
+    assert bcrypt_rounds(db.get(User, db_user.id).hashed_password) == expected_rounds
@@ -0,0 +1,169 @@
+"""
+Регрессия индексов горячих запросов по задачам (миграции c4e2a7b1d9f3, d8b3f6a2c1e7).
+
+Таблица заполняется задачами многих пользователей внутри транзакции, после
+ANALYZE запросы CRUD выполняются на том же соединении, а их SQL с параметрами
+повторяется через EXPLAIN. Проверяется, что tasks читается по ожидаемому
+индексу, а не полным сканированием. Транзакция откатывается — данные не остаются.
+"""
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.crud import task as crud_task
+from app.db.base import engine
+from app.db.models.task import Task, TaskStatus
+from app.schemas.task import TaskFilter
+
+USERS = 200
+TASKS_PER_USER = 100
+USER_INDEXES = (
+    "ix_tasks_user_id_deadline_id", "ix_tasks_user_id_created_at_id", "ix_tasks_user_id_priority_deadline_id",
+    "ix_tasks_user_id_status_deadline",
+)
+
+
+@pytest.fixture(scope="module")
+def seeded(database):
+    """(сессия на соединении с заполненной таблицей, id пользователя для запросов)"""
+    connection = engine.connect()
+    transaction = connection.begin()
+    try:
+        # Тестовая БД копит задачи других тестов: тысячи пользователей с парой задач.
+        # С обычным statistics target пользователь запроса не попадает в MCV, и оценка
+        # «~15 строк» делает сортировку дешевле упорядоченного индекса. Откатывается вместе с данными
+        connection.execute(text("ALTER TABLE tasks ALTER COLUMN user_id SET STATISTICS 1000"))
+        user_ids = connection.execute(text(
+            "INSERT INTO users (email, hashed_password, is_active) "
+            "SELECT 'explain-' || g || '-' || txid_current() || '@example.com', 'x', true "
+            "FROM generate_series(1, :users) g RETURNING id"
+        ), {"users": USERS}).scalars().all()
+        connection.execute(text(
+            "INSERT INTO tasks (user_id, title, task_type, priority, status, deadline, is_overdue) "
+            "SELECT u, 'task ' || g, 'homework', "
+            "(ARRAY['current', 'semester_debt', 'yearly_debt'])[1 + g % 3]::taskpriority, "
+            "(ARRAY['pending', 'in_progress', 'completed', 'overdue'])[1 + g % 4]::taskstatus, "
+            "now() + (g - :per_user / 2) * interval '1 day', g % 4 = 3 AND g < :per_user / 2 "
+            "FROM unnest(CAST(:user_ids AS integer[])) u, generate_series(1, :per_user) g"
+        ), {"user_ids": user_ids, "per_user": TASKS_PER_USER})
+        connection.execute(text("ANALYZE users"))
+        connection.execute(text("ANALYZE tasks"))
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        yield session, user_ids[len(user_ids) // 2]
+        session.close()
+    finally:
+        transaction.rollback()
+        connection.close()
+
+
+def _plans(session: Session, run) -> list:
+    """Планы всех SELECT, выполненных run()"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    connection = session.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    assert statements, "запрос не выполнен"
+    return [
+        connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()[0]["Plan"]
+        for statement, parameters in statements
+    ]
+
+
+def _scans(plan: dict) -> list:
+    """(тип узла, индекс) для всех чтений таблицы tasks в плане"""
+    found = []
+    if plan.get("Relation Name") == "tasks" or (
+        plan.get("Index Name", "").startswith("ix_tasks_") and plan["Node Type"] == "Bitmap Index Scan"
+    ):
+        found.append((plan["Node Type"], plan.get("Index Name")))
+    for child in plan.get("Plans", ()):
+        found.extend(_scans(child))
+    return found
+
+
+def assert_index_scan(plans: list, *indexes: str) -> None:
+    scans = [scan for plan in plans for scan in _scans(plan)]
+    description = json.dumps(plans, indent=2, default=str)
+    assert scans, description
+    assert all(node != "Seq Scan" for node, _ in scans), description
+    used = {index for _, index in scans if index}
+    assert used and used <= set(indexes), f"индексы {used}, ожидались {indexes}\n{description}"
+
+
+def test_list_sorted_by_deadline(seeded):
+    db, user_id = seeded
+    plans = _plans(db, lambda: crud_task.get_tasks(db, user_id, limit=20, include_steps=False))
+    assert_index_scan(plans, "ix_tasks_user_id_deadline_id")
+
+
+def test_list_page_after_cursor(seeded):
+    db, user_id = seeded
+    _, cursor = crud_task.get_tasks_page(db, user_id, limit=20, include_steps=False)
+    plans = _plans(db, lambda: crud_task.get_tasks_page(db, user_id, limit=20, cursor=cursor, include_steps=False))
+    assert_index_scan(plans, "ix_tasks_user_id_deadline_id")
+
+
+def test_list_sorted_by_created_at(seeded):
+    db, user_id = seeded
+    plans = _plans(db, lambda: crud_task.get_tasks(db, user_id, limit=20, sort="-created_at", include_steps=False))
+    assert_index_scan(plans, "ix_tasks_user_id_created_at_id")
+
+
+def test_list_filtered_by_status(seeded):
+    db, user_id = seeded
+    filters = TaskFilter(status=TaskStatus.pending)
+    plans = _plans(db, lambda: crud_task.get_tasks(db, user_id, limit=20, filters=filters, include_steps=False))
+    assert_index_scan(plans, "ix_tasks_user_id_status_deadline", "ix_tasks_user_id_deadline_id")
+
+
+def test_upcoming(seeded):
+    db, user_id = seeded
+    plans = _plans(db, lambda: crud_task.get_upcoming_tasks(db, user_id, include_steps=False))
+    assert_index_scan(plans, "ix_tasks_user_id_deadline_id", "ix_tasks_user_id_status_deadline")
+
+
+def test_overdue(seeded):
+    db, user_id = seeded
+    plans = _plans(db, lambda: crud_task.get_overdue_tasks(db, user_id, include_steps=False))
+    assert_index_scan(
+        plans, "ix_tasks_user_id_overdue", "ix_tasks_user_id_status_deadline", "ix_tasks_user_id_deadline_id"
+    )
+
+
+def test_calendar_range(seeded):
+    db, user_id = seeded
+    today = date.today()
+    plans = _plans(
+        db, lambda: crud_task.get_task_calendar(db, user_id, today, today + timedelta(days=30), timezone.utc)
+    )
+    assert_index_scan(plans, "ix_tasks_user_id_deadline_id")
+
+
+def test_calendar_feed(seeded):
+    """Лента читает все задачи пользователя: планировщик вправе взять любой индекс по user_id"""
+    db, user_id = seeded
+    plans = _plans(db, lambda: db.execute(crud_task.calendar_tasks_select(user_id)).all())
+    assert_index_scan(plans, *USER_INDEXES)
+
+
+def test_scheduler_deadline_window(seeded):
+    """Окно напоминаний планировщика по всем пользователям — частичный индекс открытых задач"""
+    db, _ = seeded
+    now = datetime.now(timezone.utc)
+    plans = _plans(db, lambda: db.query(Task).filter(
+        Task.deadline <= now + timedelta(hours=1),
+        Task.deadline > now,
+        Task.status != "completed",
+    ).all())
+    assert_index_scan(plans, "ix_tasks_deadline_open")
@@ -0,0 +1,130 @@
+"""
+Ограничение попыток входа: хранилища (память и Redis), адрес клиента за прокси
+и поведение эндпоинта входа.
+"""
+import fakeredis
+import httpx
+import pytest
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.proxies import client_ip
+from app.services.login_throttle import MemoryThrottleBackend, RedisThrottleBackend, login_throttle
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryThrottleBackend(max_keys=100)
+    return RedisThrottleBackend(client=fakeredis.FakeAsyncRedis())
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_EMAIL_MAX_FAILURES", 3)
+    monkeypatch.setattr(settings, "LOGIN_IP_MAX_FAILURES", 5)
+    monkeypatch.setattr(settings, "LOGIN_LOCKOUT_BASE_SECONDS", 60)
+    monkeypatch.setattr(settings, "LOGIN_LOCKOUT_MAX_SECONDS", 200)
+    monkeypatch.setattr(settings, "LOGIN_FAILURE_WINDOW_SECONDS", 900)
+
+
+async def test_backend_locks_after_limit(backend, limits):
+    now = 1000.0
+    assert await backend.record_failure("email:a", 3, now) == 0
+    assert await backend.record_failure("email:a", 3, now + 1) == 0
+    assert await backend.locked_for("email:a", now + 1) == 0
+    assert await backend.record_failure("email:a", 3, now + 2) == 60
+    assert 0 < await backend.locked_for("email:a", now + 2) <= 60
+    assert await backend.locked_for("email:b", now + 2) == 0
+
+
+async def test_backend_escalates_and_resets(backend, limits):
+    now = 1000.0
+    durations = []
+    for attempt in range(3):
+        for _ in range(2):
+            duration = await backend.record_failure("ip:1.2.3.4", 2, now)
+        durations.append(duration)
+    assert durations == [60, 120, 200]
+
+    await backend.reset("ip:1.2.3.4")
+    assert await backend.locked_for("ip:1.2.3.4", now) == 0
+    assert await backend.record_failure("ip:1.2.3.4", 2, now) == 0
+
+
+async def test_backend_window_forgets_old_failures(backend, limits):
+    await backend.record_failure("email:a", 2, 1000.0)
+    assert await backend.record_failure("email:a", 2, 1000.0 + 901) == 0
+
+
+def _request(peer: str, **headers) -> Request:
+    return Request({
+        "type": "http",
+        "client": (peer, 12345),
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.mark.parametrize("peer, headers, expected", [
+    ("203.0.113.7", {}, "203.0.113.7"),
+    # Недоверенный источник не может подставить адрес
+    ("203.0.113.7", {"x_forwarded_for": "198.51.100.1"}, "203.0.113.7"),
+    ("203.0.113.7", {"x_real_ip": "198.51.100.1"}, "203.0.113.7"),
+    # Через nginx на хосте (шлюз docker-сети) и локально
+    ("172.18.0.1", {"x_forwarded_for": "198.51.100.1"}, "198.51.100.1"),
+    ("127.0.0.1", {"x_real_ip": "198.51.100.1"}, "198.51.100.1"),
+    # Левее первого недоверенного адреса значения задает клиент
+    ("172.18.0.1", {"x_forwarded_for": "10.9.9.9, 198.51.100.1, 127.0.0.1"}, "198.51.100.1"),
+    ("172.18.0.1", {"x_forwarded_for": "garbage, 198.51.100.1"}, "198.51.100.1"),
+    ("172.18.0.1", {"x_forwarded_for": "127.0.0.1"}, "127.0.0.1"),
+    ("172.18.0.1", {}, "172.18.0.1"),
+    ("::1", {"x_forwarded_for": "2001:db8::5"}, "2001:db8::5"),
+])
+def test_client_ip(peer, headers, expected):
+    assert client_ip(_request(peer, **headers)) == expected
+
+
+@pytest.fixture
+def fresh_throttle(limits):
+    login_throttle.use(MemoryThrottleBackend(max_keys=1000))
+    yield login_throttle
+    login_throttle.use(None)
+
+
+async def _login(client, email: str, password: str, forwarded_for: str):
+    return await client.post(
+        "/api/v1/auth/login-json", json={"email": email, "password": password},
+        headers={"X-Forwarded-For": forwarded_for},
+    )
+
+
+async def test_ip_limit_is_per_client_behind_proxy(client, fresh_throttle, make_user):
+    """20 неудач разных клиентов через один прокси не блокируют остальных"""
+    victim, _ = make_user()
+    for i in range(settings.LOGIN_IP_MAX_FAILURES * 2):
+        response = await _login(client, f"nobody-{i}@example.com", "wrong", f"198.51.100.{i}")
+        assert response.status_code == 401
+    response = await _login(client, victim.email, "password", "198.51.100.200")
+    assert response.status_code == 200, response.text
+
+
+async def test_ip_limit_blocks_the_attacker(client, fresh_throttle, make_user):
+    victim, _ = make_user()
+    for i in range(settings.LOGIN_IP_MAX_FAILURES):
+        await _login(client, f"nobody-{i}@example.com", "wrong", "198.51.100.66")
+    response = await _login(client, victim.email, "password", "198.51.100.66")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert (await _login(client, victim.email, "password", "198.51.100.67")).status_code == 200
+
+
+async def test_untrusted_peer_cannot_rotate_forwarded_ip(fresh_throttle, make_user, database):
+    from app.main import app
+
+    victim, _ = make_user()
+    transport = httpx.ASGITransport(app=app, client=("203.0.113.9", 4000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as direct:
+        for i in range(settings.LOGIN_IP_MAX_FAILURES):
+            await _login(direct, f"nobody-{i}@example.com", "wrong", f"198.51.100.{i}")
+        response = await _login(direct, victim.email, "password", "198.51.100.250")
+    assert response.status_code == 429
@@ -0,0 +1,22 @@
+"""
+Пулы соединений: у каждого движка свои настройки размера, общий бюджет
+соединений процесса считает db_connection_budget.
+"""
+from app.core.config import Settings, settings
+from app.db.base import async_engine, engine
+
+
+def test_engines_use_their_own_pool_settings():
+    assert engine.pool.size() == settings.SYNC_DB_POOL_SIZE
+    assert engine.pool._max_overflow == settings.SYNC_DB_MAX_OVERFLOW
+    assert async_engine.sync_engine.pool.size() == settings.DB_POOL_SIZE
+    assert async_engine.sync_engine.pool._max_overflow == settings.DB_MAX_OVERFLOW
+
+
+def test_connection_budget():
+    base = dict(DB_POOL_SIZE=5, DB_MAX_OVERFLOW=10, SYNC_DB_POOL_SIZE=2, SYNC_DB_MAX_OVERFLOW=3)
+    assert Settings(**base).db_connection_budget() == {"primary": 20, "replica": 0}
+    assert Settings(
+        **base, SCHEDULER_DB_POOL_SIZE=1, SCHEDULER_DB_MAX_OVERFLOW=2,
+        DATABASE_READ_URL="postgresql://replica/db", READ_DB_POOL_SIZE=4, READ_DB_MAX_OVERFLOW=1,
+    ).db_connection_budget() == {"primary": 23, "replica": 5}
@@ -0,0 +1,95 @@
+"""
+Бюджеты SQL-запросов горячих эндпоинтов (assert_query_budget).
+
+Число запросов не должно расти с числом задач и этапов: список из 30 задач
+с этапами укладывается в тот же бюджет, что и из одной. В каждый бюджет входит
+чтение версии данных пользователя для ETag (user_counters). Первый запрос прогревает
+кэши авторизации (пользователь, фильтр отозванных токенов), бюджеты — для
+последующих запросов.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.db.instrumentation import QueryStats, _report, assert_query_budget
+
+TASKS = 30
+
+
+@pytest.fixture
+async def tasks(client, user):
+    _, headers = user
+    deadline = datetime.now(timezone.utc) + timedelta(days=3)
+    payload = {"tasks": [
+        {
+            "title": f"task {i}", "task_type": "homework", "priority": "current",
+            "deadline": (deadline + timedelta(hours=i)).isoformat(),
+            "steps": [{"title": "step 1", "order": 0}, {"title": "step 2", "order": 1}],
+        }
+        for i in range(TASKS)
+    ]}
+    response = await client.post("/api/v1/tasks/bulk", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    await client.get("/api/v1/auth/me", headers=headers)
+    return headers, response.json()
+
+
+async def test_task_list(client, tasks):
+    headers, _ = tasks
+    with assert_query_budget(3):  # ETag, задачи, этапы всех задач одним IN
+        response = await client.get("/api/v1/tasks/", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == TASKS
+    assert all(len(task["steps"]) == 2 for task in response.json())
+
+
+async def test_task_list_compact(client, tasks):
+    headers, _ = tasks
+    with assert_query_budget(2):
+        response = await client.get("/api/v1/tasks/", params={"view": "compact"}, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == TASKS
+
+
+async def test_task_detail(client, tasks):
+    headers, created = tasks
+    with assert_query_budget(3):
+        response = await client.get(f"/api/v1/tasks/{created[0]['id']}", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["steps"]) == 2
+
+
+async def test_task_stats(client, tasks):
+    headers, _ = tasks
+    with assert_query_budget(2):  # ETag и строка счетчиков
+        response = await client.get("/api/v1/tasks/stats/summary", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["total_tasks"] == TASKS
+
+
+async def test_user_stats(client, tasks):
+    headers, _ = tasks
+    with assert_query_budget(2):
+        response = await client.get("/api/v1/achievements/stats", headers=headers)
+    assert response.status_code == 200
+
+
+async def test_budget_exceeded(client, tasks):
+    headers, _ = tasks
+    with pytest.raises(AssertionError, match="Ожидалось не больше 0 SQL-запросов"):
+        with assert_query_budget(0):
+            await client.get("/api/v1/tasks/", headers=headers)
+
+
+@pytest.mark.parametrize("count, level", [(9, "DEBUG"), (10, "INFO")])
+def test_summary_log_level(caplog, monkeypatch, count, level):
+    monkeypatch.setattr(settings, "QUERY_STATS_LOG_THRESHOLD", 10)
+    stats = QueryStats("GET /api/v1/tasks/")
+    for i in range(count):
+        stats.record(f"SELECT {i}", 0.001)
+    with caplog.at_level(logging.DEBUG, logger="app.db.instrumentation"):
+        _report(stats)
+    [record] = [r for r in caplog.records if "SQL-запросов" in r.getMessage()]
+    assert record.levelname == level
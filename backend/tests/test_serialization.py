@@ -0,0 +1,81 @@
+"""
+Быстрая сериализация (FAST_JSON_RESPONSES, api/v1/responses.py) должна давать
+те же байты, что и стандартный путь FastAPI: response_model -> jsonable_encoder
+-> JSONResponse. Сравниваются ответы одних и тех же эндпоинтов с флагом и без.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app.api.v1.responses import ListSerializer
+from app.core.config import settings
+from app.crud import task as crud_task
+from app.schemas.task import Task, TaskUpdate
+
+
+@pytest.fixture
+async def tasks(client, user):
+    db_user, headers = user
+    now = datetime.now(timezone.utc)
+    payload = {"tasks": [
+        {
+            "title": "Курсовая: глава 1 — «введение»", "description": None, "task_type": "coursework",
+            "priority": "yearly_debt", "deadline": (now - timedelta(days=2, microseconds=123)).isoformat(),
+            "steps": [{"title": "План", "order": 0}, {"title": "Черновик", "description": "без \"кавычек\"", "order": 1}],
+        },
+        {
+            "title": "Lab 2", "description": "tabs\tand\nnewlines", "task_type": "laboratory",
+            "priority": "current", "deadline": (now + timedelta(hours=5)).isoformat(), "color": "#FF0000",
+            "is_recurring": True, "recurrence_pattern": "weekly",
+        },
+        {
+            "title": "Exam", "task_type": "exam", "priority": "semester_debt",
+            "deadline": "2030-01-15T09:30:00+03:00", "steps": [],
+        },
+    ]}
+    response = await client.post("/api/v1/tasks/bulk", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    created = response.json()
+    # completed_at заполнен у одной задачи, у остальных — None
+    update = await client.put(f"/api/v1/tasks/{created[2]['id']}", json={"status": "completed"}, headers=headers)
+    assert update.status_code == 200, update.text
+    return db_user, headers
+
+
+async def _body(client, monkeypatch, fast: bool, url: str, headers, params=None) -> bytes:
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", fast)
+    response = await client.get(url, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.content
+
+
+@pytest.mark.parametrize("url", ["/api/v1/tasks/", "/api/v1/tasks/upcoming/list", "/api/v1/tasks/overdue/list"])
+async def test_fast_list_matches_standard_response(client, monkeypatch, tasks, url):
+    _, headers = tasks
+    standard = await _body(client, monkeypatch, False, url, headers, params={"days": 30} if "upcoming" in url else None)
+    fast = await _body(client, monkeypatch, True, url, headers, params={"days": 30} if "upcoming" in url else None)
+    assert json.loads(standard), "пустой список ничего не проверяет"
+    assert fast == standard
+
+
+async def test_fast_list_without_steps(client, monkeypatch, tasks):
+    _, headers = tasks
+    params = {"include_steps": "false"}
+    standard = await _body(client, monkeypatch, False, "/api/v1/tasks/", headers, params)
+    fast = await _body(client, monkeypatch, True, "/api/v1/tasks/", headers, params)
+    assert fast == standard
+
+
+def test_serializer_matches_jsonable_encoder(db, tasks):
+    db_user, _ = tasks
+    items = crud_task.get_tasks(db, db_user.id)
+    assert any(item.steps for item in items) and any(item.completed_at is None for item in items)
+    response = ListSerializer(Task).response(items)
+    expected = json.dumps(
+        jsonable_encoder([Task.model_validate(item) for item in items]),
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+    ).encode("utf-8")
+    assert response.body == expected
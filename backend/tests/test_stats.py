@@ -0,0 +1,157 @@
+"""
+get_task_stats и get_user_stats читают user_counters одним запросом. Результат
+сравнивается с прежними реализациями (отдельный COUNT на каждое поле), которые
+повторены здесь как эталон, на данных, измененных через CRUD и сервисы.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import and_
+
+from app.crud import achievement as crud_achievement
+from app.crud import goal as crud_goal
+from app.crud import task as crud_task
+from app.db.models.goal import Achievement, Goal, UserAchievement
+from app.db.models.task import Task, TaskPriority, TaskStatus
+from app.schemas.goal import GoalCreate, GoalUpdate
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.services.task_status import TaskStatusService
+
+
+def reference_task_stats(db, user_id: int) -> dict:
+    total = db.query(Task).filter(Task.user_id == user_id).count()
+    completed = db.query(Task).filter(
+        and_(Task.user_id == user_id, Task.status == TaskStatus.completed)
+    ).count()
+    pending = db.query(Task).filter(
+        and_(Task.user_id == user_id, Task.status.in_([TaskStatus.pending, TaskStatus.in_progress]))
+    ).count()
+    overdue = len(crud_task.get_overdue_tasks(db, user_id))
+    yearly_debts = db.query(Task).filter(
+        and_(Task.user_id == user_id, Task.priority == TaskPriority.yearly_debt)
+    ).count()
+    semester_debts = db.query(Task).filter(
+        and_(Task.user_id == user_id, Task.priority == TaskPriority.semester_debt)
+    ).count()
+    return {
+        "total_tasks": total,
+        "completed_tasks": completed,
+        "pending_tasks": pending,
+        "overdue_tasks": overdue,
+        "yearly_debts": yearly_debts,
+        "semester_debts": semester_debts,
+    }
+
+
+def reference_user_stats(db, user_id: int) -> dict:
+    total_tasks = db.query(Task).filter(Task.user_id == user_id).count()
+    completed_tasks = db.query(Task).filter(
+        and_(Task.user_id == user_id, Task.status == TaskStatus.completed)
+    ).count()
+    pending_tasks = db.query(Task).filter(
+        and_(Task.user_id == user_id, Task.status == TaskStatus.pending)
+    ).count()
+    overdue_tasks = db.query(Task).filter(
+        and_(Task.user_id == user_id, Task.status == TaskStatus.overdue)
+    ).count()
+    completed_goals = db.query(Goal).filter(
+        and_(Goal.user_id == user_id, Goal.is_completed == True)
+    ).count()
+    user_achievements = db.query(UserAchievement).filter(UserAchievement.user_id == user_id).all()
+    total_points = 0
+    for ua in user_achievements:
+        achievement = db.query(Achievement).filter(Achievement.id == ua.achievement_id).first()
+        if achievement:
+            total_points += achievement.points
+    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    week_ago = datetime.now() - timedelta(days=7)
+    recent_completed = db.query(Task).filter(
+        and_(Task.user_id == user_id, Task.status == TaskStatus.completed, Task.completed_at >= week_ago)
+    ).count()
+    return {
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+        "pending_tasks": pending_tasks,
+        "overdue_tasks": overdue_tasks,
+        "completion_rate": round(completion_rate, 1),
+        "current_streak": recent_completed,
+        "total_points": total_points,
+        "achievements_count": len(user_achievements),
+        "completed_goals": completed_goals,
+    }
+
+
+def _task(title: str, priority: str, deadline: datetime) -> TaskCreate:
+    return TaskCreate(title=title, task_type="homework", priority=priority, deadline=deadline)
+
+
+@pytest.fixture
+def achievements(db):
+    items = [
+        Achievement(name=f"test {points}", description="test", condition_type="tasks_completed",
+                    condition_value=1000, points=points)
+        for points in (10, 25)
+    ]
+    db.add_all(items)
+    db.commit()
+    yield items
+    db.query(UserAchievement).filter(UserAchievement.achievement_id.in_([a.id for a in items])).delete()
+    for item in items:
+        db.delete(item)
+    db.commit()
+
+
+def assert_stats_match(db, user_id: int) -> None:
+    db.expire_all()
+    assert crud_task.get_task_stats(db, user_id) == reference_task_stats(db, user_id)
+    assert crud_achievement.get_user_stats(db, user_id) == reference_user_stats(db, user_id)
+
+
+def test_empty_user(db, user):
+    db_user, _ = user
+    assert_stats_match(db, db_user.id)
+
+
+def test_stats_match_reference(db, user, achievements):
+    user_id = user[0].id
+    now = datetime.now(timezone.utc)
+    tasks = crud_task.create_tasks(db, [
+        _task("past 1", "current", now - timedelta(days=3)),
+        _task("past 2", "yearly_debt", now - timedelta(days=1)),
+        _task("past 3", "semester_debt", now - timedelta(hours=2)),
+        _task("future 1", "current", now + timedelta(days=1)),
+        _task("future 2", "semester_debt", now + timedelta(days=5)),
+        _task("future 3", "yearly_debt", now + timedelta(days=9)),
+        _task("future 4", "current", now + timedelta(days=20)),
+    ], user_id)
+    assert_stats_match(db, user_id)
+
+    crud_task.update_task(db, tasks[3].id, user_id, TaskUpdate(status=TaskStatus.completed))
+    crud_task.update_task(db, tasks[4].id, user_id, TaskUpdate(status=TaskStatus.in_progress))
+    crud_task.update_task(db, tasks[1].id, user_id, TaskUpdate(status=TaskStatus.in_progress))
+    assert_stats_match(db, user_id)
+
+    # Планировщик помечает прошедшие дедлайны; новые просроченные еще не помечены
+    TaskStatusService.update_overdue_tasks()
+    late = crud_task.create_task(db, _task("late", "current", now - timedelta(minutes=5)), user_id)
+    TaskStatusService.mark_task_as_completed(db, tasks[0].id, user_id)
+    assert_stats_match(db, user_id)
+
+    crud_task.delete_task(db, tasks[5].id, user_id)
+    crud_task.update_task(db, late.id, user_id, TaskUpdate(priority=TaskPriority.yearly_debt))
+    assert_stats_match(db, user_id)
+
+    goal = crud_goal.create_goal(db, GoalCreate(
+        title="goal", goal_type="weekly", target_value=3, start_date=now, end_date=now + timedelta(days=7)
+    ), user_id)
+    crud_goal.create_goal(db, GoalCreate(
+        title="open goal", goal_type="monthly", target_value=5, start_date=now, end_date=now + timedelta(days=30)
+    ), user_id)
+    crud_goal.update_goal(db, goal.id, user_id, GoalUpdate(is_completed=True))
+    for achievement in achievements:
+        crud_achievement.award_achievement(db, user_id, achievement.id)
+    crud_achievement.award_achievement(db, user_id, achievements[0].id)  # повторная выдача ничего не меняет
+    assert_stats_match(db, user_id)
+
+    stats = crud_achievement.get_user_stats(db, user_id)
+    assert stats["total_points"] == 35 and stats["completed_goals"] == 1 and stats["current_streak"] == 2
@@ -3,7 +3,7 @@
 import { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
-import { tokenUtils, tasksAPI, type Task } from '@/lib/api';
+import { tokenUtils, tasksAPI, type Task, type CalendarTask } from '@/lib/api';
 import { dateUtils, taskUtils } from '@/lib/utils';
 import { 
   HomeIcon,
@@ -31,7 +31,8 @@ const getTaskTypeIcon = (type: string) => {
 
 export default function CalendarPage() {
   const router = useRouter();
-  const [tasks, setTasks] = useState<Task[]>([]);
+  const [groupedTasks, setGroupedTasks] = useState<{ [key: string]: CalendarTask[] }>({});
+  const [overdueTasks, setOverdueTasks] = useState<Task[]>([]);
   const [loading, setLoading] = useState(true);
   const [selectedView, setSelectedView] = useState<'week' | 'month'>('week');
 
@@ -41,12 +42,30 @@ export default function CalendarPage() {
       return;
     }
     loadTasks();
-  }, [router]);
+  }, [router, selectedView]);
+
+  // Ключ дня в местном времени: YYYY-MM-DD, как в ответе /tasks/calendar
+  const toDayKey = (date: Date) => {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
+  };
 
   const loadTasks = async () => {
     try {
-      const tasksData = await tasksAPI.getTasks();
-      setTasks(tasksData);
+      const days = getDaysToShow();
+      const tz = Intl.DateTimeFormat().resolvedOptions().timeZone;
+      // Сервер группирует задачи по дням; грузим только видимый период
+      const [calendar, overdue] = await Promise.all([
+        tasksAPI.getCalendar(toDayKey(days[0]), toDayKey(days[days.length - 1]), tz),
+        tasksAPI.getOverdueTasks(false, ['id', 'title', 'task_type', 'priority', 'deadline']),
+      ]);
+      const grouped: { [key: string]: CalendarTask[] } = {};
+      calendar.days.forEach(day => {
+        grouped[day.date] = day.tasks;
+      });
+      setGroupedTasks(grouped);
+      setOverdueTasks(overdue);
     } catch (error) {
       console.error('Ошибка загрузки задач:', error);
     } finally {
@@ -54,21 +73,6 @@ export default function CalendarPage() {
     }
   };
 
-  // Группировка задач по дням
-  const groupTasksByDate = (tasks: Task[]) => {
-    const grouped: { [key: string]: Task[] } = {};
-    
-    tasks.forEach(task => {
-      const date = new Date(task.deadline).toDateString();
-      if (!grouped[date]) {
-        grouped[date] = [];
-      }
-      grouped[date].push(task);
-    });
-    
-    return grouped;
-  };
-
   // Получение дней для отображения
   const getDaysToShow = () => {
     const days = [];
@@ -81,16 +85,11 @@ export default function CalendarPage() {
     return days;
   };
 
-  const groupedTasks = groupTasksByDate(tasks);
   const daysToShow = getDaysToShow();
 
-  const overdueTasks = tasks.filter(task => 
-    new Date(task.deadline) < new Date() && task.status !== 'completed'
-  );
-
-  const todayTasks = groupedTasks[new Date().toDateString()] || [];
+  const todayTasks = groupedTasks[toDayKey(new Date())] || [];
   const weekTasks = daysToShow.slice(0, 7).reduce((count, date) => {
-    return count + (groupedTasks[date.toDateString()]?.length || 0);
+    return count + (groupedTasks[toDayKey(date)]?.length || 0);
   }, 0);
 
   if (loading) {
@@ -209,9 +208,9 @@ export default function CalendarPage() {
           
           <div className={`grid gap-4 ${selectedView === 'week' ? 'grid-cols-1 lg:grid-cols-7' : 'grid-cols-1 md:grid-cols-2 lg:grid-cols-3'}`}>
             {daysToShow.map((date, index) => {
-              const dateKey = date.toDateString();
+              const dateKey = toDayKey(date);
               const dayTasks = groupedTasks[dateKey] || [];
-              const isToday = dateKey === new Date().toDateString();
+              const isToday = dateKey === toDayKey(new Date());
               const isPast = date < new Date() && !isToday;
               const isWeekend = date.getDay() === 0 || date.getDay() === 6;
 
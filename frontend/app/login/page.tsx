@@ -29,7 +29,7 @@ export default function LoginPage() {
 
     try {
       const response = await authAPI.login(data.email, data.password);
-      tokenUtils.setToken(response.access_token);
+      tokenUtils.setToken(response.access_token, response.refresh_token);
       router.push('/');
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Ошибка входа');
@@ -31,6 +31,9 @@ import {
   TrophyIcon as TrophyIconSolid
 } from '@heroicons/react/24/solid';
 
+// Поля задач, которые показывает дашборд: списки запрашиваются в компактном виде
+const DASHBOARD_TASK_FIELDS = ['id', 'title', 'task_type', 'priority', 'deadline', 'color', 'status'];
+
 const getTaskTypeIcon = (type: string) => {
   const iconClass = "h-4 w-4";
   switch (type) {
@@ -64,8 +67,8 @@ export default function Dashboard() {
       const [userResponse, statsResponse, upcomingResponse, overdueResponse] = await Promise.all([
         authAPI.getCurrentUser(),
         tasksAPI.getTaskStats(),
-        tasksAPI.getUpcomingTasks(7),
-        tasksAPI.getOverdueTasks(),
+        tasksAPI.getUpcomingTasks(7, false, DASHBOARD_TASK_FIELDS),
+        tasksAPI.getOverdueTasks(false, DASHBOARD_TASK_FIELDS),
       ]);
 
       setUser(userResponse);
@@ -150,7 +153,12 @@ export default function Dashboard() {
                 <span className="hidden sm:block">Профиль</span>
               </Link>
               <button
-                onClick={() => {
+                onClick={async () => {
+                  try {
+                    await authAPI.logout();
+                  } catch {
+                    // Токен уже недействителен — выходим локально
+                  }
                   tokenUtils.removeToken();
                   router.push('/login');
                 }}
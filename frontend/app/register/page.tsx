@@ -36,7 +36,7 @@ export default function RegisterPage() {
       const response = await authAPI.register(data.email, data.password, data.full_name);
       // Автоматически логиним после регистрации
       const loginResponse = await authAPI.login(data.email, data.password);
-      tokenUtils.setToken(loginResponse.access_token);
+      tokenUtils.setToken(loginResponse.access_token, loginResponse.refresh_token);
       router.push('/');
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Ошибка регистрации');
@@ -19,12 +19,41 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
-// Interceptor для обработки ошибок авторизации
+// Один запрос обновления на все ответы 401, пришедшие одновременно
+let refreshPromise: Promise<string> | null = null;
+
+async function refreshAccessToken(): Promise<string> {
+  const refreshToken = Cookies.get('refresh_token');
+  if (!refreshToken) {
+    throw new Error('Нет refresh-токена');
+  }
+  // Без экземпляра api, чтобы 401 от /auth/refresh не попал в interceptor
+  const response = await axios.post(`${API_BASE_URL}/api/v1/auth/refresh`, { refresh_token: refreshToken });
+  tokenUtils.setToken(response.data.access_token, response.data.refresh_token);
+  return response.data.access_token;
+}
+
+// Interceptor для обработки ошибок авторизации: истекший access-токен
+// обновляется по refresh-токену, запрос повторяется один раз
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 401 && original && !original._retried && Cookies.get('refresh_token')) {
+      original._retried = true;
+      try {
+        refreshPromise = refreshPromise || refreshAccessToken();
+        const token = await refreshPromise;
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch {
+        // refresh-токен недействителен — ниже обычный выход на страницу входа
+      } finally {
+        refreshPromise = null;
+      }
+    }
     if (error.response?.status === 401) {
-      Cookies.remove('access_token');
+      tokenUtils.removeToken();
       window.location.href = '/login';
     }
     return Promise.reject(error);
@@ -73,6 +102,32 @@ export interface TaskStats {
   semester_debts: number;
 }
 
+export interface CalendarTask {
+  id: number;
+  title: string;
+  task_type: string;
+  priority: string;
+  status: string;
+  deadline: string;
+  color: string;
+  is_overdue: boolean;
+}
+
+export interface CalendarDay {
+  date: string; // YYYY-MM-DD в часовом поясе запроса
+  total: number;
+  by_status: Record<string, number>;
+  by_priority: Record<string, number>;
+  tasks: CalendarTask[];
+}
+
+export interface TaskCalendar {
+  start: string;
+  end: string;
+  tz: string;
+  days: CalendarDay[];
+}
+
 export interface PushSubscription {
   endpoint: string;
   keys: {
@@ -127,7 +182,7 @@ export interface Goal {
 
 // API методы для авторизации
 export const authAPI = {
-  async login(email: string, password: string): Promise<{ access_token: string; token_type: string }> {
+  async login(email: string, password: string): Promise<{ access_token: string; refresh_token: string; token_type: string }> {
     const response = await api.post('/api/v1/auth/login-json', { email, password });
     return response.data;
   },
@@ -137,6 +192,11 @@ export const authAPI = {
     return response.data;
   },
 
+  async logout(): Promise<void> {
+    // Отзывает текущий access-токен и refresh-токен этого входа
+    await api.post('/api/v1/auth/logout', { refresh_token: Cookies.get('refresh_token') });
+  },
+
   async getCurrentUser(): Promise<User> {
     const response = await api.get('/api/v1/auth/me');
     return response.data;
@@ -177,6 +237,37 @@ export const tasksAPI = {
     return response.data;
   },
 
+  // Все задачи пользователя: постранично по курсору из заголовка X-Next-Cursor.
+  // includeSteps=false — для представлений, которые не показывают этапы
+  async getAllTasks(filters?: {
+    task_type?: string;
+    priority?: string;
+    status?: string;
+  }, includeSteps: boolean = true): Promise<Task[]> {
+    const tasks: Task[] = [];
+    let cursor: string | undefined;
+    do {
+      const params = new URLSearchParams({ limit: '200', include_steps: String(includeSteps) });
+      if (filters) {
+        Object.entries(filters).forEach(([key, value]) => {
+          if (value) params.append(key, value);
+        });
+      }
+      if (cursor) params.append('cursor', cursor);
+      const response = await api.get(`/api/v1/tasks/?${params}`);
+      tasks.push(...response.data);
+      cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return tasks;
+  },
+
+  // Задачи за период (from/to включительно, YYYY-MM-DD), сгруппированные по дням
+  async getCalendar(from: string, to: string, tz: string): Promise<TaskCalendar> {
+    const params = new URLSearchParams({ from, to, tz });
+    const response = await api.get(`/api/v1/tasks/calendar?${params}`);
+    return response.data;
+  },
+
   async getTask(id: number): Promise<Task> {
     const response = await api.get(`/api/v1/tasks/${id}`);
     return response.data;
@@ -204,13 +295,18 @@ export const tasksAPI = {
     await api.delete(`/api/v1/tasks/${id}`);
   },
 
-  async getUpcomingTasks(days: number = 7): Promise<Task[]> {
-    const response = await api.get(`/api/v1/tasks/upcoming/list?days=${days}`);
+  // fields — только перечисленные поля задачи (остальные в ответе отсутствуют)
+  async getUpcomingTasks(days: number = 7, includeSteps: boolean = true, fields?: string[]): Promise<Task[]> {
+    const params = new URLSearchParams({ days: String(days), include_steps: String(includeSteps) });
+    if (fields) params.append('fields', fields.join(','));
+    const response = await api.get(`/api/v1/tasks/upcoming/list?${params}`);
     return response.data;
   },
 
-  async getOverdueTasks(): Promise<Task[]> {
-    const response = await api.get('/api/v1/tasks/overdue/list');
+  async getOverdueTasks(includeSteps: boolean = true, fields?: string[]): Promise<Task[]> {
+    const params = new URLSearchParams({ include_steps: String(includeSteps) });
+    if (fields) params.append('fields', fields.join(','));
+    const response = await api.get(`/api/v1/tasks/overdue/list?${params}`);
     return response.data;
   },
 
@@ -276,8 +372,11 @@ export const goalsAPI = {
 
 // Утилиты для работы с токенами
 export const tokenUtils = {
-  setToken(token: string): void {
+  setToken(token: string, refreshToken?: string): void {
     Cookies.set('access_token', token, { expires: 7 }); // 7 дней
+    if (refreshToken) {
+      Cookies.set('refresh_token', refreshToken, { expires: 30 }); // как REFRESH_TOKEN_EXPIRE_DAYS
+    }
   },
 
   getToken(): string | undefined {
@@ -286,6 +385,7 @@ export const tokenUtils = {
 
   removeToken(): void {
     Cookies.remove('access_token');
+    Cookies.remove('refresh_token');
   },
 
   isAuthenticated(): boolean {